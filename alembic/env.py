@@ -21,7 +21,9 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.db.base import Base
-from app.models.task import Task, TaskLog  # Import all models here
+from app.models.task import Task, TaskDependency, TaskLog  # Import all models here
+from app.models.job import Job
+from app.models.stats import TaskActivity, TaskCount
 
 target_metadata = Base.metadata
 
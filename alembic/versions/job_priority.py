@@ -0,0 +1,41 @@
+"""job priority
+
+Revision ID: 7a8b9c0d1e2f
+Revises: 6f7a8b9c0d1e
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a8b9c0d1e2f'
+down_revision: Union[str, None] = '6f7a8b9c0d1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('priority', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('jobs', sa.Column('queued_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing jobs rank ahead of new ones, in their current order
+    op.add_column('jobs', sa.Column('rank', sa.Float(), server_default='0', nullable=False))
+    # Correlated subquery rather than UPDATE ... FROM, which SQLite lacks
+    op.execute(
+        "UPDATE jobs SET queued_at = run_at, priority = COALESCE("
+        "(SELECT tasks.priority FROM tasks WHERE tasks.id = jobs.task_id), 1)"
+    )
+    # Batch mode, since SQLite can only change a column by copying the table
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.alter_column('queued_at', nullable=False)
+    op.create_index('ix_jobs_status_rank', 'jobs', ['status', 'rank'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_status_rank', table_name='jobs')
+    op.drop_column('jobs', 'rank')
+    op.drop_column('jobs', 'queued_at')
+    op.drop_column('jobs', 'priority')
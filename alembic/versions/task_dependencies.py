@@ -0,0 +1,39 @@
+"""task dependencies
+
+Revision ID: 9c0d1e2f3a4b
+Revises: 8b9c0d1e2f3a
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c0d1e2f3a4b'
+down_revision: Union[str, None] = '8b9c0d1e2f3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_dependencies',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('depends_on_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['depends_on_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id', 'depends_on_id'),
+    )
+    op.create_index(
+        'ix_task_dependencies_depends_on_id', 'task_dependencies',
+        ['depends_on_id', 'task_id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_dependencies_depends_on_id', table_name='task_dependencies')
+    op.drop_table('task_dependencies')
@@ -0,0 +1,47 @@
+"""task log cascade
+
+Revision ID: 8b9c0d1e2f3a
+Revises: 7a8b9c0d1e2f
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b9c0d1e2f3a'
+down_revision: Union[str, None] = '7a8b9c0d1e2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite leaves the foreign key unnamed, batch mode finds it by this name
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_foreign_key(**kw) -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table(
+            'task_logs', naming_convention=SQLITE_NAMING
+        ) as batch_op:
+            batch_op.drop_constraint('fk_task_logs_task_id_tasks', type_='foreignkey')
+            batch_op.create_foreign_key(
+                'fk_task_logs_task_id_tasks', 'tasks', ['task_id'], ['id'], **kw
+            )
+        return
+    op.drop_constraint('task_logs_task_id_fkey', 'task_logs', type_='foreignkey')
+    op.create_foreign_key(
+        'task_logs_task_id_fkey', 'task_logs', 'tasks', ['task_id'], ['id'], **kw
+    )
+
+
+def upgrade() -> None:
+    # Deleting a task removes its logs in the database, so Core deletes and
+    # the retention job need not delete them first
+    _replace_foreign_key(ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    _replace_foreign_key()
@@ -0,0 +1,29 @@
+"""task log indexes
+
+Revision ID: 6f7a8b9c0d1e
+Revises: 5e6f7a8b9c0d
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f7a8b9c0d1e'
+down_revision: Union[str, None] = '5e6f7a8b9c0d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A task's logs by (task_id, id), and old logs by created_at for the
+    # retention job
+    op.create_index('ix_task_logs_task_id_id', 'task_logs', ['task_id', 'id'], unique=False)
+    op.create_index('ix_task_logs_created_at', 'task_logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_logs_created_at', table_name='task_logs')
+    op.drop_index('ix_task_logs_task_id_id', table_name='task_logs')
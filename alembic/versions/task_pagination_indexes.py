@@ -0,0 +1,29 @@
+"""task pagination indexes
+
+Revision ID: 2b3c4d5e6f7a
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b3c4d5e6f7a'
+down_revision: Union[str, None] = '1a2b3c4d5e6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite indexes backing keyset pagination on (created_at, id)
+    # and (priority, id)
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_priority_id', 'tasks', ['priority', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_priority_id', table_name='tasks')
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
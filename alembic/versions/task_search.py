@@ -0,0 +1,83 @@
+"""task full-text search
+
+Revision ID: 4d5e6f7a8b9c
+Revises: 3c4d5e6f7a8b
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d5e6f7a8b9c'
+down_revision: Union[str, None] = '3c4d5e6f7a8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE tasks_fts USING fts5(
+                title, description, content='tasks', content_rowid='id',
+                tokenize='porter unicode61'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO tasks_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks
+            BEGIN
+                INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO tasks_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+        return
+
+    # The generated column is filled for existing rows as part of the ALTER
+    op.execute(
+        """
+        ALTER TABLE tasks ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    op.execute("CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_insert")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_tasks_search_vector")
+    op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,47 @@
+"""task stats
+
+Revision ID: 5e6f7a8b9c0d
+Revises: 4d5e6f7a8b9c
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e6f7a8b9c0d'
+down_revision: Union[str, None] = '4d5e6f7a8b9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counts',
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('status', 'priority')
+    )
+    op.create_table(
+        'task_activity',
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('event', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'event')
+    )
+    # Seed the counters from the existing rows
+    op.execute(
+        """
+        INSERT INTO task_counts (status, priority, count)
+        SELECT status, priority, count(*) FROM tasks GROUP BY status, priority
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_activity')
+    op.drop_table('task_counts')
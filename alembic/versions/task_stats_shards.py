@@ -0,0 +1,75 @@
+"""task stats shards
+
+Revision ID: 0d1e2f3a4b5c
+Revises: 9c0d1e2f3a4b
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d1e2f3a4b5c'
+down_revision: Union[str, None] = '9c0d1e2f3a4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+KEYS = {
+    'task_counts': ['status', 'priority'],
+    'task_activity': ['bucket', 'event'],
+}
+
+
+def _same_counter(table: str) -> str:
+    return ' AND '.join(f'other.{key} = {table}.{key}' for key in KEYS[table])
+
+
+def _set_primary_key(table: str, columns, drop_shard: bool = False) -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        # Batch mode recreates the table with the new key
+        with op.batch_alter_table(table) as batch_op:
+            if drop_shard:
+                batch_op.drop_column('shard')
+            batch_op.create_primary_key(f'{table}_pkey', columns)
+        return
+    op.drop_constraint(f'{table}_pkey', table, type_='primary')
+    op.create_primary_key(f'{table}_pkey', table, columns)
+    if drop_shard:
+        op.drop_column(table, 'shard')
+
+
+def upgrade() -> None:
+    # Existing counters become shard 0 of their sharded counter
+    for table, keys in KEYS.items():
+        op.add_column(
+            table,
+            sa.Column('shard', sa.Integer(), nullable=False, server_default='0'),
+        )
+        _set_primary_key(table, [*keys, 'shard'])
+
+
+def downgrade() -> None:
+    # Fold each counter's shards into its lowest one, then drop the rest
+    for table, keys in KEYS.items():
+        op.execute(
+            f"""
+            UPDATE {table} SET count = (
+                SELECT sum(count) FROM {table} AS other WHERE {_same_counter(table)}
+            )
+            WHERE shard = (
+                SELECT min(shard) FROM {table} AS other WHERE {_same_counter(table)}
+            )
+            """
+        )
+        op.execute(
+            f"""
+            DELETE FROM {table} WHERE shard != (
+                SELECT min(shard) FROM {table} AS other WHERE {_same_counter(table)}
+            )
+            """
+        )
+        _set_primary_key(table, keys, drop_shard=True)
@@ -1,19 +1,72 @@
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional, Sequence, Tuple
 
-from app.db.base import get_db
-from app.models.task import Task
-from app.services.task import task_service
+from fastapi import HTTPException, Query, status
 
+from app.schemas.task import TASK_ROW_FIELDS
 
-async def get_task_by_id(
-    task_id: int, db: AsyncSession = Depends(get_db)
-) -> Task:
-    """Get a task by ID or raise 404"""
-    task = await task_service.get(db, task_id)
-    if task is None:
+
+def task_not_found(task_id: int) -> HTTPException:
+    """
+    The 404 for a missing task
+
+    Endpoints learn that a task is missing from the result of their own
+    query (e.g. an UPDATE ... RETURNING no row) instead of loading the task
+    in a dependency first, which would cost an extra round trip.
+    """
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Task with ID {task_id} not found",
+    )
+
+
+def get_task_filters(
+    title: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Collect the task list filters from the query string"""
+    filters = {}
+    if title:
+        filters["title"] = title
+    if status:
+        filters["status"] = status
+    if priority:
+        filters["priority"] = priority
+    return filters
+
+
+FIELDS_QUERY = Query(
+    None,
+    description="Comma-separated fields to return, e.g. id,title,status",
+)
+
+
+def _parse_fields(
+    fields: Optional[str], available: Sequence[str]
+) -> Optional[Tuple[str, ...]]:
+    """A sparse fieldset in the order of available, None for all fields"""
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",")} - {""}
+    unknown = names - set(available)
+    if unknown or not names:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Task with ID {task_id} not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown fields: {', '.join(sorted(unknown))}. "
+                if unknown else "No fields requested. "
+            ) + f"Available: {','.join(available)}",
         )
-    return task
+    return tuple(field for field in available if field in names)
+
+
+def get_task_fields(fields: Optional[str] = FIELDS_QUERY) -> Optional[Tuple[str, ...]]:
+    """The sparse fieldset of a task listing, from ?fields="""
+    return _parse_fields(fields, TASK_ROW_FIELDS)
+
+
+def get_task_detail_fields(
+    fields: Optional[str] = FIELDS_QUERY,
+) -> Optional[Tuple[str, ...]]:
+    """The sparse fieldset of a single task, which may include its logs"""
+    return _parse_fields(fields, (*TASK_ROW_FIELDS, "logs"))
@@ -1,13 +1,60 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, status
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Header,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_task_by_id
-from app.db.base import get_db
-from app.models.task import Task
-from app.schemas.task import Task as TaskSchema, TaskCreate, TaskUpdate, TaskWithLogs
-from app.services.task import task_service
-from app.tasks.worker import process_task
+from app.api.dependencies import (
+    get_task_detail_fields,
+    get_task_fields,
+    get_task_filters,
+    task_not_found,
+)
+from app.core.config import settings
+from app.db.base import get_db, get_read_db
+from app.schemas.task import (
+    TASK_LOG_ROW_FIELDS,
+    TASK_ROW_FIELDS,
+    Task as TaskSchema,
+    BulkItemResult,
+    BulkResult,
+    ImportSummary,
+    TaskBulkDelete,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskLogInDB,
+    TaskStats,
+    TaskUpdate,
+    TaskWithLogs,
+    task_fields_adapter,
+    task_log_rows_adapter,
+    task_rows_adapter,
+    task_with_logs_row_adapter,
+)
+from app.services.stats import stats_service
+from app.services.task import (
+    DependencyCycleError,
+    loaded_task_etag,
+    task_etag,
+    task_events,
+    task_service,
+)
+from app.utils.etag import PreconditionFailedError, etag_matches, make_etag
+from app.utils.events import HEARTBEAT
+from app.utils.ndjson import iter_lines
+from app.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 
@@ -20,68 +67,503 @@ async def create_task(
     return await task_service.create(db, task_in)
 
 
+def _validate_items(items: List[Dict[str, Any]], schema):
+    """Validate bulk items one by one, so one bad item does not fail the rest"""
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors[index] = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            )
+    return valid, errors
+
+
+def _bulk_result(count: int, errors: Dict[int, str], indexes, outcomes) -> BulkResult:
+    """Merge validation errors and service outcomes into a per-item result"""
+    items = [
+        BulkItemResult(index=index, error=error) for index, error in errors.items()
+    ]
+    for index, (id, error) in zip(indexes, outcomes):
+        items.append(BulkItemResult(index=index, id=id, error=error))
+    items.sort(key=lambda item: item.index)
+    failed = sum(1 for item in items if item.error)
+    return BulkResult(succeeded=count - failed, failed=failed, items=items)
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_tasks_bulk(
+    items: List[Dict[str, Any]], db: AsyncSession = Depends(get_db)
+):
+    """Create many tasks in batched inserts, reporting errors per item"""
+    valid, errors = _validate_items(items, TaskCreate)
+    outcomes = await task_service.create_bulk(db, [obj for _, obj in valid])
+    return _bulk_result(len(items), errors, [index for index, _ in valid], outcomes)
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def update_tasks_bulk(
+    items: List[Dict[str, Any]], db: AsyncSession = Depends(get_db)
+):
+    """Update many tasks in set-based updates, reporting errors per item"""
+    valid, errors = _validate_items(items, TaskBulkUpdate)
+    outcomes = await task_service.update_bulk(db, [obj for _, obj in valid])
+    return _bulk_result(len(items), errors, [index for index, _ in valid], outcomes)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def delete_tasks_bulk(
+    body: TaskBulkDelete, db: AsyncSession = Depends(get_db)
+):
+    """Delete many tasks by ID, reporting IDs that were not found"""
+    outcomes = await task_service.delete_bulk(db, body.ids)
+    return _bulk_result(len(body.ids), {}, range(len(body.ids)), outcomes)
+
+
+@router.post("/import", response_model=ImportSummary)
+async def import_tasks(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    gzip: bool = False,
+):
+    """
+    Import tasks from an NDJSON request body, one TaskCreate per line
+
+    The body may be gzip-compressed (Content-Encoding: gzip or ?gzip=true).
+    It is parsed and inserted as it streams in, never buffered whole.
+    """
+    gzipped = gzip or request.headers.get("content-encoding") == "gzip"
+    lines = iter_lines(
+        request.stream(),
+        gzipped=gzipped,
+        max_line_length=settings.IMPORT_MAX_LINE_LENGTH,
+    )
+    return await task_service.import_lines(db, lines)
+
+
+def _json_response(adapter: TypeAdapter, value: Any) -> Response:
+    """
+    Dump plain rows to JSON with a prebuilt adapter (fast serialization)
+
+    Returning a Response makes FastAPI skip response_model validation; the
+    bytes are the same as the response_model would produce.
+    """
+    return Response(content=adapter.dump_json(value), media_type="application/json")
+
+
+def _page_etag(tasks: List[Any]) -> str:
+    """ETag of a page of tasks (rows or ORM objects)"""
+    return make_etag(*(
+        (task["id"], task["updated_at"].isoformat())
+        if isinstance(task, dict)
+        else (task.id, task.updated_at.isoformat())
+        for task in tasks
+    ))
+
+
+def _fieldset_etag(etag: str, fields: Optional[Tuple[str, ...]]) -> str:
+    """The ETag of a sparse fieldset of the representation etag is for"""
+    return etag if fields is None else make_etag(etag, *fields)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
 @router.get("/", response_model=List[TaskSchema])
 async def list_tasks(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    filters: Dict[str, Any] = Depends(get_task_filters),
     skip: int = 0,
     limit: int = 100,
-    title: Optional[str] = None,
+    order_by: Optional[str] = Query(None, pattern="^-?(created_at|priority)$"),
+    cursor: Optional[str] = None,
+    fields: Optional[Tuple[str, ...]] = Depends(get_task_fields),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    List all tasks with optional filtering and pagination
+
+    Passing order_by or cursor switches from skip/limit to keyset
+    pagination; the cursor for the next page is returned in the
+    X-Next-Cursor header and is absent on the last page.
+
+    With fields (e.g. ?fields=id,title,status) each task holds only those
+    fields, and only those columns are read from the database.
+
+    The ETag covers the id and updated_at of every task on the page, and
+    the fieldset; when it matches If-None-Match the answer is a 304 and
+    the page is not serialized.
+    """
+    fast = settings.FAST_SERIALIZATION
+    # The ETag needs id and updated_at whatever the fieldset
+    columns = fields and (*fields, "id", "updated_at")
+    if order_by is None and cursor is None:
+        tasks = await task_service.get_multi(
+            db, skip=skip, limit=limit, filters=filters, as_rows=fast, fields=columns
+        )
+        next_cursor = None
+    else:
+        try:
+            tasks, next_cursor = await task_service.get_page(
+                db,
+                order_by=order_by or "created_at",
+                cursor=cursor,
+                limit=limit,
+                filters=filters,
+                as_rows=fast,
+                fields=columns,
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    etag = _fieldset_etag(_page_etag(tasks), fields)
+    if etag_matches(if_none_match, etag, weak=True):
+        return _not_modified(etag)
+
+    # Headers set on the injected response would be lost with our own
+    if fields is not None:
+        response = _json_response(task_fields_adapter(fields, many=True), tasks)
+    elif fast:
+        response = _json_response(task_rows_adapter, tasks)
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response if fast or fields is not None else tasks
+
+
+@router.get("/stats", response_model=TaskStats)
+async def get_task_stats(db: AsyncSession = Depends(get_read_db)):
+    """Task counts by status and priority, and recent hourly activity"""
+    return await stats_service.get(db)
+
+
+# Rows per chunk written to an export stream
+EXPORT_BATCH_SIZE = 1000
+
+
+@router.get("/export")
+async def export_tasks(
+    db: AsyncSession = Depends(get_read_db),
+    filters: Dict[str, Any] = Depends(get_task_filters),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """
+    Export all tasks matching the list filters as NDJSON or CSV
+
+    Rows are read through a server-side cursor and written out batch by
+    batch, so memory stays flat regardless of the number of tasks and the
+    first rows are sent before the query has finished.
+    """
+    rows = task_service.stream_rows(db, filters=filters, batch_size=EXPORT_BATCH_SIZE)
+    if format == "csv":
+        body, media_type = _export_csv(rows), "text/csv"
+    else:
+        body, media_type = _export_ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+async def _export_ndjson(rows) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(TaskSchema.model_validate(row).model_dump_json() + "\n")
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "".join(lines)
+            lines.clear()
+    if lines:
+        yield "".join(lines)
+
+
+async def _export_csv(rows) -> AsyncIterator[str]:
+    fields = list(TaskSchema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    async for row in rows:
+        data = TaskSchema.model_validate(row).model_dump(mode="json")
+        writer.writerow([data[field] for field in fields])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/search", response_model=List[TaskSchema])
+async def search_tasks(
+    q: str = Query(..., min_length=1),
+    db: AsyncSession = Depends(get_read_db),
+    skip: int = 0,
+    limit: int = Query(20, le=100),
     status: Optional[str] = None,
     priority: Optional[int] = None,
 ):
-    """List all tasks with optional filtering and pagination"""
+    """Search task titles and descriptions, best matches first"""
     filters = {}
-    if title:
-        filters["title"] = title
     if status:
         filters["status"] = status
     if priority:
         filters["priority"] = priority
-    
-    return await task_service.get_multi(db, skip=skip, limit=limit, filters=filters)
+
+    return await task_service.search(db, q, skip=skip, limit=limit, filters=filters)
 
 
 @router.get("/{task_id}", response_model=TaskWithLogs)
 async def get_task(
-    task: Task = Depends(get_task_by_id),
-    db: AsyncSession = Depends(get_db),
+    task_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    fields: Optional[Tuple[str, ...]] = Depends(get_task_detail_fields),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Get a specific task by ID with its logs"""
-    return await task_service.get_with_logs(db, task.id)
+    """
+    Get a specific task by ID with its most recent logs
+
+    At most TASK_INLINE_LOGS logs are included, oldest first; the full
+    history is at GET /tasks/{task_id}/logs.
+
+    With If-None-Match, the task's version is looked up first and a
+    matching ETag is answered with a 304 without loading the task.
+
+    With fields (e.g. ?fields=id,title,status) only those fields are
+    returned; unless they include logs, only those columns are read. The
+    ETag of such a response is the fieldset's own.
+    """
+    with_logs = fields is None or "logs" in fields
+    if if_none_match:
+        version = await task_service.get_version(db, task_id)
+        if version is None:
+            raise task_not_found(task_id)
+        updated_at, last_log_id = version
+        etag = _fieldset_etag(
+            task_etag(task_id, updated_at, last_log_id if with_logs else None), fields
+        )
+        if etag_matches(if_none_match, etag, weak=True):
+            return _not_modified(etag)
+
+    if not with_logs:
+        row = await task_service.get_fields(db, task_id, (*fields, "id", "updated_at"))
+        if row is None:
+            raise task_not_found(task_id)
+        response = _json_response(task_fields_adapter(fields), row)
+        response.headers["ETag"] = _fieldset_etag(
+            task_etag(task_id, row["updated_at"], None), fields
+        )
+        return response
+
+    task = await task_service.get_with_logs(db, task_id)
+    if task is None:
+        raise task_not_found(task_id)
+    etag = _fieldset_etag(loaded_task_etag(task), fields)
+    if settings.FAST_SERIALIZATION or fields is not None:
+        row = {field: getattr(task, field) for field in TASK_ROW_FIELDS}
+        row["logs"] = [
+            {field: getattr(log, field) for field in TASK_LOG_ROW_FIELDS}
+            for log in task.logs
+        ]
+        if fields is None:
+            adapter = task_with_logs_row_adapter
+        else:
+            adapter = task_fields_adapter(fields)
+        response = _json_response(adapter, row)
+        response.headers["ETag"] = etag
+        return response
+    response.headers["ETag"] = etag
+    return task
 
 
 @router.put("/{task_id}", response_model=TaskSchema)
 async def update_task(
+    task_id: int,
     task_update: TaskUpdate,
-    task: Task = Depends(get_task_by_id),
     db: AsyncSession = Depends(get_db),
+    if_match: Optional[str] = Header(None),
 ):
-    """Update a task"""
-    return await task_service.update(db, db_obj=task, obj_in=task_update)
+    """
+    Update a task
+
+    With If-Match (an ETag from GET /tasks/{task_id}), the update only
+    applies if the task is unchanged since, otherwise the answer is a 412.
+    """
+    try:
+        task = await task_service.update(
+            db, id=task_id, obj_in=task_update, if_match=if_match
+        )
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
+    if task is None:
+        raise task_not_found(task_id)
+    return task
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(
-    task: Task = Depends(get_task_by_id),
-    db: AsyncSession = Depends(get_db),
-):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a task"""
-    await task_service.delete(db, id=task.id)
+    if not await task_service.delete(db, id=task_id):
+        raise task_not_found(task_id)
     return None
 
 
 @router.post("/{task_id}/process", response_model=TaskSchema)
 async def start_processing(
-    background_tasks: BackgroundTasks,
-    task: Task = Depends(get_task_by_id),
+    task_id: int,
     db: AsyncSession = Depends(get_db),
+    with_prerequisites: bool = False,
 ):
-    """Start background processing for a task"""
-    # Update task status to in_progress
-    task_update = TaskUpdate(status="in_progress")
-    updated_task = await task_service.update(db, db_obj=task, obj_in=task_update)
-    
-    # Add the background task
-    background_tasks.add_task(process_task, task.id, db)
-    
-    return updated_task
+    """
+    Start background processing for a task
+
+    Tasks are processed by priority: in queue mode the worker claims the
+    job by priority, in background mode it goes to the API process's
+    scheduler. Either way a priority band only gets its own share of the
+    processing slots, and waiting tasks age into higher priorities.
+
+    A task whose prerequisites have not all completed is marked waiting
+    and starts as soon as they have. with_prerequisites also starts the
+    prerequisites that are not completed or started yet, transitively.
+    """
+    # In queue mode the job is stored with the status change
+    task = await task_service.start_processing(
+        db,
+        id=task_id,
+        enqueue=settings.TASK_EXECUTION_MODE == "queue",
+        with_prerequisites=with_prerequisites,
+    )
+    if task is None:
+        raise task_not_found(task_id)
+    return task
+
+
+@router.get("/{task_id}/dependencies", response_model=List[TaskSchema])
+async def list_task_dependencies(task_id: int, db: AsyncSession = Depends(get_read_db)):
+    """List the tasks a task depends on"""
+    prerequisites = await task_service.get_dependencies(db, task_id)
+    if prerequisites is None:
+        raise task_not_found(task_id)
+    return prerequisites
+
+
+@router.put(
+    "/{task_id}/dependencies/{depends_on_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def add_task_dependency(
+    task_id: int, depends_on_id: int, db: AsyncSession = Depends(get_db)
+):
+    """
+    Make a task depend on another, so it is only processed once the other
+    has completed; a dependency that would close a cycle is a 409
+    """
+    try:
+        added = await task_service.add_dependency(
+            db, task_id=task_id, depends_on_id=depends_on_id
+        )
+    except DependencyCycleError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not added:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task with ID {task_id} or {depends_on_id} not found",
+        )
+    return None
+
+
+@router.delete(
+    "/{task_id}/dependencies/{depends_on_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def remove_task_dependency(
+    task_id: int, depends_on_id: int, db: AsyncSession = Depends(get_db)
+):
+    """Remove a dependency; a task waiting only on it starts"""
+    if not await task_service.remove_dependency(
+        db, task_id=task_id, depends_on_id=depends_on_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task {task_id} does not depend on task {depends_on_id}",
+        )
+    return None
+
+
+@router.get("/{task_id}/logs", response_model=List[TaskLogInDB])
+async def list_task_logs(
+    task_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """
+    List a task's logs, newest first
+
+    Pages are keyset-paginated: the cursor for the next page is returned
+    in the X-Next-Cursor header and is absent on the last page.
+    """
+    fast = settings.FAST_SERIALIZATION
+    try:
+        page = await task_service.get_logs(
+            db, task_id, cursor=cursor, limit=limit, as_rows=fast
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if page is None:
+        raise task_not_found(task_id)
+    logs, next_cursor = page
+
+    if fast:
+        response = _json_response(task_log_rows_adapter, logs)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response if fast else logs
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/{task_id}/events")
+async def stream_task_events(task_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Stream a task's status changes as Server-Sent Events
+
+    The first "status" event carries the current status, read after
+    subscribing so no change can slip in between; every change made
+    through the API or by the worker follows. The read goes to the
+    primary, as a lagging replica could return a status that an event
+    published before the subscription already replaced. Idle streams get
+    a comment every TASK_EVENTS_HEARTBEAT seconds. The database session is released
+    once the current status is read, so open streams hold no connection.
+    """
+    if await task_service.get_status(db, task_id) is None:
+        raise task_not_found(task_id)
+
+    async def stream() -> AsyncIterator[str]:
+        async with task_events.subscribe(task_id) as subscription:
+            current = await task_service.get_status(db, task_id)
+            await db.close()
+            if current is None:
+                return
+            yield _sse("status", {"task_id": task_id, "status": current})
+            async for event in subscription:
+                if event is HEARTBEAT:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _sse("status", event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
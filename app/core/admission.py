@@ -0,0 +1,217 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class AdmissionController:
+    """
+    Decides which requests the API takes on
+
+    Each client gets a token bucket refilled at rate tokens per second, up
+    to burst; a request without a token is rate limited. Admitted requests
+    then need one of max_in_flight slots, sized to the database pool so
+    requests never queue for a connection inside get_db. A request that
+    gets no slot within queue_timeout seconds, or finds max_queue requests
+    already waiting, is shed.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int,
+        queue_timeout: float,
+        max_queue: int,
+        rate: float,
+        burst: int,
+        max_clients: int = 10000,
+        client_header: Optional[str] = None,
+        exempt_paths: Iterable[str] = (),
+        enabled: bool = True,
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.client_header = client_header.lower().encode() if client_header else None
+        self.exempt_paths = frozenset(exempt_paths)
+        self.enabled = enabled
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # client -> (tokens, time of the last refill), least recently seen first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def client_id(self, scope) -> str:
+        """The client a request counts against, its address by default"""
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    # X-Forwarded-For style lists name the origin first
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def take_token(self, client: str) -> Optional[float]:
+        """
+        Spend one of a client's tokens; returns None if it had one,
+        otherwise the seconds until it will
+        """
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = None
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            # Dropping the least recently seen client only refills its bucket
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def acquire(self) -> bool:
+        """Wait up to queue_timeout for an in-flight slot, False if none came"""
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self._took()
+            return True
+        if self.waiting >= self.max_queue or self.queue_timeout <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over by resolving the future
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except BaseException:
+            # Cancelled (e.g. the client left) right after being handed a slot
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        """Give a slot back, to the longest waiting request if any"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        metrics.ADMISSION_IN_FLIGHT.set(value=self.in_flight)
+
+    def _took(self) -> None:
+        self.in_flight += 1
+        metrics.ADMISSION_IN_FLIGHT.set(value=self.in_flight)
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    Rate limit clients and shed load before requests reach the database
+
+    Rate limited requests get a 429, requests shed for lack of an
+    in-flight slot a 503, both with Retry-After. Exempt paths (health
+    checks, metrics) and OPTIONS requests always pass. An event stream
+    gives its slot back as soon as it starts, since it has released its
+    database session by then.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller or admission
+        if (
+            scope["type"] != "http"
+            or not controller.enabled
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in controller.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = controller.take_token(controller.client_id(scope))
+        if retry_after is not None:
+            metrics.ADMISSION_REJECTED.inc("rate_limited")
+            await _reject(send, 429, "Rate limit exceeded", retry_after)
+            return
+        if not await controller.acquire():
+            metrics.ADMISSION_REJECTED.inc("overloaded")
+            await _reject(
+                send, 503, "Server overloaded, retry later", controller.queue_timeout
+            )
+            return
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                controller.release()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(
+                        b"text/event-stream"
+                    ):
+                        release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            release()
+
+
+admission = AdmissionController(
+    # Every admitted request may hold a connection, so admit no more than
+    # the pool can hand out (see app.db.base)
+    max_in_flight=(
+        settings.ADMISSION_MAX_IN_FLIGHT
+        or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    ),
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    client_header=settings.RATE_LIMIT_CLIENT_HEADER,
+    exempt_paths=settings.ADMISSION_EXEMPT_PATHS,
+    enabled=settings.ADMISSION_ENABLED,
+)
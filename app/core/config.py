@@ -1,8 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import ConfigDict
-from dotenv import load_dotenv
-load_dotenv()
 
 
 class Settings(BaseSettings):
@@ -15,7 +13,150 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: str = "5432"
     
+    # python -m app.serve: worker processes (default: one per CPU), and
+    # seconds in-flight requests and then background-mode tasks each get
+    # to finish on shutdown
+    SERVER_WORKERS: Optional[int] = None
+    SHUTDOWN_TIMEOUT: float = 30.0
+
     DATABASE_URL: Optional[str] = None
+    # Optional read replica for read-only endpoints
+    DATABASE_REPLICA_URL: Optional[str] = None
+
+    # Connection pool, applied to the primary and the replica engine
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Connections per engine opened and primed with the hot task queries
+    # on startup, before the app takes traffic (capped at DB_POOL_SIZE)
+    DB_POOL_WARMUP: int = 4
+    # Log every SQL statement
+    DB_ECHO: bool = False
+    # Seconds a client's reads go to the primary after it wrote, so it
+    # sees its own changes despite replication lag
+    DB_READ_YOUR_WRITES_WINDOW: float = 5.0
+
+    # Admission control: requests in flight are capped (by default at
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW), requests beyond the cap wait up to
+    # ADMISSION_QUEUE_TIMEOUT seconds, ADMISSION_MAX_QUEUE of them at most,
+    # then get a 503
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: Optional[int] = None
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_MAX_QUEUE: int = 100
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/metrics"]
+    # Per-client token bucket, 0 disables it; clients over it get a 429.
+    # Clients are told apart by address, or by this header (e.g.
+    # X-Forwarded-For behind a proxy)
+    RATE_LIMIT_PER_SECOND: float = 50.0
+    RATE_LIMIT_BURST: int = 100
+    RATE_LIMIT_CLIENT_HEADER: Optional[str] = None
+
+    # Rows per statement/transaction for the bulk endpoints
+    BULK_CHUNK_SIZE: int = 500
+
+    # Streaming NDJSON import: rows per transaction, longest accepted line
+    # and number of rejected lines reported back
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_MAX_LINE_LENGTH: int = 1024 * 1024
+    IMPORT_MAX_ERRORS: int = 100
+
+    # Task processing: "queue" stores a job for the worker process
+    # (python -m app.tasks.worker), "background" runs it in the API process
+    TASK_EXECUTION_MODE: Literal["queue", "background"] = "queue"
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL: float = 1.0
+    # Processing slots per priority band: at most WORKER_CONCURRENCY tasks
+    # run at once, and at most SCHEDULER_BAND_SLOTS[p] of priority p, so
+    # bulk low-priority work cannot take every slot
+    SCHEDULER_BAND_SLOTS: Dict[int, int] = {1: 2, 2: 2, 3: 3, 4: 4, 5: 4}
+    # Waiting tasks gain one priority level per this many seconds, so low
+    # priorities are delayed but never starved
+    SCHEDULER_AGING_SECONDS: float = 30.0
+    # Seconds a claimed job stays invisible to other workers
+    JOB_VISIBILITY_TIMEOUT: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    # Retry delay is JOB_RETRY_BACKOFF * 2 ** (attempt - 1), capped
+    JOB_RETRY_BACKOFF: float = 5.0
+    JOB_RETRY_BACKOFF_MAX: float = 300.0
+
+    # Hours of activity reported by GET /tasks/stats
+    STATS_ACTIVITY_HOURS: int = 24
+    # Rows each stats counter is spread over; concurrent writers touching
+    # the same counter only wait on each other when they pick the same row
+    STATS_SHARDS: int = 16
+
+    # Most recent logs included in GET /tasks/{id}, the full history is
+    # paged through GET /tasks/{id}/logs
+    TASK_INLINE_LOGS: int = 20
+    # Logs older than this many days are removed (or archived) by
+    # python -m app.tasks.log_retention; keep it above STATS_ACTIVITY_HOURS
+    # so a stats rebuild still finds the activity it reports
+    TASK_LOG_RETENTION_DAYS: int = 90
+    # Logs deleted per transaction by the retention job
+    TASK_LOG_RETENTION_BATCH_SIZE: int = 1000
+    # Tasks in these statuses not updated for this many days are removed
+    # (or archived) with their logs by python -m app.tasks.task_retention,
+    # batch_size ids at a time with a pause in seconds between batches
+    TASK_RETENTION_DAYS: int = 30
+    TASK_RETENTION_STATUSES: List[str] = ["completed", "failed"]
+    TASK_RETENTION_BATCH_SIZE: int = 500
+    TASK_RETENTION_PAUSE: float = 0.5
+
+    # Notifications are POSTed to this webhook in batches, or logged if unset
+    NOTIFICATION_WEBHOOK_URL: Optional[str] = None
+    NOTIFICATION_TIMEOUT: float = 10.0
+    # Pending notifications beyond this many are dropped
+    NOTIFICATION_QUEUE_SIZE: int = 1000
+    # Concurrent deliveries, also the webhook connection pool size
+    NOTIFICATION_CONCURRENCY: int = 4
+    # A batch closes after this many messages or seconds
+    NOTIFICATION_BATCH_SIZE: int = 50
+    NOTIFICATION_BATCH_WINDOW: float = 0.5
+    # Retry delay is NOTIFICATION_RETRY_BACKOFF * 2 ** (attempt - 1), capped
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BACKOFF: float = 1.0
+    NOTIFICATION_RETRY_BACKOFF_MAX: float = 60.0
+    # Seconds shutdown waits for pending notifications
+    NOTIFICATION_DRAIN_TIMEOUT: float = 10.0
+
+    # Read-through cache for single-task lookups
+    TASK_CACHE_ENABLED: bool = True
+    TASK_CACHE_MAX_SIZE: int = 10000
+    TASK_CACHE_TTL: float = 30.0
+    # Shared second-level cache, "local" is an in-process stand-in
+    TASK_CACHE_SHARED_BACKEND: Optional[str] = None
+
+    # Concurrent identical reads share one database call; with a grace
+    # period its result also serves reads arriving up to that many seconds
+    # later (list results may then be that stale)
+    SINGLEFLIGHT_ENABLED: bool = True
+    SINGLEFLIGHT_GRACE: float = 0.0
+
+    # Task status change feed (GET /tasks/{id}/events). "postgres" relays
+    # changes between processes, the worker's included, with LISTEN/NOTIFY;
+    # "local" only sees changes made by this process. Defaults to "postgres"
+    # when DATABASE_URL is a Postgres database
+    TASK_EVENTS_BACKEND: Optional[Literal["local", "postgres"]] = None
+    # Events buffered per subscriber before the oldest are dropped
+    TASK_EVENTS_QUEUE_SIZE: int = 16
+    # Seconds between keep-alives on idle streams
+    TASK_EVENTS_HEARTBEAT: float = 15.0
+
+    # Serialize task list/detail responses from plain rows with a cached
+    # TypeAdapter instead of validating a response model per object
+    FAST_SERIALIZATION: bool = True
+
+    # Prometheus metrics at GET /metrics, with per-request and per-query
+    # instrumentation
+    METRICS_ENABLED: bool = True
+    # Directory where each server process saves its samples every
+    # METRICS_WRITE_INTERVAL seconds, so a scrape of any of them returns all
+    # of them. app.serve uses a temporary one when unset
+    METRICS_MULTIPROCESS_DIR: Optional[str] = None
+    METRICS_WRITE_INTERVAL: float = 5.0
     
     model_config = ConfigDict(
         env_file=".env",
@@ -29,6 +170,10 @@ class Settings(BaseSettings):
                 f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
                 f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
             )
+        if self.TASK_EVENTS_BACKEND is None:
+            self.TASK_EVENTS_BACKEND = (
+                "postgres" if self.DATABASE_URL.startswith("postgresql") else "local"
+            )
 
 
 settings = Settings()
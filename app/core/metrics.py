@@ -0,0 +1,411 @@
+"""
+Minimal Prometheus-compatible metrics
+
+Metrics live in a process-wide registry and are rendered in the Prometheus
+text exposition format by GET /metrics (and by the worker's --metrics-port
+listener). Updates are plain in-memory arithmetic, so instrumenting a hot
+path costs a few dictionary operations.
+
+When several server processes share a port, each one also writes its
+samples to METRICS_MULTIPROCESS_DIR, and whichever process answers a scrape
+renders all of them, labelled by worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _add_label(sample: str, name: str, value: str) -> str:
+    """Prepend a label to a rendered sample line"""
+    label = f'{name}="{_escape(value)}"'
+    end = len(sample.partition(" ")[0].partition("{")[0])
+    if sample[end] == "{":
+        return f"{sample[:end]}{{{label},{sample[end + 1:]}"
+    return f"{sample[:end]}{{{label}}}{sample[end:]}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, samples: Optional[List[str]] = None) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type}",
+            *(self.samples() if samples is None else samples),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down
+
+    Pass collect to read the values at scrape time instead, as a mapping
+    of label values to value.
+    """
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+    def samples(self) -> List[str]:
+        if self.collect is not None:
+            self.values = dict(self.collect())
+        return super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket]
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, counts in self.counts.items():
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labels + ("le",), labels + (bound,)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_str = _format_labels(self.labels, labels)
+            total = _format_value(self.sums[labels])
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def write_samples(self, directory: str) -> None:
+        """Save this process's samples for render_processes, atomically"""
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        samples = {name: metric.samples() for name, metric in self.metrics.items()}
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(samples, f)
+        os.replace(f"{path}.tmp", path)
+
+    def render_processes(self, directory: str) -> str:
+        """
+        Render the samples every process saved to directory, this one's
+        current, each with a worker label holding the process id
+        """
+        self.write_samples(directory)
+        merged: Dict[str, List[str]] = {name: [] for name in self.metrics}
+        for filename in sorted(os.listdir(directory)):
+            worker, extension = os.path.splitext(filename)
+            if extension != ".json":
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    samples = json.load(f)
+            except (OSError, ValueError):
+                # The process exited and its file was removed meanwhile
+                continue
+            for name, lines in samples.items():
+                if name in merged:
+                    merged[name].extend(
+                        _add_label(line, "worker", worker) for line in lines
+                    )
+        rendered = (
+            metric.render(merged[name]) for name, metric in self.metrics.items()
+        )
+        return "\n".join(rendered) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+))
+HTTP_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+))
+HTTP_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries",
+    "Database queries issued per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 5, 10, 20, 50),
+))
+HTTP_DB_DURATION = registry.register(Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per HTTP request",
+    ["route"],
+))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "Database queries", ["engine"]
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Database query latency", ["engine"]
+))
+TASKS_IN_FLIGHT = registry.register(Gauge(
+    "task_processing_in_flight", "Tasks being processed"
+))
+TASK_DURATION = registry.register(Histogram(
+    "task_processing_duration_seconds",
+    "Task processing time",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+))
+TASK_FAILURES = registry.register(Counter(
+    "task_processing_failures_total", "Task processing attempts that raised"
+))
+SCHEDULER_WAITING = registry.register(Gauge(
+    "task_scheduler_waiting",
+    "Tasks waiting for a processing slot, by priority band",
+    ["priority"],
+))
+SCHEDULER_RUNNING = registry.register(Gauge(
+    "task_scheduler_running", "Tasks being processed, by priority band", ["priority"]
+))
+SCHEDULER_WAIT = registry.register(Histogram(
+    "task_scheduler_wait_seconds",
+    "Time from queueing a task to the start of its processing, by priority band",
+    ["priority"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+))
+JOB_QUEUE_DEPTH = registry.register(Gauge(
+    "job_queue_depth", "Queued jobs in the job table, by priority band", ["priority"]
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight", "Requests holding an admission slot"
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total",
+    "Requests turned away, rate_limited (429) or overloaded (503)",
+    ["reason"],
+))
+APP_STARTUP = registry.register(Gauge(
+    "app_startup_seconds",
+    "Time to import the app and to run its startup (pool warm-up), by phase",
+    ["phase"],
+))
+
+# [query count, seconds in queries] for the HTTP request being served
+_request_db_stats: ContextVar[Optional[List]] = ContextVar(
+    "request_db_stats", default=None
+)
+
+# Pools of the instrumented engines, by engine label
+_pools: Dict[str, object] = {}
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Count and time the queries of an engine, and export its pool usage"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # A connection runs one statement at a time, so a single start time
+        # is enough; one left behind by a failed statement is overwritten
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start")
+        DB_QUERIES.inc(name)
+        DB_QUERY_DURATION.observe(name, value=elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    _pools[name] = sync_engine.pool
+
+
+def _pool_stat(attribute: str) -> Dict[LabelValues, float]:
+    values = {}
+    for name, pool in _pools.items():
+        # Only queue-based pools track usage
+        stat = getattr(pool, attribute, None)
+        if stat is not None:
+            values[(name,)] = stat()
+    return values
+
+
+registry.register(Gauge(
+    "db_pool_checked_out",
+    "Connections checked out of the pool",
+    ["engine"],
+    collect=lambda: _pool_stat("checkedout"),
+))
+registry.register(Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size (negative while below it)",
+    ["engine"],
+    collect=lambda: _pool_stat("overflow"),
+))
+
+
+class MetricsMiddleware:
+    """Record latency, status and database usage of every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        db_stats = [0, 0.0]
+        token = _request_db_stats.set(db_stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db_stats.reset(token)
+            # The route template, not the raw path, keeps label sets bounded
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status[0]))
+            HTTP_DURATION.observe(method, route, value=elapsed)
+            HTTP_DB_QUERIES.observe(route, value=db_stats[0])
+            HTTP_DB_DURATION.observe(route, value=db_stats[1])
+
+
+async def write_samples_periodically(directory: str, interval: float) -> None:
+    """Keep this process's samples in directory up to date for other processes"""
+    while True:
+        try:
+            registry.write_samples(directory)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics to {directory}: {e}")
+        await asyncio.sleep(interval)
+
+
+async def serve(port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+    """
+    Serve the registry over plain HTTP, for processes without an ASGI app
+    such as the worker
+
+    Every request gets the metrics, whatever its path.
+    """
+
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = registry.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                + f"Content-Type: {CONTENT_TYPE}\r\n".encode()
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
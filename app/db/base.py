@@ -1,17 +1,138 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import math
+import time
+from typing import Optional
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from sqlalchemy import DateTime, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.functions import FunctionElement
 
+from app.core import metrics
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+
+def enforce_foreign_keys(engine) -> None:
+    """
+    Turn on foreign key enforcement for an SQLite engine's connections
+
+    SQLite ignores foreign keys, ON DELETE CASCADE included, unless every
+    connection enables them; other databases always enforce them.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _create_engine(url: str):
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    enforce_foreign_keys(engine)
+    return engine
+
+
+# Created by init_engines(), from the app's lifespan or on first use, so
+# importing the app opens nothing and forked workers start with empty pools
+engine: Optional[AsyncEngine] = None
+replica_engine: Optional[AsyncEngine] = None
+
+_primary_sessions = sessionmaker(class_=AsyncSession, expire_on_commit=False)
+_read_sessions = sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+
+def init_engines() -> None:
+    """Create the primary and replica engines, once per process"""
+    global engine, replica_engine
+    if engine is not None:
+        return
+    engine = _create_engine(settings.DATABASE_URL)
+    # Without a replica, reads use the primary
+    replica_engine = (
+        _create_engine(settings.DATABASE_REPLICA_URL)
+        if settings.DATABASE_REPLICA_URL
+        else engine
+    )
+    _primary_sessions.configure(bind=engine)
+    _read_sessions.configure(bind=replica_engine)
+
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(engine, "primary")
+        if replica_engine is not engine:
+            metrics.instrument_engine(replica_engine, "replica")
+
+
+def async_session(**kwargs) -> AsyncSession:
+    """A session on the primary"""
+    init_engines()
+    return _primary_sessions(**kwargs)
+
+
+def read_session(**kwargs) -> AsyncSession:
+    """
+    A session on the read replica, or the primary without one; replica
+    sessions are flagged with "replica" in session.info
+    """
+    init_engines()
+    if replica_engine is not engine:
+        kwargs["info"] = {**kwargs.get("info", {}), "replica": True}
+    return _read_sessions(**kwargs)
+
+
+async def dispose_engines() -> None:
+    """Close the pooled connections of the primary and replica engines"""
+    global engine, replica_engine
+    if engine is None:
+        return
+    await engine.dispose()
+    if replica_engine is not engine:
+        await replica_engine.dispose()
+    engine = replica_engine = None
+
+
+# Set on responses to writes; holds the time until which the client's reads
+# go to the primary
+READ_YOUR_WRITES_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
 
 Base = declarative_base()
 
 
+class utcnow(FunctionElement):
+    """Current timestamp, rendered so it compares correctly with bound datetimes"""
+
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    return "now()"
+
+
+@compiles(utcnow, "sqlite")
+def _compile_utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP has no fractional part, while SQLAlchemy binds
+    # datetimes as "YYYY-MM-DD HH:MM:SS.ffffff"; match that format so range
+    # comparisons on timestamp columns behave the same as on Postgres.
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
 async def get_db():
     """Dependency for getting async DB session"""
     async with async_session() as session:
@@ -23,3 +144,56 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client wrote within the read-your-writes window"""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request):
+    """
+    Dependency for getting an async DB session for read-only endpoints
+
+    Uses the read replica, unless the client wrote within the
+    read-your-writes window; such sessions are flagged in session.info so
+    services can bypass caches that may still hold older data.
+    """
+    if wrote_recently(request):
+        session = async_session(info={"read_your_writes": True})
+    else:
+        session = read_session()
+    async with session:
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """
+    Mark clients that just wrote so their reads go to the primary
+
+    Successful responses to unsafe methods set a cookie holding the end of
+    the read-your-writes window, checked by get_read_db.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.DB_READ_YOUR_WRITES_WINDOW
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + window}; "
+                    f"HttpOnly; Max-Age={math.ceil(window)}; Path=/; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,90 @@
+"""
+Connection pool warm-up
+
+Run from the app's lifespan before it takes traffic. Opening a connection
+costs a TCP and TLS handshake plus authentication, and asyncpg prepares
+each statement the first time a connection runs it, so a cold pool makes
+the first requests after a start pay for all of that. Warming opens a
+number of pooled connections up front and runs the hot task reads on each
+of them, which also fills SQLAlchemy's compiled statement cache.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.db import base
+from app.services.task import task_service
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_hot_queries(db: AsyncSession) -> None:
+    # The reads behind GET /tasks/, GET /tasks/{id} (with its ETag check)
+    # and the status polls, as the endpoints issue them. Looking up a task
+    # id that never exists keeps the warm-up free of side effects.
+    await task_service.get_page(db, as_rows=True)
+    await task_service.get_multi(db, as_rows=True)
+    await task_service.get_version(db, 0)
+    await task_service.get_with_logs(db, 0)
+    await task_service.get_status(db, 0)
+
+
+async def _warm_engine(engine: AsyncEngine, connections: int) -> int:
+    """Open and warm that many of an engine's connections, returns how many"""
+    all_open = asyncio.Event()
+    opened = 0
+
+    async def warm() -> None:
+        nonlocal opened
+        try:
+            async with engine.connect() as conn:
+                # Flagged like a read-your-writes session, so every
+                # connection runs the queries itself instead of sharing a
+                # coalesced result
+                async with AsyncSession(
+                    bind=conn, info={"read_your_writes": True}
+                ) as db:
+                    await _run_hot_queries(db)
+                opened += 1
+                if opened == connections:
+                    all_open.set()
+                # Hold the connection until all are open, otherwise the pool
+                # would hand the same one out again
+                await all_open.wait()
+        except BaseException:
+            all_open.set()
+            raise
+
+    results = await asyncio.gather(
+        *(warm() for _ in range(connections)), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning(
+            f"Warmed {connections - len(errors)} of {connections} connections "
+            f"to {engine.url.render_as_string(hide_password=True)}: {errors[0]}"
+        )
+    return connections - len(errors)
+
+
+async def warm_up(connections: Optional[int] = None) -> int:
+    """
+    Open up to connections (default DB_POOL_WARMUP) pooled connections on
+    the primary and on the replica and run the hot queries on each.
+    Returns the number of connections warmed; failures are logged, not
+    raised, so the app still starts while the database is unreachable.
+    """
+    connections = min(
+        settings.DB_POOL_WARMUP if connections is None else connections,
+        settings.DB_POOL_SIZE,
+    )
+    if connections <= 0:
+        return 0
+    base.init_engines()
+    warmed = 0
+    for engine in {base.engine, base.replica_engine}:
+        warmed += await _warm_engine(engine, connections)
+    return warmed
@@ -1,22 +1,94 @@
+import time
+
+# Taken before the app's own imports, to report how long loading it takes
+_import_started = time.perf_counter()
+
+import asyncio
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api import api_router
+from app.core import metrics
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
+from app.db.base import ReadYourWritesMiddleware, dispose_engines, init_engines
+from app.db.warmup import warm_up
+from app.services.task import task_cache, task_events, task_reads
+from app.tasks.scheduler import task_scheduler
+from app.utils.notifications import notifications
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the database engines and warm their pools on startup, release
+    shared resources on shutdown
+    """
+    started = time.perf_counter()
+    if (
+        settings.TASK_EXECUTION_MODE == "queue"
+        and settings.TASK_EVENTS_BACKEND == "local"
+    ):
+        logger.warning(
+            "TASK_EVENTS_BACKEND is local while the worker processes tasks, so "
+            "event stream subscribers will not see processing status changes"
+        )
+    init_engines()
+    warmed = await warm_up()
+    startup_seconds = time.perf_counter() - started
+    metrics.APP_STARTUP.set("import", value=import_seconds)
+    metrics.APP_STARTUP.set("lifespan", value=startup_seconds)
+    logger.info(
+        f"Ready: imported in {import_seconds:.3f}s, started in "
+        f"{startup_seconds:.3f}s with {warmed} warm database connections"
+    )
+    writer = None
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROCESS_DIR:
+        writer = asyncio.create_task(metrics.write_samples_periodically(
+            settings.METRICS_MULTIPROCESS_DIR, settings.METRICS_WRITE_INTERVAL
+        ))
+    yield
+    if writer is not None:
+        writer.cancel()
+    # Let tasks processing in background mode finish
+    join = asyncio.ensure_future(task_scheduler.join())
+    done, _ = await asyncio.wait({join}, timeout=settings.SHUTDOWN_TIMEOUT)
+    if not done:
+        logger.warning(
+            f"Cancelling {task_scheduler.running + task_scheduler.waiting} "
+            f"background tasks still running after {settings.SHUTDOWN_TIMEOUT}s"
+        )
+        join.cancel()
+    await notifications.drain(settings.NOTIFICATION_DRAIN_TIMEOUT)
+    await task_events.stop()
+    await task_cache.stop()
+    await dispose_engines()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
-# Set up CORS
+# Route a client's reads to the primary right after it writes
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Shed load before requests queue for a database connection
+app.add_middleware(AdmissionMiddleware)
+
+# Set up CORS, outside admission so 429 and 503 responses carry the CORS
+# headers and preflights are answered without spending a token or a slot
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, replace with specific origins
@@ -25,6 +97,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latency covers the other middleware too
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -39,6 +115,33 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters of the task cache, for sizing it, and how many reads
+    led or shared a coalesced database call
+    """
+    return {**task_cache.stats(), "singleflight": task_reads.stats()}
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """
+        Metrics in the Prometheus text exposition format, of every server
+        process when they share METRICS_MULTIPROCESS_DIR
+        """
+        if settings.METRICS_MULTIPROCESS_DIR:
+            body = metrics.registry.render_processes(settings.METRICS_MULTIPROCESS_DIR)
+        else:
+            body = metrics.registry.render()
+        return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+# Reported on startup, see lifespan
+import_seconds = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,46 @@
+from sqlalchemy import (
+    Column, Integer, Float, String, Text, DateTime, ForeignKey, Index
+)
+
+from app.db.base import Base, utcnow
+
+
+class Job(Base):
+    """
+    A durable unit of background work for a task
+
+    status is one of queued, running, done or failed. run_at is the time the
+    job becomes claimable: for queued jobs the (possibly backed off) start
+    time, for running jobs the end of the worker's lease, after which
+    another worker may reclaim it.
+
+    priority is the task's priority when the job was queued and queued_at
+    the time it last became due; rank orders claimable jobs by priority
+    with aging, see app.tasks.scheduler.rank.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False
+    )
+    status = Column(String(50), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    priority = Column(Integer, nullable=False, default=1)
+    queued_at = Column(DateTime(timezone=True), nullable=False)
+    rank = Column(Float, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String(255), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=utcnow())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=utcnow(),
+        onupdate=utcnow()
+    )
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_status_rank", "status", "rank"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.db.base import Base
+
+
+class TaskCount(Base):
+    """
+    Number of tasks per (status, priority), maintained by StatsService
+
+    Each counter is spread over STATS_SHARDS rows told apart by shard;
+    its value is their sum.
+    """
+    __tablename__ = "task_counts"
+
+    status = Column(String(50), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class TaskActivity(Base):
+    """
+    Hourly event counters: "created", or the status a task moved into
+
+    Sharded like TaskCount.
+    """
+    __tablename__ = "task_activity"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    event = Column(String(50), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import (
+    DDL, Column, Integer, String, Text, DateTime, ForeignKey, Index, event
+)
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base import Base, utcnow
 
 
 class Task(Base):
@@ -12,22 +14,124 @@ class Task(Base):
     description = Column(Text, nullable=True)
     status = Column(String(50), nullable=False, default="pending")
     priority = Column(Integer, nullable=False, default=1)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=utcnow())
     updated_at = Column(
-        DateTime(timezone=True), 
-        server_default=func.now(), 
-        onupdate=func.now()
+        DateTime(timezone=True),
+        server_default=utcnow(),
+        onupdate=utcnow()
+    )
+
+    logs = relationship(
+        "TaskLog",
+        back_populates="task",
+        cascade="all, delete-orphan",
+        # Logs are removed by ON DELETE CASCADE, also for Core deletes
+        passive_deletes=True,
+        order_by="TaskLog.id",
+    )
+
+    __table_args__ = (
+        # Keyset pagination indexes, see TaskService.get_page
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_priority_id", "priority", "id"),
     )
-    
-    logs = relationship("TaskLog", back_populates="task", cascade="all, delete-orphan")
 
 
 class TaskLog(Base):
     __tablename__ = "task_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"))
     status = Column(String(50), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    
+    created_at = Column(DateTime(timezone=True), server_default=utcnow())
+
     task = relationship("Task", back_populates="logs")
+
+    __table_args__ = (
+        # A task's logs in order, see TaskService.get_logs/get_with_logs;
+        # also serves the foreign key when tasks are deleted
+        Index("ix_task_logs_task_id_id", "task_id", "id"),
+        # Finds logs past retention, see TaskService.purge_logs
+        Index("ix_task_logs_created_at", "created_at"),
+    )
+
+
+class TaskDependency(Base):
+    """
+    An edge of the task dependency graph: task_id may only be processed
+    once depends_on_id has completed. The graph is kept acyclic, see
+    TaskService.add_dependency.
+    """
+    __tablename__ = "task_dependencies"
+
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True
+    )
+    depends_on_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(DateTime(timezone=True), server_default=utcnow())
+
+    __table_args__ = (
+        # The primary key finds a task's prerequisites, this its dependents
+        Index("ix_task_dependencies_depends_on_id", "depends_on_id", "task_id"),
+    )
+
+
+# Full-text search over title and description, see TaskService.search. The
+# index structures differ per database, so they are created with DDL rather
+# than mapped: a generated tsvector column with a GIN index on Postgres, an
+# external-content FTS5 table kept in sync by triggers on SQLite. The same
+# statements are applied to existing databases by a migration.
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE tasks ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks
+        BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Task.__table__, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(
+    Task.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
@@ -1,10 +1,13 @@
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, ConfigDict, Field
+from functools import lru_cache
+from typing import Dict, Optional, List, Tuple
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+from typing_extensions import TypedDict
 
 
 class TaskBase(BaseModel):
-    title: str
+    # The column is VARCHAR(255)
+    title: str = Field(max_length=255)
     description: Optional[str] = None
     priority: int = Field(1, ge=1, le=5, description="Priority from 1 (low) to 5 (high)")
 
@@ -14,11 +17,65 @@ class TaskCreate(TaskBase):
 
 
 class TaskUpdate(BaseModel):
-    title: Optional[str] = None
+    title: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
     status: Optional[str] = None
     priority: Optional[int] = Field(None, ge=1, le=5)
 
+    @field_validator("title", "status", "priority")
+    @classmethod
+    def not_null(cls, value):
+        # Omitted means unchanged; the columns are NOT NULL, so an explicit
+        # null is rejected here rather than by the database
+        if value is None:
+            raise ValueError("may be omitted, but not null")
+        return value
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportSummary(BaseModel):
+    accepted: int = 0
+    rejected: int = 0
+    # The first IMPORT_MAX_ERRORS rejected lines
+    errors: List[ImportLineError] = []
+
+
+class ActivityBucket(BaseModel):
+    bucket: datetime
+    events: Dict[str, int]
+
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[int, int]
+    # Hourly counts of created tasks and of tasks entering each status
+    activity: List[ActivityBucket]
+
 
 class TaskInDBBase(TaskBase):
     id: int
@@ -55,3 +112,51 @@ class TaskLogInDB(TaskLogBase):
 
 # Update forward references
 TaskWithLogs.model_rebuild()
+
+
+# Plain-dict mirrors of Task and TaskWithLogs, used by the fast
+# serialization mode (settings.FAST_SERIALIZATION) to dump database rows
+# straight to JSON bytes, skipping model validation. Keys must be in the
+# order of the model fields, which keeps the output byte-identical.
+class TaskLogRow(TypedDict):
+    status: str
+    id: int
+    task_id: int
+    created_at: datetime
+
+
+class TaskRow(TypedDict):
+    title: str
+    description: Optional[str]
+    priority: int
+    id: int
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class TaskWithLogsRow(TaskRow):
+    logs: List[TaskLogRow]
+
+
+TASK_ROW_FIELDS = tuple(TaskRow.__annotations__)
+TASK_LOG_ROW_FIELDS = tuple(TaskLogRow.__annotations__)
+
+# Built once, the schema compilation is the expensive part
+task_rows_adapter = TypeAdapter(List[TaskRow])
+task_log_rows_adapter = TypeAdapter(List[TaskLogRow])
+task_with_logs_row_adapter = TypeAdapter(TaskWithLogsRow)
+
+
+@lru_cache(maxsize=256)
+def task_fields_adapter(fields: Tuple[str, ...], many: bool = False) -> TypeAdapter:
+    """
+    Adapter dumping task rows reduced to a sparse fieldset, fields of
+    TaskWithLogsRow in its order; built once per fieldset. Keys of a row
+    outside the fieldset are left out of the output.
+    """
+    row = TypedDict(
+        "TaskFieldsRow",
+        {field: TaskWithLogsRow.__annotations__[field] for field in fields},
+    )
+    return TypeAdapter(List[row] if many else row)
@@ -0,0 +1,197 @@
+"""
+Production server
+
+Imports the app and binds the listening socket once, then forks worker
+processes that all accept on that socket, so startup cost is paid once and
+every core is used. Workers that die are replaced. Workers save their
+metrics to a shared directory, so GET /metrics on any of them reports all.
+
+On SIGTERM or SIGINT each worker stops accepting connections, finishes
+in-flight requests, then runs the app's shutdown: background-mode tasks
+get SHUTDOWN_TIMEOUT seconds to finish, notifications are flushed and the
+database pools disposed. Workers still running after the deadline are
+killed.
+
+    python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.serve")
+
+# A worker exiting sooner than this after its start is treated as a crash
+# loop and restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, args) -> None:
+    """
+    Run one worker process on the shared socket until it is told to stop
+
+    The app's lifespan creates the worker's own database engines and warms
+    their pools before it accepts connections.
+    """
+    config = uvicorn.Config(
+        app,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=args.proxy_headers,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        lifespan="on",
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks the workers, replaces the ones that die and stops them all on a signal"""
+
+    def __init__(self, app, sock: socket.socket, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # The worker handles its own signals through uvicorn
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                _serve(self.app, self.sock, self.args)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def forget_metrics(self, pid: int) -> None:
+        # A replacement worker starts its counters from zero under a new pid
+        directory = settings.METRICS_MULTIPROCESS_DIR
+        if directory:
+            try:
+                os.remove(os.path.join(directory, f"{pid}.json"))
+            except FileNotFoundError:
+                pass
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Received {signal.Signals(signum).name}, stopping workers")
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        # Requests, then background jobs and notifications get their time,
+        # plus a margin for the rest of the shutdown
+        deadline = None
+        grace = (
+            self.args.graceful_timeout
+            + settings.SHUTDOWN_TIMEOUT
+            + settings.NOTIFICATION_DRAIN_TIMEOUT
+            + 5
+        )
+        while self.workers:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + grace
+            if deadline is not None and time.monotonic() > deadline:
+                for pid in self.workers:
+                    logger.warning(f"Worker {pid} did not stop in time, killing it")
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float("inf")
+
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+            started = self.workers.pop(pid, None)
+            self.forget_metrics(pid)
+            if started is None or self.stopping:
+                continue
+            logger.warning(
+                f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}"
+            )
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+        logger.info("All workers stopped")
+
+
+def main(args) -> None:
+    # Imported before forking, so workers share the loaded code
+    from app.main import app
+
+    sock = _bind(args.host, args.port, args.backlog)
+    logger.info(
+        f"Listening on {args.host}:{args.port} with {args.workers} workers"
+    )
+    # Set before forking, so every worker writes to and reads from it
+    metrics_dir = None
+    if settings.METRICS_ENABLED and not settings.METRICS_MULTIPROCESS_DIR:
+        metrics_dir = tempfile.mkdtemp(prefix="task-api-metrics-")
+        settings.METRICS_MULTIPROCESS_DIR = metrics_dir
+    try:
+        Supervisor(app, sock, args).run()
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Run the API with worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count() or 1
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument(
+        "--graceful-timeout", type=float, default=settings.SHUTDOWN_TIMEOUT,
+        help="seconds in-flight requests get to finish on shutdown",
+    )
+    parser.add_argument(
+        "--proxy-headers", action="store_true",
+        help="trust X-Forwarded-For/-Proto from --forwarded-allow-ips",
+    )
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1")
+    main(parser.parse_args())
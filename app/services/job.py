@@ -0,0 +1,202 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job
+from app.tasks.scheduler import rank
+
+# Jobs in these states are claimable once run_at has passed: queued jobs
+# when due, running jobs when their worker's lease has expired, as long as
+# they have attempts left. Running jobs whose lease expired on their last
+# attempt are failed by JobService.fail_expired instead.
+CLAIMABLE_STATUSES = ("queued", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _rank(priority: int, queued_at: datetime) -> float:
+    return rank(priority, queued_at.timestamp(), settings.SCHEDULER_AGING_SECONDS)
+
+
+class JobService:
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        task_id: int,
+        max_attempts: Optional[int] = None,
+        priority: int = 1,
+    ) -> Job:
+        """
+        Queue a processing job for a task at the task's priority
+
+        The job is flushed but not committed, so it becomes visible to
+        workers together with the rest of the caller's transaction.
+        """
+        now = _now()
+        db_obj = Job(
+            task_id=task_id,
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            priority=priority,
+            queued_at=now,
+            rank=_rank(priority, now),
+            run_at=now,
+        )
+        db.add(db_obj)
+        await db.flush()
+        return db_obj
+
+    async def claim(
+        self,
+        db: AsyncSession,
+        *,
+        worker_id: str,
+        limit: int,
+        visibility_timeout: Optional[int] = None,
+        exclude_priorities: Collection[int] = (),
+    ) -> List[Job]:
+        """
+        Claim up to limit due jobs for a worker, by priority with aging
+
+        Jobs of exclude_priorities are left for later, for bands whose
+        processing slots are all taken.
+
+        A single UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED)
+        marks the jobs running and leases them until the visibility timeout,
+        so concurrent workers never block on or double-claim the same rows.
+        SQLite has no row locks and ignores FOR UPDATE, but serializes
+        writers, so the same statement is safe there too.
+        """
+        now = _now()
+        timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+        due = (
+            select(Job.id)
+            .where(
+                Job.status.in_(CLAIMABLE_STATUSES),
+                Job.run_at <= now,
+                # Always true of queued jobs, fail() only requeues those
+                # with attempts left
+                Job.attempts < Job.max_attempts,
+            )
+            .order_by(Job.rank, Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if exclude_priorities:
+            due = due.where(Job.priority.notin_(exclude_priorities))
+        stmt = (
+            update(Job)
+            .where(Job.id.in_(due.scalar_subquery()))
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                locked_by=worker_id,
+                run_at=now + timedelta(seconds=timeout),
+            )
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        jobs = result.scalars().all()
+        await db.commit()
+        return jobs
+
+    async def fail_expired(self, db: AsyncSession) -> List[int]:
+        """
+        Fail running jobs whose lease expired on their last attempt
+
+        Their worker died or hung, and claim() no longer hands them out.
+        Returns the ids of their tasks, which the caller marks failed.
+        """
+        stmt = (
+            update(Job)
+            .where(
+                Job.status == "running",
+                Job.run_at <= _now(),
+                Job.attempts >= Job.max_attempts,
+            )
+            .values(
+                status="failed",
+                locked_by=None,
+                last_error="Lease expired on the last attempt",
+            )
+            .returning(Job.task_id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        task_ids = result.scalars().all()
+        await db.commit()
+        return task_ids
+
+    async def complete(self, db: AsyncSession, *, job: Job) -> None:
+        """Mark a job as done"""
+        await self._finish(db, job, status="done")
+
+    async def fail(self, db: AsyncSession, *, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt
+
+        The job is requeued with exponential backoff while it has attempts
+        left. Returns True when it has failed permanently.
+        """
+        if job.attempts < job.max_attempts:
+            delay = min(
+                settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1),
+                settings.JOB_RETRY_BACKOFF_MAX,
+            )
+            # Jitter spreads out retries of jobs that failed together
+            delay *= random.uniform(0.8, 1.2)
+            run_at = _now() + timedelta(seconds=delay)
+            await self._finish(
+                db, job, status="queued", error=error, run_at=run_at,
+                queued_at=run_at, rank=_rank(job.priority, run_at),
+            )
+            return False
+
+        await self._finish(db, job, status="failed", error=error)
+        return True
+
+    async def _finish(
+        self,
+        db: AsyncSession,
+        job: Job,
+        *,
+        status: str,
+        error: Optional[str] = None,
+        **requeue,
+    ) -> None:
+        values = {"status": status, "locked_by": None, "last_error": error}
+        values.update(requeue)
+        # Only the worker still holding the lease may settle the job; if the
+        # lease expired and another worker reclaimed it, this is a no-op.
+        stmt = (
+            update(Job)
+            .where(
+                Job.id == job.id,
+                Job.status == "running",
+                Job.locked_by == job.locked_by,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+    async def queue_depth(self, db: AsyncSession) -> Dict[int, int]:
+        """Number of queued jobs (due or backing off) per priority"""
+        result = await db.execute(
+            select(Job.priority, func.count())
+            .where(Job.status == "queued")
+            .group_by(Job.priority)
+        )
+        return dict(result.all())
+
+
+job_service = JobService()
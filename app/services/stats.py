@@ -0,0 +1,169 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.stats import TaskActivity, TaskCount
+from app.models.task import Task, TaskLog
+
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class StatsService:
+    """
+    Task counters kept up to date incrementally
+
+    Writers call apply() in the same transaction as their change, so the
+    counters commit or roll back with it and GET /tasks/stats only reads a
+    handful of summary rows instead of scanning tasks.
+
+    An upsert holds its counter row locked until the writer commits, so
+    with one row per counter every transaction creating a pending task
+    would queue behind the last. Each counter is therefore spread over
+    STATS_SHARDS rows, apply() adds to a random one and get() sums them:
+    writers only collide when they pick the same shard, at the price of
+    reading up to STATS_SHARDS times as many (still few) rows.
+    """
+
+    async def apply(
+        self,
+        db: AsyncSession,
+        *,
+        added: Iterable[Tuple[str, int]] = (),
+        removed: Iterable[Tuple[str, int]] = (),
+        events: Iterable[str] = (),
+    ) -> None:
+        """
+        Record tasks entering and leaving (status, priority) pairs, and
+        activity events ("created" or the status a task moved into)
+        """
+        counts = Counter(added)
+        counts.subtract(Counter(removed))
+        # One shard for the whole call, and rows sorted, so concurrent
+        # transactions lock the counter rows in the same order and cannot
+        # deadlock
+        shard = random.randrange(settings.STATS_SHARDS)
+        count_rows = [
+            {"status": status, "priority": priority, "shard": shard, "count": delta}
+            for (status, priority), delta in sorted(counts.items())
+            if delta
+        ]
+        bucket = _bucket(datetime.now(timezone.utc))
+        activity_rows = [
+            {"bucket": bucket, "event": event, "shard": shard, "count": delta}
+            for event, delta in sorted(Counter(events).items())
+        ]
+
+        for model, rows, keys in (
+            (TaskCount, count_rows, ["status", "priority", "shard"]),
+            (TaskActivity, activity_rows, ["bucket", "event", "shard"]),
+        ):
+            if rows:
+                await db.execute(self._upsert(db, model, keys).values(rows))
+
+    def _upsert(self, db: AsyncSession, model, keys):
+        """INSERT ... ON CONFLICT DO UPDATE adding to the existing count"""
+        stmt = UPSERT_INSERTS[db.get_bind().dialect.name](model)
+        return stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={"count": model.count + stmt.excluded.count},
+        )
+
+    async def get(self, db: AsyncSession) -> Dict[str, Any]:
+        """Read the counters and the recent hourly activity, summing shards"""
+        by_status: Dict[str, int] = Counter()
+        by_priority: Dict[int, int] = Counter()
+        total = func.sum(TaskCount.count)
+        result = await db.execute(
+            select(TaskCount.status, TaskCount.priority, total)
+            .group_by(TaskCount.status, TaskCount.priority)
+            .having(total != 0)
+        )
+        for status, priority, count in result:
+            by_status[status] += count
+            by_priority[priority] += count
+
+        since = _bucket(datetime.now(timezone.utc)) - timedelta(
+            hours=settings.STATS_ACTIVITY_HOURS - 1
+        )
+        result = await db.execute(
+            select(
+                TaskActivity.bucket, TaskActivity.event, func.sum(TaskActivity.count)
+            )
+            .where(TaskActivity.bucket >= since)
+            .group_by(TaskActivity.bucket, TaskActivity.event)
+            .order_by(TaskActivity.bucket)
+        )
+        activity: Dict[datetime, Dict[str, int]] = {}
+        for bucket, event, count in result:
+            activity.setdefault(bucket, {})[event] = count
+
+        return {
+            "total": sum(by_status.values()),
+            "by_status": dict(by_status),
+            "by_priority": dict(by_priority),
+            "activity": [
+                {"bucket": bucket, "events": events}
+                for bucket, events in activity.items()
+            ],
+        }
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """
+        Recompute the counters from the tasks table
+
+        Activity for the reported window is reconstructed from task
+        creation times and status logs; older activity rows are dropped.
+        The counters are written to shard 0. Runs in one transaction, so
+        readers see either the old or the new counters.
+        """
+        await db.execute(delete(TaskCount))
+        await db.execute(
+            insert(TaskCount).from_select(
+                ["status", "priority", "count"],
+                select(Task.status, Task.priority, func.count()).group_by(
+                    Task.status, Task.priority
+                ),
+            )
+        )
+
+        since = _bucket(datetime.now(timezone.utc)) - timedelta(
+            hours=settings.STATS_ACTIVITY_HOURS - 1
+        )
+        activity: Counter = Counter()
+        for event, column, query in (
+            ("created", Task.created_at, select(Task.created_at)),
+            (None, TaskLog.created_at, select(TaskLog.created_at, TaskLog.status)),
+        ):
+            result = await db.stream(query.where(column >= since))
+            async for row in result:
+                bucket = _bucket(row[0])
+                if bucket.tzinfo is None:
+                    bucket = bucket.replace(tzinfo=timezone.utc)
+                activity[(bucket, event or row[1])] += 1
+
+        await db.execute(delete(TaskActivity))
+        if activity:
+            await db.execute(
+                insert(TaskActivity),
+                [
+                    {"bucket": bucket, "event": event, "count": count}
+                    for (bucket, event), count in activity.items()
+                ],
+            )
+        await db.commit()
+
+
+stats_service = StatsService()
@@ -1,10 +1,120 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, update, delete
+import asyncio
+import json
+import re
+from datetime import datetime
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Callable,
+    Collection,
+    List,
+    Optional,
+    Dict,
+    Any,
+    Sequence,
+    Tuple,
+    Union,
+)
+from pydantic import ValidationError
+from sqlalchemy import (
+    DateTime,
+    and_,
+    column,
+    func,
+    literal_column,
+    select,
+    insert,
+    table,
+    update,
+    delete,
+    tuple_,
+)
+from sqlalchemy.engine import RowMapping, make_url
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, contains_eager, make_transient_to_detached
 
-from app.models.task import Task, TaskLog
-from app.schemas.task import TaskCreate, TaskUpdate, TaskLogCreate
+from app.core.config import settings
+from app.models.task import Task, TaskDependency, TaskLog
+from app.schemas.task import (
+    TASK_LOG_ROW_FIELDS,
+    TASK_ROW_FIELDS,
+    ImportLineError,
+    ImportSummary,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskLogCreate,
+    TaskLogRow,
+    TaskRow,
+    TaskUpdate,
+)
+from app.services.job import job_service
+from app.services.stats import UPSERT_INSERTS, stats_service
+from app.utils.cache import SHARED_BACKENDS, TieredCache
+from app.utils.etag import PreconditionFailedError, etag_matches, make_etag
+from app.utils.events import EVENT_BACKENDS, EventBroker
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.singleflight import SingleFlight
+
+# Columns usable for keyset pagination; each is paired with Task.id as a
+# tie-breaker and backed by a composite (column, id) index.
+SORT_COLUMNS = {
+    "created_at": Task.created_at,
+    "priority": Task.priority,
+}
+
+
+def _event_backend(**options):
+    if settings.TASK_EVENTS_BACKEND == "postgres":
+        # asyncpg takes a plain postgresql:// DSN
+        url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return EVENT_BACKENDS["postgres"](
+            url.render_as_string(hide_password=False), **options
+        )
+    return EVENT_BACKENDS[settings.TASK_EVENTS_BACKEND]()
+
+
+# Writes made by other processes (API workers, the queue worker) reach this
+# process's local tier through invalidations relayed like task events
+task_cache = TieredCache(
+    max_size=settings.TASK_CACHE_MAX_SIZE,
+    ttl=settings.TASK_CACHE_TTL,
+    shared=(
+        SHARED_BACKENDS[settings.TASK_CACHE_SHARED_BACKEND]()
+        if settings.TASK_CACHE_SHARED_BACKEND
+        else None
+    ),
+    invalidations=(
+        _event_backend(channel="task_cache")
+        if settings.TASK_EVENTS_BACKEND == "postgres"
+        else None
+    ),
+    enabled=settings.TASK_CACHE_ENABLED,
+)
+
+# Concurrent identical reads (a task's detail or version, a page of rows
+# with the same filters) share one database call; see _coalesce
+task_reads = SingleFlight(
+    grace=settings.SINGLEFLIGHT_GRACE, enabled=settings.SINGLEFLIGHT_ENABLED
+)
+
+
+# Status changes of tasks, keyed by task_id; see GET /tasks/{id}/events
+task_events = EventBroker(
+    _event_backend(),
+    key_field="task_id",
+    queue_size=settings.TASK_EVENTS_QUEUE_SIZE,
+    heartbeat=settings.TASK_EVENTS_HEARTBEAT,
+)
+
+
+# Key of the Postgres advisory lock serializing changes to the dependency
+# graph, so concurrent edges cannot close a cycle unnoticed
+DEPENDENCY_LOCK_KEY = 0x7A5C_D3B5
+
+
+class DependencyCycleError(ValueError):
+    """Raised when a new task dependency would close a cycle"""
 
 
 class TaskService:
@@ -17,33 +127,163 @@ class TaskService:
             priority=obj_in.priority,
         )
         db.add(db_obj)
+        await stats_service.apply(
+            db, added=[("pending", obj_in.priority)], events=["created"]
+        )
+        # The INSERT returns the server-generated columns, no refresh needed
         await db.commit()
-        await db.refresh(db_obj)
         return db_obj
 
     async def get(self, db: AsyncSession, id: int) -> Optional[Task]:
-        """Get a task by ID"""
+        """Get a task by ID, served from the task cache when possible"""
+        key = _cache_key(id)
+        if _use_cache(db) and (cached := await task_cache.get(key)) is not None:
+            return await _from_cache(db, cached)
+
         query = select(Task).where(Task.id == id)
         result = await db.execute(query)
-        return result.scalars().first()
+        task = result.scalars().first()
+        if task is not None and _fill_cache(db):
+            await task_cache.set(key, _to_cache(task))
+        return task
 
     async def get_with_logs(self, db: AsyncSession, id: int) -> Optional[Task]:
-        """Get a task with its logs by ID"""
-        query = select(Task).options(selectinload(Task.logs)).where(Task.id == id)
+        """
+        Get a task with its most recent TASK_INLINE_LOGS logs by ID, served
+        from the task cache when possible
+
+        task.logs holds only those logs, oldest first; get_logs pages
+        through the full history.
+        """
+        key = _cache_key(id, with_logs=True)
+        if _use_cache(db) and (cached := await task_cache.get(key)) is not None:
+            return await _from_cache(db, cached)
+
+        data = await _coalesce(db, key, lambda: self._load_with_logs(db, id))
+        return await _from_cache(db, data) if data is not None else None
+
+    async def _load_with_logs(
+        self, db: AsyncSession, id: int
+    ) -> Optional[Dict[str, Any]]:
+        """Read a task with its recent logs into the cache, returns the snapshot"""
+        # One round trip: the logs are joined rather than loaded separately,
+        # the join limited to the newest ids through the (task_id, id) index
+        recent = (
+            select(TaskLog.id)
+            .where(TaskLog.task_id == id)
+            .order_by(TaskLog.id.desc())
+            .limit(settings.TASK_INLINE_LOGS)
+        )
+        query = (
+            select(Task)
+            .outerjoin(
+                TaskLog, and_(TaskLog.task_id == Task.id, TaskLog.id.in_(recent))
+            )
+            .options(contains_eager(Task.logs))
+            .where(Task.id == id)
+            .order_by(TaskLog.id)
+            .execution_options(populate_existing=True)
+        )
         result = await db.execute(query)
-        return result.scalars().first()
+        task = result.unique().scalars().first()
+        if task is None:
+            return None
+        data = _to_cache(task, with_logs=True)
+        if _fill_cache(db):
+            await task_cache.set(_cache_key(id, with_logs=True), data)
+        return data
 
-    async def get_multi(
-        self, 
-        db: AsyncSession, 
-        *, 
-        skip: int = 0, 
-        limit: int = 100,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[Task]:
-        """Get multiple tasks with optional filtering"""
-        query = select(Task)
-        
+    async def get_logs(
+        self,
+        db: AsyncSession,
+        task_id: int,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        as_rows: bool = False,
+    ) -> Optional[Tuple[Union[List[TaskLog], List[TaskLogRow]], Optional[str]]]:
+        """
+        Get a page of a task's logs, newest first, using keyset pagination
+
+        Returns the page and the cursor for the next one (None on the last
+        page), or None if the task does not exist. With as_rows the logs
+        are returned as TaskLogRow dicts, for the fast serialization path.
+        """
+        if as_rows:
+            query = select(
+                *(TaskLog.__table__.c[field] for field in TASK_LOG_ROW_FIELDS)
+            )
+        else:
+            query = select(TaskLog)
+        query = query.where(TaskLog.task_id == task_id)
+        if cursor is not None:
+            _, last_id = decode_cursor(cursor, "-id")
+            query = query.where(TaskLog.id < last_id)
+        query = query.order_by(TaskLog.id.desc()).limit(limit + 1)
+
+        result = await db.execute(query)
+        if as_rows:
+            logs = [dict(zip(TASK_LOG_ROW_FIELDS, row)) for row in result]
+        else:
+            logs = result.scalars().all()
+        if not logs:
+            # Logs only exist for existing tasks, so only check when there
+            # are none
+            if await self.get_status(db, task_id) is None:
+                return None
+            return logs, None
+        if len(logs) <= limit:
+            return logs, None
+
+        logs = logs[:limit]
+        last_id = logs[-1]["id"] if as_rows else logs[-1].id
+        return logs, encode_cursor("-id", None, last_id)
+
+    async def get_status(self, db: AsyncSession, id: int) -> Optional[str]:
+        """The current status of a task, read from the database"""
+        result = await db.execute(select(Task.status).where(Task.id == id))
+        return result.scalar()
+
+    async def get_fields(
+        self, db: AsyncSession, id: int, fields: Sequence[str]
+    ) -> Optional[TaskRow]:
+        """
+        Read only the given fields of a task (a sparse fieldset) as a dict
+        in TaskRow order, or None if it does not exist
+
+        Selects just those columns, without the ORM, so unrequested ones
+        such as the description are never read or transferred.
+        """
+        fields = _projection(fields)
+        result = await db.execute(self._select(True, fields).where(Task.id == id))
+        row = result.first()
+        return dict(zip(fields, row)) if row is not None else None
+
+    async def get_version(
+        self, db: AsyncSession, id: int
+    ) -> Optional[Tuple[datetime, Optional[int]]]:
+        """
+        The (updated_at, latest log id) pair identifying the current state of
+        a task with its logs, see task_etag
+
+        Answered from the task cache when it holds the task, otherwise with
+        a single-row query, without loading the task or its logs.
+        """
+        key = _cache_key(id, with_logs=True)
+        if _use_cache(db) and (cached := await task_cache.get(key)) is not None:
+            return (
+                datetime.fromisoformat(cached["updated_at"]),
+                max((log["id"] for log in cached["logs"]), default=None),
+            )
+
+        async def load():
+            row = (await db.execute(_version_query(id))).first()
+            return tuple(row) if row is not None else None
+
+        return await _coalesce(db, f"task:{id}:version", load)
+
+    def _apply_filters(self, query, filters: Optional[Dict[str, Any]]):
+        """Apply the list filters shared by the listing endpoints"""
         if filters:
             if title := filters.get("title"):
                 query = query.filter(Task.title.ilike(f"%{title}%"))
@@ -51,47 +291,1147 @@ class TaskService:
                 query = query.filter(Task.status == status)
             if priority := filters.get("priority"):
                 query = query.filter(Task.priority == priority)
-        
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
+        return query
+
+    def _select(self, as_rows: bool, fields: Sequence[str] = TASK_ROW_FIELDS):
+        """
+        Select tasks as entities, or as plain columns in TaskRow order,
+        only those of fields if given
+        """
+        if as_rows:
+            return select(*(Task.__table__.c[field] for field in fields))
+        return select(Task)
+
+    def _fetch(
+        self, result, as_rows: bool, fields: Sequence[str] = TASK_ROW_FIELDS
+    ) -> List:
+        if as_rows:
+            return [dict(zip(fields, row)) for row in result]
+        return result.scalars().all()
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        as_rows: bool = False,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Union[List[Task], List[TaskRow]]:
+        """
+        Get multiple tasks with optional filtering
+
+        With as_rows the tasks are returned as TaskRow dicts, bypassing the
+        ORM, for the fast serialization path. fields (a sparse fieldset)
+        implies as_rows and reads only those columns, in TaskRow order.
+        """
+        columns = _projection(fields)
+        as_rows = as_rows or fields is not None
+
+        async def load():
+            query = self._apply_filters(self._select(as_rows, columns), filters)
+            result = await db.execute(query.offset(skip).limit(limit))
+            return self._fetch(result, as_rows, columns)
+
+        if not as_rows:
+            return await load()
+        key = _list_key(
+            "multi", skip=skip, limit=limit, filters=filters, fields=columns
+        )
+        return await _coalesce(db, key, load)
+
+    async def stream_rows(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[RowMapping]:
+        """
+        Stream all matching tasks as plain row mappings, in id order
+
+        Uses a server-side cursor fetching batch_size rows at a time and
+        selects columns rather than entities, so rows never enter the
+        session's identity map.
+        """
+        query = self._apply_filters(select(*Task.__table__.columns), filters)
+        query = query.order_by(Task.id).execution_options(yield_per=batch_size)
+        result = await db.stream(query)
+        async for row in result.mappings():
+            yield row
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        order_by: str = "created_at",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        as_rows: bool = False,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[Union[List[Task], List[TaskRow]], Optional[str]]:
+        """
+        Get a page of tasks using keyset pagination
+
+        Rows are ordered by (order_by, id), prefix order_by with "-" for
+        descending order. Instead of an OFFSET the query seeks past the
+        last row of the previous page, so every page costs the same.
+        Returns the page and the cursor for the next one, or None when
+        this is the last page. as_rows and fields work as for get_multi;
+        the rows also hold the order_by column and id, for the cursor.
+        """
+        if fields is not None:
+            fields = _projection(fields, order_by.lstrip("-"), "id")
+        as_rows = as_rows or fields is not None
+
+        async def load():
+            return await self._get_page(
+                db,
+                order_by=order_by,
+                cursor=cursor,
+                limit=limit,
+                filters=filters,
+                as_rows=as_rows,
+                fields=fields or TASK_ROW_FIELDS,
+            )
+
+        if not as_rows:
+            return await load()
+        key = _list_key(
+            "page",
+            order_by=order_by,
+            cursor=cursor,
+            limit=limit,
+            filters=filters,
+            fields=fields or TASK_ROW_FIELDS,
+        )
+        return await _coalesce(db, key, load)
+
+    async def _get_page(
+        self,
+        db: AsyncSession,
+        *,
+        order_by: str,
+        cursor: Optional[str],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+        as_rows: bool,
+        fields: Sequence[str],
+    ) -> Tuple[Union[List[Task], List[TaskRow]], Optional[str]]:
+        descending = order_by.startswith("-")
+        column = SORT_COLUMNS[order_by.lstrip("-")]
+        key = tuple_(column, Task.id)
+
+        query = self._apply_filters(self._select(as_rows, fields), filters)
+        if cursor is not None:
+            value, last_id = decode_cursor(cursor, order_by)
+            position = (value, last_id)
+            query = query.where(key < position if descending else key > position)
+        if descending:
+            query = query.order_by(column.desc(), Task.id.desc())
+        else:
+            query = query.order_by(column.asc(), Task.id.asc())
+
+        # Fetch one extra row to find out whether another page exists
+        result = await db.execute(query.limit(limit + 1))
+        tasks = self._fetch(result, as_rows, fields)
+        if len(tasks) <= limit:
+            return tasks, None
+
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        if as_rows:
+            return tasks, encode_cursor(order_by, last[column.key], last["id"])
+        return tasks, encode_cursor(order_by, getattr(last, column.key), last.id)
+
+    async def search(
+        self,
+        db: AsyncSession,
+        text: str,
+        *,
+        skip: int = 0,
+        limit: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Task]:
+        """
+        Full-text search over task titles and descriptions, best match first
+
+        Uses the GIN-indexed search_vector column on Postgres and the
+        tasks_fts FTS5 table on SQLite (see app.models.task). Title matches
+        rank above description matches.
+        """
+        if db.get_bind().dialect.name == "sqlite":
+            # Quote each word so user input cannot inject FTS5 query syntax
+            words = re.findall(r"\w+", text)
+            if not words:
+                return []
+            fts = table("tasks_fts", column("rowid"))
+            document = literal_column("tasks_fts")
+            query = (
+                select(Task)
+                .join(fts, fts.c.rowid == Task.id)
+                .where(document.op("MATCH")(" ".join(f'"{word}"' for word in words)))
+                .order_by(func.bm25(document, 10.0, 1.0), Task.id)
+            )
+        else:
+            vector = literal_column("tasks.search_vector")
+            # Same text search configuration as the generated column
+            tsquery = func.websearch_to_tsquery(literal_column("'english'"), text)
+            query = (
+                select(Task)
+                .where(vector.op("@@")(tsquery))
+                .order_by(func.ts_rank_cd(vector, tsquery).desc(), Task.id)
+            )
+
+        query = self._apply_filters(query, filters)
+        result = await db.execute(query.offset(skip).limit(limit))
         return result.scalars().all()
 
     async def update(
-        self, db: AsyncSession, *, db_obj: Task, obj_in: TaskUpdate
-    ) -> Task:
-        """Update a task"""
-        update_data = obj_in.model_dump(exclude_unset=True)
-        
-        # If status is being updated, create a log entry
-        if "status" in update_data and update_data["status"] != db_obj.status:
-            log = TaskLog(task_id=db_obj.id, status=update_data["status"])
-            db.add(log)
-        
-        # Update the task
+        self,
+        db: AsyncSession,
+        *,
+        id: int,
+        obj_in: TaskUpdate,
+        if_match: Optional[str] = None,
+    ) -> Optional[Task]:
+        """
+        Update a task, returns None if it does not exist
+
+        if_match is an If-Match header value: unless it matches the task's
+        current ETag (see task_etag), PreconditionFailedError is raised and
+        nothing changes. The task row stays locked from the check to the
+        commit, so concurrent writers cannot slip in between.
+
+        Completing a task starts, in the same transaction, its waiting
+        dependents whose prerequisites have now all completed.
+        """
+        if if_match is not None:
+            result = await db.execute(_version_query(id).with_for_update(of=Task))
+            version = result.first()
+            if version is None:
+                return None
+            if not etag_matches(if_match, task_etag(id, *version), weak=False):
+                raise PreconditionFailedError(f"Task {id} has been modified")
+
+        task, previous = await self._update(
+            db, id, obj_in.model_dump(exclude_unset=True)
+        )
+        released = []
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        if previous is not None and task.status == "completed":
+            released = await self._release_waiting(
+                db, _depends_on([id]), enqueue=enqueue
+            )
+        await db.commit()
+        await invalidate_cache(id)
+        if previous is not None:
+            await _publish_status(id, task.status, previous)
+        await _announce_released(released, enqueue=enqueue)
+        return task
+
+    async def start_processing(
+        self,
+        db: AsyncSession,
+        *,
+        id: int,
+        enqueue: bool,
+        with_prerequisites: bool = False,
+    ) -> Optional[Task]:
+        """
+        Start processing a task; returns None if it does not exist
+
+        A task with prerequisites that have not completed is marked waiting
+        instead, and starts when the last of them completes (see update).
+        Otherwise it is marked in progress and, with enqueue, its job is
+        queued in the same transaction; without, it runs on the API
+        process's scheduler. With with_prerequisites its transitive
+        prerequisites that are neither completed nor started are started
+        the same way, so a whole graph runs with one call, independent
+        branches in parallel up to the processing concurrency.
+        """
+        ids = [id]
+        if with_prerequisites:
+            ids.extend(await self._idle_prerequisites(db, id))
+
+        task, started, changes = None, [], []
+        for task_id in ids:
+            # Each is checked in turn, so those of the started prerequisites
+            # that depend on others wait for them
+            ready = await self._prerequisites_completed(db, task_id)
+            updated, previous = await self._update(
+                db, task_id, {"status": "in_progress" if ready else "waiting"}
+            )
+            if updated is None:
+                continue
+            if task_id == id:
+                task = updated
+            if ready:
+                started.append((task_id, updated.priority))
+                if enqueue:
+                    await job_service.enqueue(db, task_id, priority=updated.priority)
+            if previous is not None:
+                changes.append((task_id, updated.status, previous))
+        await db.commit()
+        await invalidate_cache(*ids)
+        for change in changes:
+            await _publish_status(*change)
+        if not enqueue:
+            _run_in_background(started)
+        return task
+
+    async def _prerequisites_completed(self, db: AsyncSession, id: int) -> bool:
+        """
+        Whether all prerequisites of a task have completed
+
+        The prerequisites stay share-locked until the commit: one
+        completing meanwhile either waits for this transaction, and then
+        releases the task marked waiting, or is seen completed here.
+        """
+        result = await db.execute(
+            select(Task.status)
+            .join(TaskDependency, TaskDependency.depends_on_id == Task.id)
+            .where(TaskDependency.task_id == id)
+            .with_for_update(read=True, of=Task)
+        )
+        return all(status == "completed" for status in result.scalars())
+
+    async def _idle_prerequisites(self, db: AsyncSession, id: int) -> List[int]:
+        """Transitive prerequisites of a task not completed or started yet"""
+        ancestors = _prerequisites_cte(id)
+        result = await db.execute(
+            select(Task.id)
+            .where(
+                Task.id.in_(select(ancestors.c.id)),
+                Task.status.notin_(("completed", "in_progress", "waiting")),
+            )
+            .order_by(Task.id)
+        )
+        return result.scalars().all()
+
+    async def _release_waiting(
+        self, db: AsyncSession, candidates, *, enqueue: bool
+    ) -> List[Tuple[int, int]]:
+        """
+        Move the waiting tasks among candidates (a where clause) whose
+        prerequisites have all completed to in progress, queueing their
+        jobs with enqueue; returns their (id, priority) pairs
+
+        The waiting candidates are locked before their prerequisites are
+        checked. Two transactions completing prerequisites of the same task
+        thus take turns: the second waits for the first to commit, and as
+        READ COMMITTED gives each statement a fresh snapshot, it then sees
+        both prerequisites completed. Without the lock each could miss the
+        other's uncommitted completion and leave the task waiting.
+        """
+        result = await db.execute(
+            select(Task.id)
+            .where(Task.status == "waiting", candidates)
+            .order_by(Task.id)
+            .with_for_update()
+        )
+        waiting = result.scalars().all()
+        if not waiting:
+            return []
+        prerequisite = aliased(Task)
+        blocked = (
+            select(TaskDependency.task_id)
+            .join(prerequisite, prerequisite.id == TaskDependency.depends_on_id)
+            .where(
+                TaskDependency.task_id == Task.id, prerequisite.status != "completed"
+            )
+            .exists()
+        )
         stmt = (
             update(Task)
-            .where(Task.id == db_obj.id)
-            .values(**update_data)
-            .execution_options(synchronize_session="fetch")
+            .where(Task.status == "waiting", Task.id.in_(waiting), ~blocked)
+            .values(status="in_progress")
+            .returning(Task.id, Task.priority)
+            .execution_options(synchronize_session=False)
+        )
+        released = [tuple(row) for row in await db.execute(stmt)]
+        if not released:
+            return []
+        await db.execute(
+            insert(TaskLog),
+            [{"task_id": id, "status": "in_progress"} for id, _ in released],
+        )
+        await stats_service.apply(
+            db,
+            added=[("in_progress", priority) for _, priority in released],
+            removed=[("waiting", priority) for _, priority in released],
+            events=["in_progress"] * len(released),
+        )
+        if enqueue:
+            for id, priority in released:
+                await job_service.enqueue(db, id, priority=priority)
+        return released
+
+    async def _dependents(self, db: AsyncSession, ids) -> List[int]:
+        """
+        Ids of the tasks depending on any of ids (a list or a select);
+        read before deleting those, as their edges go with them
+        """
+        result = await db.execute(
+            select(TaskDependency.task_id)
+            .where(TaskDependency.depends_on_id.in_(ids))
+            .distinct()
+        )
+        return result.scalars().all()
+
+    async def add_dependency(
+        self, db: AsyncSession, *, task_id: int, depends_on_id: int
+    ) -> bool:
+        """
+        Make task_id depend on depends_on_id; returns False if either task
+        does not exist
+
+        Raises DependencyCycleError if depends_on_id already depends on
+        task_id, directly or through other tasks, found with a recursive
+        query over the graph. On Postgres an advisory lock serializes graph
+        changes, so two concurrent edges cannot close a cycle together.
+        """
+        if task_id == depends_on_id:
+            raise DependencyCycleError(f"Task {task_id} cannot depend on itself")
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(select(func.pg_advisory_xact_lock(DEPENDENCY_LOCK_KEY)))
+        result = await db.execute(
+            select(func.count()).where(Task.id.in_((task_id, depends_on_id)))
         )
-        await db.execute(stmt)
+        if result.scalar() < 2:
+            return False
+
+        prerequisites = _prerequisites_cte(depends_on_id)
+        result = await db.execute(
+            select(prerequisites.c.id).where(prerequisites.c.id == task_id).limit(1)
+        )
+        if result.first() is not None:
+            raise DependencyCycleError(
+                f"Task {depends_on_id} already depends on task {task_id}"
+            )
+
+        stmt = UPSERT_INSERTS[db.get_bind().dialect.name](TaskDependency).values(
+            task_id=task_id, depends_on_id=depends_on_id
+        )
+        await db.execute(stmt.on_conflict_do_nothing())
         await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+        return True
 
-    async def delete(self, db: AsyncSession, *, id: int) -> None:
-        """Delete a task"""
-        stmt = delete(Task).where(Task.id == id)
-        await db.execute(stmt)
+    async def remove_dependency(
+        self, db: AsyncSession, *, task_id: int, depends_on_id: int
+    ) -> bool:
+        """
+        Drop a dependency, returns False if there was none; a waiting task
+        whose other prerequisites have all completed starts
+        """
+        result = await db.execute(
+            delete(TaskDependency)
+            .where(
+                TaskDependency.task_id == task_id,
+                TaskDependency.depends_on_id == depends_on_id,
+            )
+            .returning(TaskDependency.task_id)
+        )
+        if result.first() is None:
+            return False
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        released = await self._release_waiting(db, Task.id == task_id, enqueue=enqueue)
         await db.commit()
+        await _announce_released(released, enqueue=enqueue)
+        return True
+
+    async def get_dependencies(self, db: AsyncSession, id: int) -> Optional[List[Task]]:
+        """The direct prerequisites of a task, or None if it does not exist"""
+        result = await db.execute(
+            select(Task)
+            .join(TaskDependency, TaskDependency.depends_on_id == Task.id)
+            .where(TaskDependency.task_id == id)
+            .order_by(Task.id)
+        )
+        prerequisites = result.scalars().all()
+        if not prerequisites and await self.get_status(db, id) is None:
+            return None
+        return prerequisites
+
+    async def _update(
+        self, db: AsyncSession, id: int, update_data: Dict[str, Any]
+    ) -> Tuple[Optional[Task], Optional[str]]:
+        """
+        Apply changes to a task without committing
+
+        Returns the updated task, or None if it does not exist, and its
+        previous status if the status changed.
+
+        The UPDATE returns the new row, so the task is neither loaded
+        beforehand nor refreshed afterwards. When status or priority change,
+        their previous values are needed for the status log and the stats:
+        on Postgres the UPDATE returns them too, from a locked self-join;
+        SQLite cannot return them (RETURNING only sees the updated table),
+        so they are read first, which is safe as SQLite serializes writers.
+        """
+        if not update_data:
+            return await self.get(db, id), None
+
+        stmt = (
+            update(Task)
+            .values(**update_data)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        if not update_data.keys() & {"status", "priority"}:
+            result = await db.execute(stmt.where(Task.id == id).returning(Task))
+            return result.scalars().first(), None
+
+        if db.get_bind().dialect.name == "sqlite":
+            result = await db.execute(
+                select(Task.status, Task.priority).where(Task.id == id)
+            )
+            old = result.first()
+            if old is None:
+                return None, None
+            result = await db.execute(stmt.where(Task.id == id).returning(Task))
+            task = result.scalars().one()
+        else:
+            previous = (
+                select(Task.id, Task.status, Task.priority)
+                .where(Task.id == id)
+                .with_for_update()
+                .subquery("previous")
+            )
+            result = await db.execute(
+                stmt.where(Task.id == previous.c.id).returning(
+                    Task, previous.c.status, previous.c.priority
+                )
+            )
+            row = result.first()
+            if row is None:
+                return None, None
+            task, old = row[0], tuple(row[1:])
+
+        old, new = tuple(old), (task.status, task.priority)
+        if new[0] != old[0]:
+            db.add(TaskLog(task_id=id, status=new[0]))
+        if new != old:
+            await stats_service.apply(
+                db,
+                added=[new],
+                removed=[old],
+                events=[new[0]] if new[0] != old[0] else [],
+            )
+        return task, old[0] if new[0] != old[0] else None
+
+    async def delete(self, db: AsyncSession, *, id: int) -> bool:
+        """
+        Delete a task, returns False if it does not exist; its waiting
+        dependents whose other prerequisites have all completed start
+        """
+        dependents = await self._dependents(db, [id])
+        stmt = delete(Task).where(Task.id == id).returning(Task.status, Task.priority)
+        deleted = (await db.execute(stmt)).all()
+        await stats_service.apply(db, removed=[tuple(row) for row in deleted])
+        released = []
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        if deleted and dependents:
+            released = await self._release_waiting(
+                db, Task.id.in_(dependents), enqueue=enqueue
+            )
+        await db.commit()
+        await invalidate_cache(id)
+        await _announce_released(released, enqueue=enqueue)
+        return bool(deleted)
 
     async def create_log(self, db: AsyncSession, obj_in: TaskLogCreate) -> TaskLog:
         """Create a new task log"""
         db_obj = TaskLog(**obj_in.model_dump())
         db.add(db_obj)
         await db.commit()
+        await invalidate_cache(db_obj.task_id)
         await db.refresh(db_obj)
         return db_obj
 
+    async def purge_logs(
+        self,
+        db: AsyncSession,
+        *,
+        before: datetime,
+        batch_size: int = 1000,
+        archive: Optional[Callable[[List[RowMapping]], None]] = None,
+    ) -> int:
+        """
+        Delete task logs created before a point in time, returns the count
+
+        Works in batches of batch_size logs, each its own transaction, so
+        the table is never locked for long. The deleted rows of a batch are
+        passed to archive, if given, before the batch commits; if it raises
+        the batch is kept.
+        """
+        purged = 0
+        while True:
+            batch = (
+                select(TaskLog.id)
+                .where(TaskLog.created_at < before)
+                .order_by(TaskLog.id)
+                .limit(batch_size)
+            )
+            stmt = (
+                delete(TaskLog)
+                .where(TaskLog.id.in_(batch))
+                .returning(*TaskLog.__table__.columns)
+            )
+            rows = (await db.execute(stmt)).mappings().all()
+            if not rows:
+                return purged
+            if archive is not None:
+                try:
+                    archive(rows)
+                except Exception:
+                    await db.rollback()
+                    raise
+            await db.commit()
+            await invalidate_cache(*{row["task_id"] for row in rows})
+            purged += len(rows)
+            if len(rows) < batch_size:
+                return purged
+
+    async def purge_tasks(
+        self,
+        db: AsyncSession,
+        *,
+        statuses: Collection[str],
+        before: datetime,
+        batch_size: int = 500,
+        pause: float = 0.0,
+        archive: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> int:
+        """
+        Delete tasks in one of statuses last updated before a point in
+        time, returns the count
+
+        Walks the matching id range batch_size ids at a time, each batch
+        its own transaction, sleeping pause seconds after batches that
+        deleted something, so locks stay short and replicas keep up. Logs
+        and jobs go with their task through ON DELETE CASCADE. The deleted
+        tasks of a batch, each with its logs under "logs", are passed to
+        archive, if given, before the batch commits; if it raises the batch
+        is kept. Waiting dependents of the deleted tasks start as with
+        delete.
+        """
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        expired = and_(Task.status.in_(statuses), Task.updated_at < before)
+        lowest, highest = (
+            await db.execute(
+                select(func.min(Task.id), func.max(Task.id)).where(expired)
+            )
+        ).one()
+        if lowest is None:
+            return 0
+
+        purged = 0
+        for start in range(lowest, highest + 1, batch_size):
+            in_batch = and_(Task.id >= start, Task.id < start + batch_size, expired)
+            logs: Dict[int, List[Dict[str, Any]]] = {}
+            if archive is not None:
+                result = await db.execute(
+                    select(*TaskLog.__table__.columns)
+                    .where(TaskLog.task_id.in_(select(Task.id).where(in_batch)))
+                    .order_by(TaskLog.id)
+                )
+                for log in result.mappings():
+                    logs.setdefault(log["task_id"], []).append(dict(log))
+            dependents = await self._dependents(db, select(Task.id).where(in_batch))
+            stmt = (
+                delete(Task)
+                .where(in_batch)
+                .returning(*Task.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            rows = (await db.execute(stmt)).mappings().all()
+            if not rows:
+                continue
+            await stats_service.apply(
+                db, removed=[(row["status"], row["priority"]) for row in rows]
+            )
+            released = []
+            if dependents:
+                released = await self._release_waiting(
+                    db, Task.id.in_(dependents), enqueue=enqueue
+                )
+            if archive is not None:
+                try:
+                    archive([{**row, "logs": logs.get(row["id"], [])} for row in rows])
+                except Exception:
+                    await db.rollback()
+                    raise
+            await db.commit()
+            await invalidate_cache(*(row["id"] for row in rows))
+            await _announce_released(released, enqueue=enqueue)
+            purged += len(rows)
+            if pause > 0 and start + batch_size <= highest:
+                await asyncio.sleep(pause)
+        return purged
+
+    # Bulk operations work through the input in chunks of BULK_CHUNK_SIZE,
+    # each chunk being one transaction with set-based statements. They
+    # return one (id, error) pair per input item, in input order; a
+    # database error fails the items of its chunk only.
+
+    async def create_bulk(
+        self, db: AsyncSession, objs_in: List[TaskCreate]
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """Create tasks with multi-row INSERT ... RETURNING"""
+        results = []
+        for chunk in _chunks(objs_in):
+            rows = [
+                {
+                    "title": obj_in.title,
+                    "description": obj_in.description,
+                    "status": "pending",
+                    "priority": obj_in.priority,
+                }
+                for obj_in in chunk
+            ]
+            try:
+                stmt = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+                ids = (await db.execute(stmt, rows)).scalars().all()
+                await stats_service.apply(
+                    db,
+                    added=[("pending", row["priority"]) for row in rows],
+                    events=["created"] * len(rows),
+                )
+                await db.commit()
+            except SQLAlchemyError as e:
+                await db.rollback()
+                results.extend((None, _db_error(e)) for _ in chunk)
+                continue
+            results.extend((id, None) for id in ids)
+        return results
+
+    async def update_bulk(
+        self, db: AsyncSession, objs_in: List[TaskBulkUpdate]
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Update tasks with set-based UPDATE ... WHERE id IN (...)
+
+        Items carrying the same changes share one UPDATE statement, and
+        the log entries for status changes are written in one batched
+        insert per chunk. Completed tasks start their waiting dependents,
+        as with update.
+        """
+        results = []
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        for chunk in _chunks(objs_in):
+            errors: Dict[int, str] = {}
+            ids = set()
+            for i, obj_in in enumerate(chunk):
+                if obj_in.id in ids:
+                    errors[i] = f"Task with ID {obj_in.id} appears more than once"
+                ids.add(obj_in.id)
+
+            try:
+                # Locked, so the logged and counted transitions are the ones
+                # the UPDATEs below make; in id order, so two bulk updates
+                # over the same tasks cannot deadlock
+                rows = await db.execute(
+                    select(Task.id, Task.status, Task.priority)
+                    .where(Task.id.in_(ids))
+                    .order_by(Task.id)
+                    .with_for_update()
+                )
+                current = {id: (status, priority) for id, status, priority in rows}
+
+                groups: Dict[Tuple, List[int]] = {}
+                logs = []
+                added, removed = [], []
+                for i, obj_in in enumerate(chunk):
+                    if i in errors:
+                        continue
+                    if obj_in.id not in current:
+                        errors[i] = f"Task with ID {obj_in.id} not found"
+                        continue
+                    update_data = obj_in.model_dump(exclude_unset=True, exclude={"id"})
+                    if not update_data:
+                        continue
+                    old_status, old_priority = current[obj_in.id]
+                    new_status = update_data.get("status", old_status)
+                    new_priority = update_data.get("priority", old_priority)
+                    if new_status != old_status:
+                        logs.append({"task_id": obj_in.id, "status": new_status})
+                    if (new_status, new_priority) != (old_status, old_priority):
+                        added.append((new_status, new_priority))
+                        removed.append((old_status, old_priority))
+                    groups.setdefault(tuple(sorted(update_data.items())), []).append(
+                        obj_in.id
+                    )
+
+                for values, group_ids in groups.items():
+                    await db.execute(
+                        update(Task)
+                        .where(Task.id.in_(group_ids))
+                        .values(**dict(values))
+                        .execution_options(synchronize_session=False)
+                    )
+                if logs:
+                    await db.execute(insert(TaskLog), logs)
+                await stats_service.apply(
+                    db,
+                    added=added,
+                    removed=removed,
+                    events=[log["status"] for log in logs],
+                )
+                completed = [
+                    log["task_id"] for log in logs if log["status"] == "completed"
+                ]
+                released = []
+                if completed:
+                    released = await self._release_waiting(
+                        db, _depends_on(completed), enqueue=enqueue
+                    )
+                await db.commit()
+                await invalidate_cache(*ids)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                results.extend((obj_in.id, _db_error(e)) for obj_in in chunk)
+                continue
+            for log in logs:
+                await _publish_status(
+                    log["task_id"], log["status"], current[log["task_id"]][0]
+                )
+            await _announce_released(released, enqueue=enqueue)
+            results.extend((obj_in.id, errors.get(i)) for i, obj_in in enumerate(chunk))
+        return results
+
+    async def delete_bulk(
+        self, db: AsyncSession, ids: List[int]
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Delete tasks with DELETE ... WHERE id IN (...); their logs and jobs
+        go with them through ON DELETE CASCADE, and their waiting
+        dependents start as with delete
+        """
+        results = []
+        enqueue = settings.TASK_EXECUTION_MODE == "queue"
+        for chunk in _chunks(ids):
+            try:
+                dependents = await self._dependents(db, chunk)
+                stmt = (
+                    delete(Task)
+                    .where(Task.id.in_(chunk))
+                    .returning(Task.id, Task.status, Task.priority)
+                )
+                rows = (await db.execute(stmt)).all()
+                await stats_service.apply(
+                    db, removed=[(status, priority) for _, status, priority in rows]
+                )
+                released = []
+                if rows and dependents:
+                    released = await self._release_waiting(
+                        db, Task.id.in_(dependents), enqueue=enqueue
+                    )
+                await db.commit()
+                deleted = {id for id, _, _ in rows}
+                await invalidate_cache(*deleted)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                results.extend((id, _db_error(e)) for id in chunk)
+                continue
+            await _announce_released(released, enqueue=enqueue)
+            results.extend(
+                (id, None if id in deleted else f"Task with ID {id} not found")
+                for id in chunk
+            )
+        return results
+
+    async def import_lines(
+        self, db: AsyncSession, lines: AsyncIterator[Optional[bytes]]
+    ) -> ImportSummary:
+        """
+        Import tasks from NDJSON lines, one TaskCreate object per line
+
+        Lines are validated as they arrive and inserted in transactions of
+        IMPORT_CHUNK_SIZE rows, so only one chunk is held in memory. Invalid
+        lines are rejected without affecting the others; a chunk that fails
+        to insert rejects its lines only. lines yields None for a line that
+        was too long to read.
+        """
+        summary = ImportSummary()
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+
+        def reject(line_number: int, error: str) -> None:
+            summary.rejected += 1
+            if len(summary.errors) < settings.IMPORT_MAX_ERRORS:
+                summary.errors.append(ImportLineError(line=line_number, error=error))
+
+        async def flush() -> None:
+            try:
+                rows = [row for _, row in chunk]
+                await self._insert_rows(db, rows)
+                await stats_service.apply(
+                    db,
+                    added=[("pending", row["priority"]) for row in rows],
+                    events=["created"] * len(rows),
+                )
+                await db.commit()
+                summary.accepted += len(chunk)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                for line_number, _ in chunk:
+                    reject(line_number, _db_error(e))
+            chunk.clear()
+
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if line is None:
+                reject(line_number, "Line too long")
+                continue
+            if not line.strip():
+                continue
+            try:
+                obj_in = TaskCreate.model_validate_json(line)
+            except ValidationError as e:
+                reject(line_number, _validation_error(e))
+                continue
+            chunk.append(
+                (
+                    line_number,
+                    {
+                        "title": obj_in.title,
+                        "description": obj_in.description,
+                        "status": "pending",
+                        "priority": obj_in.priority,
+                    },
+                )
+            )
+            if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                await flush()
+        if chunk:
+            await flush()
+        return summary
+
+    async def _insert_rows(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert task rows without returning them
+
+        Uses COPY through asyncpg when the session runs on it, and an
+        executemany INSERT elsewhere.
+        """
+        conn = await db.connection()
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+            # asyncpg only opens SQLAlchemy's transaction on the first
+            # statement; open it so the COPY commits or rolls back with it
+            await conn.exec_driver_sql("SELECT 1")
+            import asyncpg
+
+            raw = await conn.get_raw_connection()
+            columns = list(rows[0])
+            try:
+                await raw.driver_connection.copy_records_to_table(
+                    Task.__tablename__,
+                    columns=columns,
+                    records=[tuple(row[column] for column in columns) for row in rows],
+                )
+            except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                # The driver's own errors bypass SQLAlchemy; wrapped, callers
+                # handle them like those of any other statement
+                raise DBAPIError(f"COPY {Task.__tablename__}", None, e) from e
+        else:
+            await db.execute(insert(Task), rows)
+
+
+async def invalidate_cache(*ids: int) -> None:
+    """Drop cached entries for tasks after they changed"""
+    keys = []
+    for id in ids:
+        keys.extend((_cache_key(id), _cache_key(id, with_logs=True)))
+    # Reads started before the change must not be joined by later ones
+    task_reads.forget(*keys, *(f"task:{id}:version" for id in ids))
+    await task_cache.delete(*keys)
+
+
+def task_etag(id: int, updated_at: datetime, last_log_id: Optional[int]) -> str:
+    """
+    ETag of a task at /tasks/{id}
+
+    Any update bumps updated_at and a status change adds a log, so the pair
+    changes whenever the TaskWithLogs representation does.
+    """
+    return make_etag(id, updated_at.isoformat(), last_log_id)
+
+
+def loaded_task_etag(task: Task) -> str:
+    """task_etag of a task loaded with its logs"""
+    last_log_id = max((log.id for log in task.logs), default=None)
+    return task_etag(task.id, task.updated_at, last_log_id)
+
+
+def _version_query(id: int):
+    last_log_id = (
+        select(func.max(TaskLog.id)).where(TaskLog.task_id == Task.id).scalar_subquery()
+    )
+    return select(Task.updated_at, last_log_id).where(Task.id == id)
+
+
+async def _publish_status(task_id: int, status: str, previous: str) -> None:
+    """Announce a committed status change on the task_events feed"""
+    await task_events.publish(
+        {"task_id": task_id, "status": status, "previous_status": previous}
+    )
+
+
+async def _coalesce(db: AsyncSession, key: str, load):
+    """
+    Run load(), sharing it with concurrent identical reads through
+    task_reads
+
+    load() runs with the leading caller's session, so it must return plain
+    data. Like cached entries, sessions serving a client's reads right
+    after its own writes do not share.
+    """
+    if not _use_cache(db):
+        return await load()
+    return await task_reads.do(key, load)
+
+
+def _depends_on(ids: Collection[int]):
+    """Where clause matching the tasks that depend on any of ids"""
+    return Task.id.in_(
+        select(TaskDependency.task_id).where(TaskDependency.depends_on_id.in_(ids))
+    )
+
+
+async def _announce_released(released: List[Tuple[int, int]], *, enqueue: bool) -> None:
+    """
+    After the commit, drop the cached copies of the tasks _release_waiting
+    started, publish their status and, without enqueue, run them
+    """
+    if not released:
+        return
+    await invalidate_cache(*(id for id, _ in released))
+    for id, _ in released:
+        await _publish_status(id, "in_progress", "waiting")
+    if not enqueue:
+        _run_in_background(released)
+
+
+def _prerequisites_cte(id: int):
+    """Recursive CTE of the ids of all transitive prerequisites of a task"""
+    direct = select(TaskDependency.depends_on_id.label("id")).where(
+        TaskDependency.task_id == id
+    )
+    prerequisites = direct.cte("prerequisites", recursive=True)
+    # UNION rather than UNION ALL, so shared ancestors are walked once
+    return prerequisites.union(
+        select(TaskDependency.depends_on_id).join(
+            prerequisites, TaskDependency.task_id == prerequisites.c.id
+        )
+    )
+
+
+def _run_in_background(tasks: List[Tuple[int, int]]) -> None:
+    """
+    Hand started tasks, as (id, priority) pairs, to the API process's
+    scheduler, for TASK_EXECUTION_MODE "background"
+    """
+    # Imported here, the worker module imports this one
+    from app.tasks.scheduler import task_scheduler
+    from app.tasks.worker import process_task_in_background
+
+    for id, priority in tasks:
+        task_scheduler.submit(priority, partial(process_task_in_background, id))
+
+
+def _projection(fields: Optional[Sequence[str]], *needed: str) -> Tuple[str, ...]:
+    """
+    The task columns to read for a sparse fieldset plus any needed
+    columns, in TaskRow order; all of them without a fieldset
+    """
+    if fields is None:
+        return TASK_ROW_FIELDS
+    wanted = {*fields, *needed}
+    return tuple(field for field in TASK_ROW_FIELDS if field in wanted)
+
+
+def _list_key(kind: str, **shape: Any) -> str:
+    """task_reads key of a list query, from everything that shapes it"""
+    return f"list:{kind}:" + json.dumps(shape, sort_keys=True, default=str)
+
+
+def _use_cache(db: AsyncSession) -> bool:
+    # Sessions serving a client's reads right after its own writes skip
+    # cached entries, which may have been filled from a lagging replica
+    return not db.info.get("read_your_writes")
+
+
+def _fill_cache(db: AsyncSession) -> bool:
+    # A replica read can predate a write whose invalidation already ran;
+    # cached, it would be served to every client until the TTL, so only
+    # reads from the primary fill the shared cache
+    return not db.info.get("replica")
+
+
+def _cache_key(id: int, with_logs: bool = False) -> str:
+    return f"task:{id}:logs" if with_logs else f"task:{id}"
+
+
+def _row_to_cache(obj) -> Dict[str, Any]:
+    data = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _row_from_cache(model, data: Dict[str, Any]):
+    values = {}
+    for column in model.__table__.columns:
+        value = data[column.key]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return model(**values)
+
+
+def _to_cache(task: Task, with_logs: bool = False) -> Dict[str, Any]:
+    """Snapshot a task's column values (and logs) as JSON-friendly data"""
+    data = _row_to_cache(task)
+    if with_logs:
+        data["logs"] = [_row_to_cache(log) for log in task.logs]
+    return data
+
+
+async def _from_cache(db: AsyncSession, data: Dict[str, Any]) -> Task:
+    """
+    Rebuild a task from a cache snapshot and attach it to the session
+
+    merge(load=False) registers the object as persistent without a SELECT,
+    so callers can use it like a freshly loaded row.
+    """
+    task = _row_from_cache(Task, data)
+    if "logs" in data:
+        task.logs = [_row_from_cache(TaskLog, log) for log in data["logs"]]
+        for log in task.logs:
+            make_transient_to_detached(log)
+    make_transient_to_detached(task)
+    return await db.merge(task, load=False)
+
+
+def _chunks(items: List) -> List[List]:
+    size = settings.BULK_CHUNK_SIZE
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _db_error(e: SQLAlchemyError) -> str:
+    return f"Database error: {e.__class__.__name__}"
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+        if err["loc"]
+        else err["msg"]
+        for err in e.errors()
+    )
+
 
 task_service = TaskService()
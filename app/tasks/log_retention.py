@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.services.task import task_service
+from app.utils.ndjson import gzip_appender
+
+logger = logging.getLogger(__name__)
+
+
+async def main(
+    days: int = settings.TASK_LOG_RETENTION_DAYS,
+    batch_size: int = settings.TASK_LOG_RETENTION_BATCH_SIZE,
+    archive: Optional[str] = None,
+):
+    """Delete task logs older than the retention period, optionally archiving them"""
+    before = datetime.now(timezone.utc) - timedelta(days=days)
+    async with async_session() as db:
+        purged = await task_service.purge_logs(
+            db,
+            before=before,
+            batch_size=batch_size,
+            archive=gzip_appender(archive) if archive else None,
+        )
+    logger.info(f"Purged {purged} task logs created before {before.isoformat()}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Delete task logs past retention")
+    parser.add_argument(
+        "--days", type=int, default=settings.TASK_LOG_RETENTION_DAYS,
+        help="keep logs from the last this many days",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.TASK_LOG_RETENTION_BATCH_SIZE,
+        help="logs deleted per transaction",
+    )
+    parser.add_argument(
+        "--archive", help="append the deleted logs to this .ndjson.gz file first"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.batch_size, args.archive))
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from app.db.base import async_session
+from app.services.stats import stats_service
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Recompute the task counters, e.g. after manual changes to the tasks table"""
+    async with async_session() as db:
+        await stats_service.rebuild(db)
+    logger.info("Task stats rebuilt")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import (
+    Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Tuple
+)
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Work = Callable[[], Awaitable[Any]]
+
+
+def effective_priority(
+    priority: int, queued_at: float, now: float, aging: float
+) -> float:
+    """A waiting item's priority, raised by one level per aging seconds waited"""
+    return priority + (now - queued_at) / aging
+
+
+def rank(priority: int, queued_at: float, aging: float) -> float:
+    """
+    Time-independent sort key for effective_priority, lowest runs first
+
+    The aging term of effective_priority grows at the same rate for every
+    waiting item, so ordering by queued_at / aging - priority is the same
+    at any point in time and can be stored, e.g. on a job row.
+    """
+    return queued_at / aging - priority
+
+
+class PriorityScheduler:
+    """
+    Runs submitted work by priority, with aging and per-band concurrency
+
+    Work waits in one FIFO per priority band. Whenever a slot frees up the
+    band heads are compared by effective priority, so old low-priority
+    work eventually overtakes fresh high-priority work instead of
+    starving. At most concurrency items run at once, and at most
+    band_slots[p] of priority p, which keeps slots free for the other
+    bands when one of them floods the queue.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        band_slots: Mapping[int, int],
+        aging: float,
+    ):
+        self.concurrency = concurrency
+        self.band_slots = dict(band_slots)
+        self.aging = aging
+        # Per band, a heap of (queued_at, sequence, work)
+        self._waiting: Dict[int, List[Tuple[float, int, Work]]] = {}
+        self._running: Dict[int, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._sequence = itertools.count()
+        self._freed: Optional[asyncio.Event] = None
+
+    def slots(self, priority: int) -> int:
+        return min(self.band_slots.get(priority, self.concurrency), self.concurrency)
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(heap) for heap in self._waiting.values())
+
+    @property
+    def free(self) -> int:
+        """Slots not taken by running work"""
+        return self.concurrency - self.running
+
+    def _used(self, priority: int) -> int:
+        return self._running.get(priority, 0) + len(self._waiting.get(priority, ()))
+
+    def full_bands(self) -> List[int]:
+        """Bands whose slots are all taken by running or waiting work"""
+        return [
+            priority
+            for priority in set(self._running) | set(self._waiting)
+            if self._used(priority) >= self.slots(priority)
+        ]
+
+    def capacity(self) -> int:
+        """
+        How many items of any band outside full_bands() can be submitted
+        and all start right away: the free slots, capped by the smallest
+        headroom left in a band
+        """
+        headroom = [
+            self.slots(priority) - self._used(priority)
+            for priority in set(self.band_slots) | set(self._running)
+        ]
+        return min([self.free, *(room for room in headroom if room > 0)])
+
+    def submit(
+        self, priority: int, work: Work, *, queued_at: Optional[float] = None
+    ) -> None:
+        """
+        Queue work (a coroutine function) to run at the given priority
+
+        queued_at is the wall-clock time the work started waiting, for
+        work that already waited elsewhere, e.g. in the job table.
+        """
+        entry = (queued_at or time.time(), next(self._sequence), work)
+        heapq.heappush(self._waiting.setdefault(priority, []), entry)
+        self._dispatch()
+
+    async def slot_freed(self) -> None:
+        """Wait until some running item finishes"""
+        if self._freed is None:
+            # Created here rather than in __init__ to bind the running loop
+            self._freed = asyncio.Event()
+        self._freed.clear()
+        await self._freed.wait()
+
+    async def join(self) -> None:
+        """Wait until all submitted work has run"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """Per band: slots, running and waiting items, oldest wait in seconds"""
+        now = time.time()
+        return {
+            priority: {
+                "slots": self.slots(priority),
+                "running": self._running.get(priority, 0),
+                "waiting": len(self._waiting.get(priority, ())),
+                "oldest_wait": (
+                    now - self._waiting[priority][0][0]
+                    if self._waiting.get(priority) else 0.0
+                ),
+            }
+            for priority in sorted(set(self._running) | set(self._waiting))
+        }
+
+    def _next_band(self) -> Optional[int]:
+        now = time.time()
+        best, best_priority = None, None
+        for priority, heap in self._waiting.items():
+            if not heap or self._running.get(priority, 0) >= self.slots(priority):
+                continue
+            effective = effective_priority(priority, heap[0][0], now, self.aging)
+            if best_priority is None or effective > best_priority:
+                best, best_priority = priority, effective
+        return best
+
+    def _dispatch(self) -> None:
+        while self.running < self.concurrency:
+            priority = self._next_band()
+            if priority is None:
+                break
+            queued_at, _, work = heapq.heappop(self._waiting[priority])
+            if not self._waiting[priority]:
+                del self._waiting[priority]
+            self._running[priority] = self._running.get(priority, 0) + 1
+            waited = max(time.time() - queued_at, 0.0)
+            metrics.SCHEDULER_WAIT.observe(str(priority), value=waited)
+            task = asyncio.create_task(self._run(priority, work))
+            self._tasks.add(task)
+        self._export()
+
+    async def _run(self, priority: int, work: Work) -> None:
+        try:
+            await work()
+        except Exception as e:
+            logger.error(f"Scheduled priority {priority} work failed: {e}")
+        finally:
+            self._running[priority] -= 1
+            if not self._running[priority]:
+                del self._running[priority]
+            self._tasks.discard(asyncio.current_task())
+            if self._freed is not None:
+                self._freed.set()
+            self._dispatch()
+
+    def _export(self) -> None:
+        for priority in set(self.band_slots) | set(self._running) | set(self._waiting):
+            band = str(priority)
+            metrics.SCHEDULER_RUNNING.set(band, value=self._running.get(priority, 0))
+            metrics.SCHEDULER_WAITING.set(
+                band, value=len(self._waiting.get(priority, ()))
+            )
+
+
+# Runs processing in the API process when TASK_EXECUTION_MODE is
+# "background"; the worker has its own, sized by its --concurrency
+task_scheduler = PriorityScheduler(
+    concurrency=settings.WORKER_CONCURRENCY,
+    band_slots=settings.SCHEDULER_BAND_SLOTS,
+    aging=settings.SCHEDULER_AGING_SECONDS,
+)
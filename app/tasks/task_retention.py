@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.services.task import task_service
+from app.tasks.scheduler import task_scheduler
+from app.utils.ndjson import gzip_appender
+
+logger = logging.getLogger(__name__)
+
+
+async def main(
+    days: int = settings.TASK_RETENTION_DAYS,
+    statuses: Optional[List[str]] = None,
+    batch_size: int = settings.TASK_RETENTION_BATCH_SIZE,
+    pause: float = settings.TASK_RETENTION_PAUSE,
+    archive: Optional[str] = None,
+):
+    """Delete finished tasks past the retention period, optionally archiving them"""
+    statuses = statuses or settings.TASK_RETENTION_STATUSES
+    before = datetime.now(timezone.utc) - timedelta(days=days)
+    async with async_session() as db:
+        purged = await task_service.purge_tasks(
+            db,
+            statuses=statuses,
+            before=before,
+            batch_size=batch_size,
+            pause=pause,
+            archive=gzip_appender(archive) if archive else None,
+        )
+    # In background mode, dependents the purge started run in this process
+    await task_scheduler.join()
+    logger.info(
+        f"Purged {purged} {'/'.join(statuses)} tasks last updated before "
+        f"{before.isoformat()}"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Delete finished tasks past retention")
+    parser.add_argument(
+        "--days", type=int, default=settings.TASK_RETENTION_DAYS,
+        help="keep tasks updated in the last this many days",
+    )
+    parser.add_argument(
+        "--status", dest="statuses", action="append",
+        help="status to purge, repeatable (default: TASK_RETENTION_STATUSES)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.TASK_RETENTION_BATCH_SIZE,
+        help="ids covered per transaction",
+    )
+    parser.add_argument(
+        "--pause", type=float, default=settings.TASK_RETENTION_PAUSE,
+        help="seconds to wait between batches",
+    )
+    parser.add_argument(
+        "--archive",
+        help="append the deleted tasks and their logs to this .ndjson.gz file first",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.days, args.statuses, args.batch_size, args.pause, args.archive)
+    )
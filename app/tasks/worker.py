@@ -1,61 +1,306 @@
+import argparse
 import asyncio
 import logging
+import os
+import signal
+import socket
+import time
+from functools import partial
+from typing import List, Mapping, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import metrics
+from app.core.config import settings
+from app.db.base import async_session
+from app.models.job import Job
+from app.models.task import Task
 from app.schemas.task import TaskUpdate
-from app.services.task import task_service
-from app.utils.notifications import send_notification
+from app.services.job import job_service
+from app.services.task import task_cache, task_events, task_service
+from app.tasks.scheduler import PriorityScheduler
+from app.utils.notifications import notifications
 
 logger = logging.getLogger(__name__)
 
 
+async def run_task(task_id: int, db: AsyncSession) -> Optional[Task]:
+    """
+    Run the processing steps for a task and mark it completed
+
+    Errors propagate to the caller, which decides between retrying and
+    marking the task failed.
+    """
+    metrics.TASKS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        return await _run_task(task_id, db)
+    except Exception:
+        metrics.TASK_FAILURES.inc()
+        raise
+    finally:
+        metrics.TASKS_IN_FLIGHT.dec()
+        metrics.TASK_DURATION.observe(value=time.perf_counter() - start)
+
+
+async def _run_task(task_id: int, db: AsyncSession) -> Optional[Task]:
+    # Get the task
+    task = await task_service.get(db, task_id)
+    if not task:
+        logger.error(f"Task {task_id} not found")
+        return None
+
+    # Simulate processing steps
+    logger.info(f"Processing task {task_id}: Step 1")
+    await asyncio.sleep(2)  # Simulate work
+
+    logger.info(f"Processing task {task_id}: Step 2")
+    await asyncio.sleep(3)  # Simulate more work
+
+    # Update task to completed
+    task_update = TaskUpdate(status="completed")
+    updated_task = await task_service.update(db, id=task_id, obj_in=task_update)
+
+    # Send notification, delivered in the background
+    notifications.notify(
+        f"Task {task_id} ({task.title}) has been completed successfully."
+    )
+
+    logger.info(f"Task {task_id} processed successfully")
+    return updated_task
+
+
+async def mark_failed(task_id: int, db: AsyncSession, error: Exception) -> None:
+    """Mark a task as failed and notify about it"""
+    try:
+        await db.rollback()
+        task = await task_service.get(db, task_id)
+        if task:
+            task_update = TaskUpdate(status="failed")
+            await task_service.update(db, id=task_id, obj_in=task_update)
+
+            # Send notification about failure
+            notifications.notify(
+                f"Task {task_id} ({task.title}) processing failed: {str(error)}"
+            )
+    except Exception as inner_e:
+        logger.error(f"Error updating failed task {task_id}: {str(inner_e)}")
+
+
+async def process_task_in_background(task_id: int) -> None:
+    """Process a task in the API process, in a session of its own"""
+    async with async_session() as db:
+        await process_task(task_id, db)
+
+
 async def process_task(task_id: int, db: AsyncSession):
     """
     Process a task in the background
-    
+
     This simulates a long-running task with status updates and notifications
     """
     logger.info(f"Starting to process task {task_id}")
-    
+
     try:
-        # Get the task
-        task = await task_service.get(db, task_id)
-        if not task:
-            logger.error(f"Task {task_id} not found")
-            return
-        
-        # Simulate processing steps
-        logger.info(f"Processing task {task_id}: Step 1")
-        await asyncio.sleep(2)  # Simulate work
-        
-        logger.info(f"Processing task {task_id}: Step 2")
-        await asyncio.sleep(3)  # Simulate more work
-        
-        # Update task to completed
-        task_update = TaskUpdate(status="completed")
-        updated_task = await task_service.update(db, db_obj=task, obj_in=task_update)
-        
-        # Send notification
-        await send_notification(
-            f"Task {task_id} ({task.title}) has been completed successfully."
-        )
-        
-        logger.info(f"Task {task_id} processed successfully")
-        return updated_task
-        
+        return await run_task(task_id, db)
     except Exception as e:
         logger.error(f"Error processing task {task_id}: {str(e)}")
-        
+
         # Update task to failed
-        try:
-            task = await task_service.get(db, task_id)
-            if task:
-                task_update = TaskUpdate(status="failed")
-                await task_service.update(db, db_obj=task, obj_in=task_update)
-                
-                # Send notification about failure
-                await send_notification(
-                    f"Task {task_id} ({task.title}) processing failed: {str(e)}"
+        await mark_failed(task_id, db, e)
+
+
+class Worker:
+    """
+    Claims jobs from the job queue and processes them concurrently
+
+    Jobs are claimed by priority with aging and run through a
+    PriorityScheduler, which holds each priority band to its slots. Each
+    job runs in its own session. A job that raises is retried with
+    backoff until it runs out of attempts, at which point its task is
+    marked failed; so is the task of a job whose lease expired on its
+    last attempt.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+        poll_interval: float = settings.WORKER_POLL_INTERVAL,
+        visibility_timeout: int = settings.JOB_VISIBILITY_TIMEOUT,
+        band_slots: Mapping[int, int] = settings.SCHEDULER_BAND_SLOTS,
+        aging: float = settings.SCHEDULER_AGING_SECONDS,
+        session_factory=async_session,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.scheduler = PriorityScheduler(
+            concurrency=concurrency, band_slots=band_slots, aging=aging
+        )
+        self._stopping = asyncio.Event()
+        self._depth_reported = 0.0
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; run() returns once in-flight jobs finish"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info(
+            f"Worker {self.worker_id} started with concurrency {self.concurrency}"
+        )
+        while not self._stopping.is_set():
+            try:
+                await self.sweep()
+                await self.claim()
+            except Exception as e:
+                logger.error(f"Error claiming jobs: {str(e)}")
+            await self._report_depth()
+            await self._wait()
+
+        if self.scheduler.running:
+            logger.info(f"Waiting for {self.scheduler.running} in-flight jobs")
+        await self.scheduler.join()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    async def claim(self) -> List[Job]:
+        """
+        Claim jobs for the free slots and hand them to the scheduler
+
+        Each claim takes at most scheduler.capacity() jobs and skips full
+        bands, so every claimed job starts right away rather than holding
+        its lease while it waits for a slot.
+        """
+        claimed = []
+        async with self.session_factory() as db:
+            while (limit := self.scheduler.capacity()) > 0:
+                jobs = await job_service.claim(
+                    db,
+                    worker_id=self.worker_id,
+                    limit=limit,
+                    visibility_timeout=self.visibility_timeout,
+                    exclude_priorities=self.scheduler.full_bands(),
+                )
+                for job in jobs:
+                    self.scheduler.submit(
+                        job.priority,
+                        partial(self.handle, job),
+                        queued_at=job.queued_at.timestamp(),
+                    )
+                claimed.extend(jobs)
+                if len(jobs) < limit:
+                    break
+        return claimed
+
+    async def sweep(self) -> List[int]:
+        """Fail jobs whose lease expired on their last attempt, and their tasks"""
+        async with self.session_factory() as db:
+            task_ids = await job_service.fail_expired(db)
+            for task_id in task_ids:
+                logger.error(f"Task {task_id} timed out on its last attempt")
+                await mark_failed(
+                    task_id, db, TimeoutError("Lease expired on the last attempt")
                 )
-        except Exception as inner_e:
-            logger.error(f"Error updating failed task {task_id}: {str(inner_e)}")
+        return task_ids
+
+    async def handle(self, job: Job) -> None:
+        """Process one claimed job and settle it"""
+        logger.info(
+            f"Starting to process task {job.task_id} "
+            f"(job {job.id}, attempt {job.attempts})"
+        )
+        async with self.session_factory() as db:
+            try:
+                await run_task(job.task_id, db)
+            except Exception as e:
+                logger.error(f"Error processing task {job.task_id}: {str(e)}")
+                await db.rollback()
+                if await job_service.fail(db, job=job, error=str(e)):
+                    await mark_failed(job.task_id, db, e)
+                return
+            await job_service.complete(db, job=job)
+
+    async def _report_depth(self) -> None:
+        """Export the queued jobs per band, at most once per poll interval"""
+        now = time.monotonic()
+        if now - self._depth_reported < self.poll_interval:
+            return
+        self._depth_reported = now
+        try:
+            async with self.session_factory() as db:
+                depth = await job_service.queue_depth(db)
+        except Exception as e:
+            logger.error(f"Error reading the job queue depth: {str(e)}")
+            return
+        for priority in set(self.scheduler.band_slots) | set(depth):
+            metrics.JOB_QUEUE_DEPTH.set(str(priority), value=depth.get(priority, 0))
+
+    async def _wait(self) -> None:
+        """Sleep until the poll interval passes, a slot frees up or stop()"""
+        waiters = [
+            asyncio.create_task(self._stopping.wait()),
+            asyncio.create_task(self.scheduler.slot_freed()),
+        ]
+        await asyncio.wait(
+            waiters,
+            timeout=self.poll_interval,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def main(
+    concurrency: int,
+    poll_interval: float,
+    visibility_timeout: int,
+    metrics_port: Optional[int] = None,
+):
+    if metrics_port is not None:
+        await metrics.serve(metrics_port)
+    worker = Worker(
+        concurrency=concurrency,
+        poll_interval=poll_interval,
+        visibility_timeout=visibility_timeout,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await notifications.drain(settings.NOTIFICATION_DRAIN_TIMEOUT)
+        await task_events.stop()
+        await task_cache.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Process queued task jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument(
+        "--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL
+    )
+    parser.add_argument(
+        "--visibility-timeout", type=int, default=settings.JOB_VISIBILITY_TIMEOUT
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics of this worker on the given port",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.concurrency,
+            args.poll_interval,
+            args.visibility_timeout,
+            args.metrics_port,
+        )
+    )
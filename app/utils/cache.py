@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.utils.events import Event, EventBackend
+
+logger = logging.getLogger(__name__)
+
+# Keys per invalidation message, which keeps each message well below the
+# 8000 byte payload limit of Postgres NOTIFY
+INVALIDATION_BATCH_SIZE = 200
+
+
+class CacheBackend:
+    """
+    Interface for cache stores
+
+    Values must be JSON-serializable so they can be kept in a store shared
+    between processes (Redis, Memcached, ...).
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """In-process cache with a size bound and per-entry expiry"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        self.discard(*keys)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def discard(self, *keys: str) -> None:
+        """delete() for synchronous callers"""
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class LocalSharedCache(CacheBackend):
+    """
+    Local stand-in for a shared cache server
+
+    Stores values JSON-encoded, as a networked store would, so code written
+    against it behaves the same once a real shared backend is plugged in.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return json.loads(data)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, json.dumps(value))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+SHARED_BACKENDS = {
+    "local": LocalSharedCache,
+}
+
+
+class TieredCache:
+    """
+    Read-through cache with an in-process LRU in front of an optional shared
+    backend
+
+    Lookups try the local LRU first, then the shared backend, whose hits are
+    copied into the LRU. Writes and invalidations go to both tiers.
+
+    With an invalidations backend, deletes are also broadcast to the other
+    processes, which drop the keys from their LRU. A process only uses its
+    LRU while it listens for those broadcasts; when it cannot, it retries
+    after a TTL and meanwhile reads through to the shared tier. Without
+    one, local entries in other processes only expire through their TTL,
+    which bounds how stale they can get.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        ttl: float,
+        shared: Optional[CacheBackend] = None,
+        invalidations: Optional[EventBackend] = None,
+        enabled: bool = True,
+    ):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.local = LRUCache(max_size)
+        self.shared = shared
+        self.invalidations = invalidations
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        # Tells this cache's own broadcasts from other processes' ones
+        self._origin = uuid.uuid4().hex
+        self._listening = False
+        self._listen_retry_at = 0.0
+        self._listen_lock: Optional[asyncio.Lock] = None
+
+    async def _use_local(self) -> bool:
+        """Whether the LRU can be used, starting to listen if need be"""
+        if self.invalidations is None or self._listening:
+            return True
+        if time.monotonic() < self._listen_retry_at:
+            return False
+        if self._listen_lock is None:
+            # Created here rather than in __init__ to bind the running loop
+            self._listen_lock = asyncio.Lock()
+        async with self._listen_lock:
+            if not self._listening and time.monotonic() >= self._listen_retry_at:
+                try:
+                    await self.invalidations.start(self._on_invalidation)
+                    self._listening = True
+                except Exception as e:
+                    self._listen_retry_at = time.monotonic() + self.ttl
+                    logger.warning(
+                        f"Not listening for cache invalidations, bypassing the "
+                        f"local cache for {self.ttl}s: {e}"
+                    )
+        return self._listening
+
+    def _on_invalidation(self, event: Event) -> None:
+        if event.get("origin") != self._origin:
+            self.local.discard(*event.get("keys", ()))
+
+    async def _broadcast(self, keys: List[str]) -> None:
+        if not self.enabled or self.invalidations is None:
+            return
+        if not await self._use_local():
+            return
+        for i in range(0, len(keys), INVALIDATION_BATCH_SIZE):
+            batch = keys[i:i + INVALIDATION_BATCH_SIZE]
+            try:
+                await self.invalidations.publish({"origin": self._origin, "keys": batch})
+            except Exception as e:
+                logger.error(f"Failed to broadcast cache invalidation: {e}")
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        use_local = await self._use_local()
+        value = await self.local.get(key) if use_local else None
+        if value is None and self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None:
+                self.shared_hits += 1
+                if use_local:
+                    await self.local.set(key, value, self.ttl)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        if await self._use_local():
+            await self.local.set(key, value, self.ttl)
+        if self.shared is not None:
+            await self.shared.set(key, value, self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        await self.local.delete(*keys)
+        if self.shared is not None:
+            await self.shared.delete(*keys)
+        await self._broadcast(list(keys))
+
+    async def clear(self) -> None:
+        await self.local.clear()
+        if self.shared is not None:
+            await self.shared.clear()
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations"""
+        if self._listening:
+            self._listening = False
+            await self.invalidations.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "evictions": self.local.evictions,
+        }
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Optional
+
+
+class PreconditionFailedError(Exception):
+    """Raised when an If-Match precondition does not hold"""
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values that determine a representation
+
+    The parts are hashed, so the tag stays short and opaque whatever goes
+    into it.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str, *, weak: bool) -> bool:
+    """
+    Whether an If-Match/If-None-Match header value matches an ETag
+
+    The header holds "*" or a comma-separated list of tags. If-None-Match
+    uses the weak comparison (a W/ prefix is ignored), If-Match the strong
+    one (weak tags never match).
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+
+# Put into idle subscriber queues so streams can send keep-alives
+HEARTBEAT: Event = {}
+
+
+class EventBackend:
+    """
+    Interface for carrying events between processes
+
+    publish() sends an event to every process, this one included; each
+    process's broker receives it through the deliver callback given to
+    start().
+    """
+
+    async def start(self, deliver: Callable[[Event], None]) -> None:
+        raise NotImplementedError
+
+    async def publish(self, event: Event) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+
+class LocalEventBackend(EventBackend):
+    """
+    Local stand-in for a cross-process backend
+
+    Delivers JSON round-tripped events back to this process only, as a
+    networked backend would deliver them.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[Event], None]] = None
+
+    async def start(self, deliver: Callable[[Event], None]) -> None:
+        self._deliver = deliver
+
+    async def publish(self, event: Event) -> None:
+        if self._deliver is not None:
+            self._deliver(json.loads(json.dumps(event)))
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class PostgresEventBackend(EventBackend):
+    """
+    Postgres LISTEN/NOTIFY backend
+
+    One connection listens on the channel for the whole process; publishing
+    goes through a small separate pool. The listener reconnects after
+    losing its connection; events sent meanwhile are missed, which clients
+    cover by re-reading the task when they resubscribe.
+    """
+
+    def __init__(self, dsn: str, channel: str = "task_events"):
+        self.dsn = dsn
+        self.channel = channel
+        self._deliver: Optional[Callable[[Event], None]] = None
+        self._listener = None
+        self._pool = None
+        self._reconnect: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[Event], None]) -> None:
+        import asyncpg
+
+        self._deliver = deliver
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._listen()
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_termination)
+        await self._listener.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed event on {channel}: {payload!r}")
+            return
+        if self._deliver is not None:
+            self._deliver(event)
+
+    def _on_termination(self, connection) -> None:
+        if self._deliver is not None and self._reconnect is None:
+            self._reconnect = asyncio.get_running_loop().create_task(self._relisten())
+
+    async def _relisten(self) -> None:
+        delay = 1.0
+        try:
+            while True:
+                try:
+                    await self._listen()
+                    logger.info(f"Listening on {self.channel} again")
+                    return
+                except Exception as e:
+                    logger.warning(f"Reconnecting event listener failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+        finally:
+            self._reconnect = None
+
+    async def publish(self, event: Event) -> None:
+        await self._pool.execute(
+            "SELECT pg_notify($1, $2)", self.channel, json.dumps(event)
+        )
+
+    async def stop(self) -> None:
+        self._deliver = None
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._listener is not None:
+            await self._listener.close()
+        if self._pool is not None:
+            await self._pool.close()
+
+
+EVENT_BACKENDS: Dict[str, Callable[..., EventBackend]] = {
+    "local": LocalEventBackend,
+    "postgres": PostgresEventBackend,
+}
+
+
+class Subscription:
+    """Events for a set of keys, buffered in a bounded queue"""
+
+    def __init__(self, keys: Set[Any], queue_size: int):
+        self.keys = keys
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(queue_size)
+        # Events discarded because the subscriber fell behind
+        self.dropped = 0
+
+    def put(self, event: Event) -> None:
+        if self.queue.full():
+            # Keep the latest events, older states are superseded anyway
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        return await self.queue.get()
+
+
+class EventBroker:
+    """
+    Fans events out to in-process subscribers
+
+    Events are routed by the value of key_field, so delivery only touches
+    the subscribers of that key. An idle subscriber is just a queue and a
+    suspended coroutine: there are no per-subscriber timers, one heartbeat
+    loop feeds keep-alives to the idle queues instead.
+    """
+
+    def __init__(
+        self,
+        backend: EventBackend,
+        *,
+        key_field: str,
+        queue_size: int = 16,
+        heartbeat: float = 15.0,
+    ):
+        self.backend = backend
+        self.key_field = key_field
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[Any, Set[Subscription]] = {}
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    async def start(self) -> None:
+        if self._start_lock is None:
+            # Created here rather than in __init__ to bind the running loop
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if not self._started:
+                await self.backend.start(self._deliver)
+                self._heartbeat_task = asyncio.create_task(self._beat())
+                self._started = True
+
+    async def stop(self) -> None:
+        if not self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                self._heartbeat_task.cancel()
+                await self.backend.stop()
+                self._started = False
+
+    async def publish(self, event: Event) -> None:
+        """Send an event to subscribers in every process, never raises"""
+        try:
+            if not self._started:
+                await self.start()
+            await self.backend.publish(event)
+        except Exception as e:
+            logger.error(f"Failed to publish event {event}: {e}")
+
+    @asynccontextmanager
+    async def subscribe(self, *keys: Any) -> AsyncIterator[Subscription]:
+        """Receive the events of the given keys while the context is open"""
+        if not self._started:
+            await self.start()
+        subscription = Subscription(set(keys), self.queue_size)
+        for key in subscription.keys:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            for key in subscription.keys:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def _deliver(self, event: Event) -> None:
+        for subscription in self._subscribers.get(event.get(self.key_field), ()):
+            subscription.put(event)
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for subscribers in list(self._subscribers.values()):
+                for subscription in subscribers:
+                    if subscription.queue.empty():
+                        subscription.put(HEARTBEAT)
@@ -0,0 +1,85 @@
+import gzip
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, List, Mapping, Optional
+
+# Upper bound on decompressed bytes produced per step, so a small gzip
+# chunk cannot expand into an unbounded buffer
+DECOMPRESS_STEP = 64 * 1024
+
+
+async def _decompress(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gunzip a byte stream incrementally, including multi-member files"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk, DECOMPRESS_STEP)
+            if data:
+                yield data
+            if decompressor.eof:
+                # Start of another gzip member
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                chunk = decompressor.unconsumed_tail
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], *, gzipped: bool = False, max_line_length: int
+) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a (optionally gzipped) byte stream into lines without buffering it
+
+    Only the current partial line is held in memory. A line longer than
+    max_line_length is discarded and reported as None, so the caller can
+    reject it and carry on with the next one. Every line is yielded,
+    blank ones included, so callers can report accurate line numbers.
+    """
+    if gzipped:
+        chunks = _decompress(chunks)
+
+    buffer = bytearray()
+    overflow = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_length:
+                        overflow = True
+                        buffer.clear()
+                break
+            if overflow:
+                yield None
+                overflow = False
+            else:
+                buffer += chunk[start:end]
+                yield None if len(buffer) > max_line_length else bytes(buffer)
+            buffer.clear()
+            start = end + 1
+
+    if overflow:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def gzip_appender(path: str) -> Callable[[List[Mapping[str, Any]]], None]:
+    """
+    An archive callback for the retention jobs: appends each batch of rows
+    to a gzip-compressed NDJSON file
+    """
+
+    def archive(rows: List[Mapping[str, Any]]) -> None:
+        # One gzip member per batch; gzip readers concatenate members
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=datetime.isoformat) + "\n")
+
+    return archive
@@ -1,20 +1,255 @@
 import asyncio
 import logging
+import random
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DESTINATION = "default"
+
+# Queued by drain() to stop the collector once everything before it is taken
+_STOP = object()
+
+
+class NotificationSender:
+    """Delivers a batch of messages to one destination, raising on failure"""
+
+    async def send(self, messages: List[str]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LogSender(NotificationSender):
+    """
+    Writes notifications to the log
+
+    Used when no webhook is configured. In a real application, this could
+    send an email, push notification, or message to a queue.
+    """
+
+    async def send(self, messages: List[str]) -> None:
+        for message in messages:
+            logger.info(f"NOTIFICATION: {message}")
 
-async def send_notification(message: str) -> bool:
+
+class WebhookSender(NotificationSender):
     """
-    Send a notification about task status
-    
-    This is a placeholder implementation that logs the message.
-    In a real application, this could send an email, push notification, 
-    webhook, or message to a queue.
+    POSTs batches as {"messages": [...]} to a webhook URL
+
+    All deliveries share one HTTP client, so connections to the target are
+    pooled and reused.
     """
-    logger.info(f"NOTIFICATION: {message}")
-    
-    # Simulate sending notification
-    await asyncio.sleep(0.5)
-    
-    return True
+
+    def __init__(self, url: str, *, timeout: float, max_connections: int):
+        self.url = url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported on first delivery; httpx is among the slowest imports
+            # of the app and most deployments never configure a webhook
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+        return self._client
+
+    async def send(self, messages: List[str]) -> None:
+        response = await self.client.post(self.url, json={"messages": messages})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class NotificationDispatcher:
+    """
+    Delivers notifications in the background
+
+    notify() only puts the message on a bounded queue, so callers never
+    wait for delivery. A collector groups queued messages per destination
+    for up to batch_window seconds (or batch_size messages), drops
+    duplicates within a batch, and hands each batch to a delivery task; at
+    most concurrency deliveries run at once. A failed delivery is retried
+    with jittered exponential backoff, up to max_attempts attempts.
+    """
+
+    def __init__(
+        self,
+        senders: Dict[str, NotificationSender],
+        *,
+        queue_size: int = 1000,
+        concurrency: int = 4,
+        batch_size: int = 50,
+        batch_window: float = 0.5,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.senders = senders
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self._closed = False
+
+    def notify(self, message: str, destination: str = DEFAULT_DESTINATION) -> bool:
+        """
+        Queue a notification, returns False if it was dropped because the
+        queue is full or the dispatcher has been drained
+        """
+        if destination not in self.senders:
+            raise ValueError(f"Unknown notification destination {destination!r}")
+        if self._closed:
+            logger.warning(f"Dispatcher closed, dropping notification: {message}")
+            self.dropped += 1
+            return False
+        if self._collector is None:
+            # Created on first use, inside the running event loop
+            self._queue = asyncio.Queue(self.queue_size)
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._collector = asyncio.create_task(self._collect())
+        try:
+            self._queue.put_nowait((destination, message))
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue full, dropping: {message}")
+            self.dropped += 1
+            return False
+        return True
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        Deliver everything queued, then stop accepting notifications
+
+        Deliveries still running (or retrying) after timeout seconds are
+        cancelled.
+        """
+        self._closed = True
+        if self._collector is None:
+            return
+        try:
+            await asyncio.wait_for(self._finish(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out draining notifications, cancelling the rest")
+            self._collector.cancel()
+            for delivery in list(self._deliveries):
+                delivery.cancel()
+        finally:
+            for sender in self.senders.values():
+                await sender.close()
+
+    async def _finish(self) -> None:
+        await self._queue.put(_STOP)
+        await self._collector
+        while self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batches: Dict[str, List[str]] = {}
+            deadline = loop.time() + self.batch_window
+            while True:
+                destination, message = item
+                batch = batches.setdefault(destination, [])
+                batch.append(message)
+                if len(batch) >= self.batch_size:
+                    await self._dispatch(destination, batches.pop(destination))
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+            for destination, batch in batches.items():
+                await self._dispatch(destination, batch)
+
+    async def _dispatch(self, destination: str, messages: List[str]) -> None:
+        # Waiting for a free slot here keeps at most concurrency deliveries
+        # running; meanwhile new notifications wait in the bounded queue
+        await self._slots.acquire()
+        delivery = asyncio.create_task(
+            self._deliver(destination, list(dict.fromkeys(messages)))
+        )
+        self._deliveries.add(delivery)
+        delivery.add_done_callback(self._delivered)
+
+    def _delivered(self, delivery: asyncio.Task) -> None:
+        self._deliveries.discard(delivery)
+        self._slots.release()
+
+    async def _deliver(self, destination: str, messages: List[str]) -> None:
+        sender = self.senders[destination]
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await sender.send(messages)
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.failed += len(messages)
+                    logger.error(
+                        f"Giving up on {len(messages)} notification(s) to "
+                        f"{destination} after {attempt} attempts: {e}"
+                    )
+                    return
+                delay = min(self.backoff * 2 ** (attempt - 1), self.backoff_max)
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(
+                    f"Notification delivery to {destination} failed ({e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+
+def _default_sender() -> NotificationSender:
+    if settings.NOTIFICATION_WEBHOOK_URL:
+        return WebhookSender(
+            settings.NOTIFICATION_WEBHOOK_URL,
+            timeout=settings.NOTIFICATION_TIMEOUT,
+            max_connections=settings.NOTIFICATION_CONCURRENCY,
+        )
+    return LogSender()
+
+
+notifications = NotificationDispatcher(
+    {DEFAULT_DESTINATION: _default_sender()},
+    queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+    concurrency=settings.NOTIFICATION_CONCURRENCY,
+    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    batch_window=settings.NOTIFICATION_BATCH_WINDOW,
+    max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+    backoff=settings.NOTIFICATION_RETRY_BACKOFF,
+    backoff_max=settings.NOTIFICATION_RETRY_BACKOFF_MAX,
+)
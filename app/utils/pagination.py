@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(order_by: str, value: Any, id: int) -> str:
+    """
+    Encode the position after the last row of a page as an opaque cursor
+
+    The cursor carries the sort key it was issued for, so a client cannot
+    reuse it with a different ordering.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([order_by, value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor for the given sort key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+
+    if key != order_by:
+        raise InvalidCursorError(f"Cursor was issued for order_by={key}")
+    if not isinstance(id, int):
+        raise InvalidCursorError("Malformed cursor")
+    if order_by.lstrip("-") == "created_at":
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursorError("Malformed cursor")
+    return value, id
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls
+
+    The first caller for a key (the leader) runs the call in its own
+    coroutine, so it keeps using the leader's resources, e.g. its database
+    session. Callers arriving meanwhile wait for it and share its outcome,
+    result or exception. With a grace period a result is also reused by
+    calls arriving up to grace seconds after it completed.
+
+    Shared results are handed to every caller as-is, so they should be
+    plain data that nobody mutates rather than session-bound objects. If
+    the leader is cancelled the flight is abandoned and its waiters retry,
+    one of them becoming the new leader; a waiter's own cancellation never
+    affects the others.
+    """
+
+    def __init__(
+        self, grace: float = 0.0, max_results: int = 1024, enabled: bool = True
+    ):
+        self.grace = grace
+        self.max_results = max_results
+        self.enabled = enabled
+        self.led = 0
+        self.shared = 0
+        self._flights: Dict[str, asyncio.Future] = {}
+        # key -> (expiry, result), results kept for the grace period
+        self._results: Dict[str, Tuple[float, Any]] = {}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call, or share the outcome of an identical call in flight"""
+        if not self.enabled:
+            return await call()
+
+        while True:
+            kept = self._results.get(key)
+            if kept is not None:
+                if kept[0] > time.monotonic():
+                    self.shared += 1
+                    return kept[1]
+                del self._results[key]
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            try:
+                # Shielded, so a waiter leaving does not cancel the flight
+                result = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if flight.cancelled():
+                    # The leader was cancelled, try again
+                    continue
+                raise
+            self.shared += 1
+            return result
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.led += 1
+        try:
+            result = await call()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                flight.set_exception(e)
+                # Marks the exception retrieved when nobody was waiting
+                flight.exception()
+            else:
+                flight.cancel()
+            raise
+        finally:
+            # Not current if forget() detached it meanwhile
+            current = self._flights.get(key) is flight
+            if current:
+                del self._flights[key]
+
+        flight.set_result(result)
+        if self.grace > 0 and current:
+            self._keep(key, result)
+        return result
+
+    def forget(self, *keys: str) -> None:
+        """
+        Drop kept results and detach in-flight calls for keys, e.g. after
+        the data behind them changed; later calls start a new flight
+        """
+        for key in keys:
+            self._results.pop(key, None)
+            self._flights.pop(key, None)
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._flights.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"led": self.led, "shared": self.shared, "in_flight": len(self._flights)}
+
+    def _keep(self, key: str, result: Any) -> None:
+        now = time.monotonic()
+        if len(self._results) >= self.max_results:
+            expired = [k for k, (expiry, _) in self._results.items() if expiry <= now]
+            for stale in expired:
+                del self._results[stale]
+            if len(self._results) >= self.max_results:
+                # Still full of live results, drop the oldest
+                del self._results[next(iter(self._results))]
+        self._results[key] = (now + self.grace, result)
@@ -0,0 +1,94 @@
+"""
+Benchmark suite
+
+Runs the micro-benchmarks and the per-endpoint load driver against a seeded
+SQLite database, prints throughput and p50/p95/p99 latencies, and writes
+them as JSON. Given a baseline file from an earlier run, exits with status
+1 if any benchmark regressed by more than the tolerance.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from benchmarks import load, micro, report
+from benchmarks.environment import benchmark_database
+
+
+async def main(args) -> int:
+    results = {}
+    async with benchmark_database(
+        rows=args.rows,
+        spare=args.requests * len(args.concurrency),
+        url=args.database_url,
+        seed=args.seed,
+    ) as database:
+        if not args.skip_micro:
+            results.update(await micro.run(database, args.iterations, args.seed))
+        if not args.skip_load:
+            results.update(
+                await load.run(
+                    database,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    only=args.only,
+                    seed=args.seed,
+                )
+            )
+
+    print(report.format_table(results))
+    if args.output:
+        report.write(args.output, results, vars(args))
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = report.compare(results, report.load(args.baseline), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Run the API benchmark suite"
+    )
+    parser.add_argument("--rows", type=int, default=1000, help="tasks to seed")
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="calls per micro-benchmark"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per load scenario"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 10],
+        help="concurrent clients, one load run per value",
+    )
+    parser.add_argument(
+        "--only", nargs="*", default=[],
+        help="only run load scenarios whose name contains one of these",
+    )
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-url", default=None,
+        help="SQLite URL to use instead of a temporary database (it is reset)",
+    )
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="allowed relative throughput drop or p95 increase",
+    )
+    args = parser.parse_args()
+
+    # Request logging would dominate the measurements
+    logging.disable(logging.CRITICAL)
+    sys.exit(asyncio.run(main(args)))
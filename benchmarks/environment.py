@@ -0,0 +1,139 @@
+"""
+Database and app setup for the benchmarks
+
+Mirrors tests/conftest.py: the app runs in-process on SQLite through
+aiosqlite, with get_db and get_read_db overridden. The database is a
+temporary file rather than :memory:, since every connection to an
+in-memory database gets its own empty database and concurrent requests
+need several connections.
+"""
+import os
+import random
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.admission import admission
+from app.db.base import Base, enforce_foreign_keys, get_db, get_read_db
+from app.main import app
+from app.models.task import Task
+from app.services.stats import stats_service
+from app.services.task import task_cache, task_events
+from app.utils.events import LocalEventBackend
+
+STATUSES = ("pending", "in_progress", "completed")
+WORDS = (
+    "report", "invoice", "deploy", "review", "backup", "migrate", "email",
+    "budget", "design", "release", "audit", "cleanup",
+)
+
+
+class BenchmarkDatabase:
+    """A seeded SQLite database the app is wired to for a benchmark run"""
+
+    def __init__(self, url: str, session_factory, task_ids: List[int]):
+        self.url = url
+        self.session = session_factory
+        # Ids of the seeded tasks; spare_ids are reserved for deletes
+        self.task_ids = task_ids
+        self.spare_ids: List[int] = []
+
+
+def _task_rows(count: int, rng: random.Random) -> List[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        words = rng.sample(WORDS, 3)
+        rows.append({
+            "title": f"{words[0].title()} {words[1]} #{i}",
+            "description": f"Remember to {words[1]} the {words[2]} before Friday",
+            "status": rng.choice(STATUSES),
+            "priority": rng.randint(1, 5),
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i),
+        })
+    return rows
+
+
+@asynccontextmanager
+async def benchmark_database(
+    rows: int, spare: int = 0, url: Optional[str] = None, seed: int = 0
+) -> AsyncIterator[BenchmarkDatabase]:
+    """
+    Create and seed a database, and route the app's sessions to it
+
+    rows tasks are inserted, plus spare ones kept aside for benchmarks
+    that delete tasks. The overrides and the temporary file are removed
+    on exit.
+    """
+    directory = None
+    if url is None:
+        directory = tempfile.TemporaryDirectory(prefix="task-benchmarks-")
+        url = f"sqlite+aiosqlite:///{os.path.join(directory.name, 'bench.db')}"
+
+    engine = create_async_engine(url, connect_args={"timeout": 30})
+    enforce_foreign_keys(engine)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer holds the lock
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        await session.execute(
+            insert(Task), _task_rows(rows + spare, random.Random(seed))
+        )
+        await stats_service.rebuild(session)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def override_get_read_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    ids = list(range(1, rows + spare + 1))
+    database = BenchmarkDatabase(url, session_factory, ids[:rows])
+    database.spare_ids = ids[rows:]
+    # The load driver is a single client, its rate limit would cap throughput
+    rate, admission.rate = admission.rate, 0
+    # Events and cache invalidations stay in the process, there is no
+    # Postgres to relay them
+    await task_events.stop()
+    await task_cache.stop()
+    backend, task_events.backend = task_events.backend, LocalEventBackend()
+    invalidations, task_cache.invalidations = task_cache.invalidations, None
+    try:
+        yield database
+    finally:
+        admission.rate = rate
+        await task_events.stop()
+        await task_cache.stop()
+        task_events.backend = backend
+        task_cache.invalidations = invalidations
+        app.dependency_overrides.clear()
+        await task_cache.clear()
+        await engine.dispose()
+        if directory is not None:
+            directory.cleanup()
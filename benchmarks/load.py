@@ -0,0 +1,126 @@
+"""
+In-process load driver
+
+Sends requests to the app through httpx's ASGI transport, so no server or
+network is involved, from a number of concurrent clients. Each scenario
+exercises one endpoint.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.main import app
+from benchmarks.environment import STATUSES, WORDS, BenchmarkDatabase
+from benchmarks.report import summarize
+
+PREFIX = "/api/v1/tasks"
+
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+def scenarios(database: BenchmarkDatabase) -> Dict[str, Scenario]:
+    ids = database.task_ids
+    spare = iter(database.spare_ids)
+
+    def import_body(rng):
+        return "\n".join(
+            json.dumps({"title": f"Imported {rng.choice(WORDS)}", "priority": 2})
+            for _ in range(100)
+        )
+
+    return {
+        "GET /tasks": lambda c, rng: c.get(f"{PREFIX}/?limit=100"),
+        "GET /tasks?order_by": lambda c, rng: c.get(
+            f"{PREFIX}/?order_by=-priority&limit=100"
+        ),
+        "GET /tasks/{id}": lambda c, rng: c.get(f"{PREFIX}/{rng.choice(ids)}"),
+        "GET /tasks/search": lambda c, rng: c.get(
+            f"{PREFIX}/search", params={"q": rng.choice(WORDS)}
+        ),
+        "GET /tasks/stats": lambda c, rng: c.get(f"{PREFIX}/stats"),
+        "GET /tasks/export": lambda c, rng: c.get(
+            f"{PREFIX}/export", params={"status": rng.choice(STATUSES)}
+        ),
+        "POST /tasks": lambda c, rng: c.post(
+            f"{PREFIX}/", json={"title": "Load test", "priority": rng.randint(1, 5)}
+        ),
+        "PUT /tasks/{id}": lambda c, rng: c.put(
+            f"{PREFIX}/{rng.choice(ids)}", json={"status": rng.choice(STATUSES)}
+        ),
+        "POST /tasks/bulk": lambda c, rng: c.post(
+            f"{PREFIX}/bulk",
+            json=[{"title": "Bulk load test", "priority": 1} for _ in range(20)],
+        ),
+        "POST /tasks/import": lambda c, rng: c.post(
+            f"{PREFIX}/import",
+            content=import_body(rng),
+            headers={"Content-Type": "application/x-ndjson"},
+        ),
+        "POST /tasks/{id}/process": lambda c, rng: c.post(
+            f"{PREFIX}/{rng.choice(ids)}/process"
+        ),
+        "DELETE /tasks/{id}": lambda c, rng: c.delete(f"{PREFIX}/{next(spare)}"),
+    }
+
+
+async def drive(
+    scenario: Scenario, *, requests: int, concurrency: int, seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Send requests from concurrency clients and summarize the latencies
+
+    Responses with a status of 400 or above count as errors and are left
+    out of the latency figures.
+    """
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient, rng: random.Random):
+        nonlocal errors
+        for _ in remaining:
+            began = time.perf_counter()
+            try:
+                response = await scenario(client, rng)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - began)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client_loop(client, random.Random(seed * 1000 + i))
+                for i in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, errors)
+
+
+async def run(
+    database: BenchmarkDatabase,
+    *,
+    requests: int,
+    concurrency: List[int],
+    only: List[str] = (),
+    seed: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, scenario in scenarios(database).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        for level in concurrency:
+            results[f"{name} [c={level}]"] = await drive(
+                scenario, requests=requests, concurrency=level, seed=seed
+            )
+    return results
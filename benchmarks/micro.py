@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks: TaskService methods and response serialization
+
+Each benchmark calls one operation sequentially, with a fresh session per
+call, so the numbers reflect the cost of the operation itself rather than
+contention. The task cache is disabled for the service benchmarks except
+the explicitly cached ones.
+"""
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from app.models.task import Task
+from app.schemas.task import TASK_ROW_FIELDS, TaskCreate, TaskUpdate
+from app.services.task import task_cache, task_service
+from benchmarks.environment import STATUSES, BenchmarkDatabase
+from benchmarks.report import summarize
+from benchmarks.serialization import fast_path, make_rows, response_model_path
+
+
+async def _measure(iterations: int, operation: Callable[[], Awaitable[Any]]):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        began = time.perf_counter()
+        try:
+            await operation()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def _service_benchmarks(
+    database: BenchmarkDatabase, rng: random.Random
+) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    def with_session(call):
+        async def operation():
+            async with database.session() as db:
+                return await call(db)
+        return operation
+
+    ids = database.task_ids
+    return {
+        "service.get": with_session(lambda db: task_service.get(db, rng.choice(ids))),
+        "service.get_with_logs": with_session(
+            lambda db: task_service.get_with_logs(db, rng.choice(ids))
+        ),
+        "service.get_multi[100]": with_session(
+            lambda db: task_service.get_multi(db, limit=100)
+        ),
+        "service.get_multi[100,rows]": with_session(
+            lambda db: task_service.get_multi(db, limit=100, as_rows=True)
+        ),
+        "service.get_page[100]": with_session(
+            lambda db: task_service.get_page(db, order_by="-priority", limit=100)
+        ),
+        "service.search": with_session(
+            lambda db: task_service.search(db, "deploy review", limit=20)
+        ),
+        "service.create": with_session(
+            lambda db: task_service.create(
+                db, TaskCreate(title="Benchmark task", priority=3)
+            )
+        ),
+        "service.update": with_session(
+            lambda db: task_service.update(
+                db,
+                id=rng.choice(ids),
+                obj_in=TaskUpdate(status=rng.choice(STATUSES)),
+            )
+        ),
+    }
+
+
+def _serialization_benchmarks(rows: int) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    data = make_rows(rows)
+    tasks = [Task(**dict(zip(TASK_ROW_FIELDS, row))) for row in data]
+
+    async def fast():
+        return fast_path(data)
+
+    return {
+        f"serialize.response_model[{rows}]": lambda: response_model_path(tasks),
+        f"serialize.fast[{rows}]": fast,
+    }
+
+
+async def run(
+    database: BenchmarkDatabase, iterations: int, seed: int = 0
+) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(seed)
+    results = {}
+
+    benchmarks = _service_benchmarks(database, rng)
+    cache_enabled, task_cache.enabled = task_cache.enabled, False
+    try:
+        for name, operation in benchmarks.items():
+            results[name] = await _measure(iterations, operation)
+    finally:
+        task_cache.enabled = cache_enabled
+
+    # A handful of hot ids, so all but the first lookup of each are hits
+    hot_ids = database.task_ids[:10]
+
+    async def get_cached():
+        async with database.session() as db:
+            return await task_service.get(db, rng.choice(hot_ids))
+
+    await task_cache.clear()
+    results["service.get[cached]"] = await _measure(iterations, get_cached)
+
+    for rows in (100, 1000):
+        for name, operation in _serialization_benchmarks(rows).items():
+            results[name] = await _measure(iterations, operation)
+    return results
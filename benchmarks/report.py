@@ -0,0 +1,92 @@
+"""Summaries, result files and baseline comparison"""
+import json
+import platform
+import sqlite3
+import statistics
+from typing import Any, Dict, List
+
+# Summary fields compared against a baseline, and whether higher is better
+COMPARED = {"throughput": True, "p95": False}
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Throughput (ops/s) and latency percentiles (ms) of a benchmark"""
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": p50 * 1000,
+        "p95": p95 * 1000,
+        "p99": p99 * 1000,
+    }
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def write(path: str, results: Dict[str, Dict[str, Any]], options: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(
+            {"environment": environment(), "options": options, "results": results},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """
+    List the regressions against a baseline
+
+    A benchmark regresses when its throughput drops, or its p95 latency
+    rises, by more than tolerance (a fraction) relative to the baseline.
+    Benchmarks missing from either side are skipped.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for field, higher_is_better in COMPARED.items():
+            old, new = base.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{name}: {field} {old:.2f} -> {new:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def format_table(results: Dict[str, Dict[str, Any]]) -> str:
+    lines = [
+        f"{'benchmark':<40} {'ops':>6} {'err':>4} {'ops/s':>10}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    ]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<40} {r['ops']:>6} {r['errors']:>4} {r['throughput']:>10.1f}"
+            f" {r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f}"
+        )
+    return "\n".join(lines)
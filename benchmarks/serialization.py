@@ -0,0 +1,100 @@
+"""
+Response serialization benchmark
+
+Compares the response_model path FastAPI takes for GET /tasks (validate
+each ORM object into TaskSchema, encode, json.dumps) with the fast path
+(plain rows dumped by a cached TypeAdapter), and checks that both produce
+the same bytes.
+
+    python -m benchmarks.serialization [--sizes 100 1000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.task import Task
+from app.schemas.task import TASK_ROW_FIELDS, Task as TaskSchema, task_rows_adapter
+
+RESPONSE_FIELD = create_response_field("Response_list_tasks", List[TaskSchema])
+
+
+def make_rows(size: int) -> List[tuple]:
+    """Rows as the database returns them, in TaskRow column order"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            f"Task {i}",
+            f"Description of task {i}" if i % 3 else None,
+            i % 5 + 1,
+            i,
+            ("pending", "in_progress", "completed")[i % 3],
+            start + timedelta(seconds=i),
+            start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(1, size + 1)
+    ]
+
+
+async def response_model_path(tasks: List[Task]) -> bytes:
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=tasks, is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+def fast_path(rows: List[tuple]) -> bytes:
+    return task_rows_adapter.dump_json(
+        [dict(zip(TASK_ROW_FIELDS, row)) for row in rows]
+    )
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes: List[int], repeat: int) -> List[dict]:
+    loop = asyncio.new_event_loop()
+    results = []
+    for size in sizes:
+        rows = make_rows(size)
+        # ORM loading cost is left out, which favours the response_model path
+        tasks = [Task(**dict(zip(TASK_ROW_FIELDS, row))) for row in rows]
+
+        baseline = loop.run_until_complete(response_model_path(tasks))
+        if fast_path(rows) != baseline:
+            raise AssertionError(f"outputs differ for {size} rows")
+
+        slow = best_of(
+            repeat, lambda: loop.run_until_complete(response_model_path(tasks))
+        )
+        fast = best_of(repeat, lambda: fast_path(rows))
+        results.append(
+            {"rows": size, "response_model": slow, "fast": fast, "speedup": slow / fast}
+        )
+    loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'response_model':>16} {'fast':>10} {'speedup':>8}")
+    for result in run(args.sizes, args.repeat):
+        print(
+            f"{result['rows']:>6} {result['response_model'] * 1000:>13.2f} ms"
+            f" {result['fast'] * 1000:>7.2f} ms {result['speedup']:>7.1f}x"
+        )
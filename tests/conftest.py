@@ -1,19 +1,39 @@
 # conftest.py
 
 import asyncio
+from contextlib import contextmanager
+
+import pytest
 import pytest_asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
-from app.db.base import Base, get_db
+from app.core.admission import admission
+from app.db.base import Base, enforce_foreign_keys, get_db, get_read_db
 from app.main import app
+from app.services.task import task_cache, task_events
+from app.utils.events import LocalEventBackend
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# The tests run on SQLite, so events and cache invalidations stay in the
+# process
+task_events.backend = LocalEventBackend()
+task_cache.invalidations = None
+
+
+@pytest.fixture(autouse=True)
+def refill_rate_limit():
+    # Every test client is the same client to the rate limiter; without a
+    # fresh bucket per test the suite as a whole runs out of burst
+    admission._buckets.clear()
+
 
 @pytest_asyncio.fixture(scope="session")
 async def test_engine():
     engine = create_async_engine(TEST_DATABASE_URL, echo=True)
+    enforce_foreign_keys(engine)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield engine
@@ -40,13 +60,42 @@ async def test_db(test_engine):
                 await session.close()
 
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
         yield session
         await transaction.rollback()
         app.dependency_overrides.clear()
+        await task_cache.clear()
 
 
 @pytest_asyncio.fixture
 async def async_client():
     from httpx import AsyncClient
     async with AsyncClient(app=app, base_url="http://test") as client:
-        yield client
\ No newline at end of file
+        yield client
+
+
+@pytest.fixture
+def assert_queries(test_engine):
+    """
+    Assert the number of SQL statements run inside a with block, e.g.
+
+        with assert_queries(1):
+            await async_client.get(...)
+
+    Keeps endpoints from silently gaining database round trips.
+    """
+    @contextmanager
+    def check(expected):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        assert len(statements) == expected, "\n\n".join(statements)
+
+    return check
@@ -0,0 +1,106 @@
+# tests/test_admission.py
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core.admission import AdmissionController, AdmissionMiddleware
+
+
+def _controller(**overrides):
+    options = dict(
+        max_in_flight=1, queue_timeout=0.05, max_queue=10, rate=0, burst=1,
+        exempt_paths=["/health"],
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_token_bucket_per_client():
+    controller = _controller(rate=1, burst=2)
+    assert controller.take_token("a") is None
+    assert controller.take_token("a") is None
+    assert controller.take_token("a") == pytest.approx(1, abs=0.1)
+    # Other clients have their own bucket
+    assert controller.take_token("b") is None
+
+
+@pytest.mark.asyncio
+async def test_in_flight_slots_are_handed_over_or_time_out():
+    controller = _controller()
+    assert await controller.acquire()
+    assert not await controller.acquire()
+
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.waiting == 1
+    controller.release()
+    assert await waiter
+    assert controller.in_flight == 1
+    controller.release()
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_load():
+    app = FastAPI()
+    gate = asyncio.Event()
+
+    @app.get("/slow")
+    async def slow():
+        await gate.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    controller = _controller(rate=0.1, burst=2)
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.01)
+        # The only slot is taken and does not free up within the deadline
+        response = await client.get("/slow")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        gate.set()
+        assert (await first).status_code == 200
+
+        # Both tokens are spent, so the next request is rate limited
+        response = await client.get("/slow")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "10"
+        assert (await client.get("/health")).status_code == 200
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cors_wraps_admission():
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        return []
+
+    controller = _controller(rate=0.1, burst=1)
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"])
+    transport = httpx.ASGITransport(app=app)
+    origin = {"Origin": "http://example.com"}
+    preflight = {**origin, "Access-Control-Request-Method": "GET"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Preflights are free, so the single token is left for the request
+        for _ in range(3):
+            response = await client.options("/items", headers=preflight)
+            assert response.status_code == 200
+        assert (await client.get("/items", headers=origin)).status_code == 200
+
+        # A browser can read the rejection
+        response = await client.get("/items", headers=origin)
+        assert response.status_code == 429
+        assert response.headers["access-control-allow-origin"] == "*"
@@ -0,0 +1,38 @@
+# tests/test_benchmarks.py
+
+import pytest
+
+from benchmarks import load, report
+from benchmarks.environment import benchmark_database
+
+
+def test_summarize_percentiles():
+    summary = report.summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+    assert summary["ops"] == 100
+    assert summary["throughput"] == 50.0
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["p99"] == pytest.approx(99.01)
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {
+        "a": {"throughput": 100.0, "p95": 10.0},
+        "b": {"throughput": 100.0, "p95": 10.0},
+        "gone": {"throughput": 100.0, "p95": 10.0},
+    }
+    results = {
+        "a": {"throughput": 85.0, "p95": 11.0},
+        "b": {"throughput": 120.0, "p95": 13.0},
+        "new": {"throughput": 1.0, "p95": 100.0},
+    }
+    regressions = report.compare(results, baseline, tolerance=0.2)
+    assert regressions == ["b: p95 10.00 -> 13.00 (+30%)"]
+
+
+@pytest.mark.asyncio
+async def test_load_driver_smoke():
+    async with benchmark_database(rows=20, spare=4) as database:
+        scenarios = load.scenarios(database)
+        for name in ("GET /tasks/{id}", "PUT /tasks/{id}", "DELETE /tasks/{id}"):
+            summary = await load.drive(scenarios[name], requests=4, concurrency=2)
+            assert summary["ops"] == 4 and summary["errors"] == 0
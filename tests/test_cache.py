@@ -0,0 +1,152 @@
+# tests/test_cache.py
+
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import Task
+from app.services.task import task_cache, task_service
+from app.utils.cache import LocalSharedCache, TieredCache
+from app.utils.events import EventBackend
+
+
+class _Channel(EventBackend):
+    """Relays events to every cache listening, like one NOTIFY channel"""
+
+    def __init__(self, listeners):
+        self.listeners = listeners
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self.listeners.append(deliver)
+
+    async def publish(self, event):
+        for deliver in list(self.listeners):
+            deliver(json.loads(json.dumps(event)))
+
+    async def stop(self):
+        self.listeners.remove(self._deliver)
+
+
+class _Unreachable(EventBackend):
+    async def start(self, deliver):
+        raise ConnectionRefusedError("no database")
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl():
+    cache = TieredCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)  # evicts "b", the least recently used
+
+    assert await cache.get("b") is None
+    assert await cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+    expired = TieredCache(max_size=2, ttl=0)
+    await expired.set("a", 1)
+    assert await expired.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_fills_local_tier():
+    shared = LocalSharedCache()
+    writer = TieredCache(max_size=10, ttl=60, shared=shared)
+    reader = TieredCache(max_size=10, ttl=60, shared=shared)
+
+    await writer.set("task:1", {"id": 1})
+    assert await reader.get("task:1") == {"id": 1}
+    assert reader.shared_hits == 1
+
+    await writer.delete("task:1")
+    await reader.local.clear()
+    assert await reader.get("task:1") is None
+
+
+@pytest.mark.asyncio
+async def test_deletes_invalidate_other_processes():
+    listeners = []
+    shared = LocalSharedCache()
+    writer, reader = (
+        TieredCache(
+            max_size=10, ttl=60, shared=shared, invalidations=_Channel(listeners)
+        )
+        for _ in range(2)
+    )
+
+    await writer.set("task:1", {"id": 1})
+    await writer.set("task:2", {"id": 2})
+    assert await reader.get("task:1") == {"id": 1}
+    assert await reader.get("task:2") == {"id": 2}
+
+    await writer.delete("task:1")
+    assert await reader.local.get("task:1") is None
+    assert await reader.local.get("task:2") == {"id": 2}
+    assert await reader.get("task:1") is None
+    await reader.stop()
+    await writer.stop()
+    assert listeners == []
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bypassed_without_invalidations():
+    shared = LocalSharedCache()
+    cache = TieredCache(
+        max_size=10, ttl=60, shared=shared, invalidations=_Unreachable()
+    )
+    await cache.set("task:1", {"id": 1})
+    assert len(cache.local) == 0
+    assert await cache.get("task:1") == {"id": 1}
+    assert cache.shared_hits == 1
+    assert len(cache.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_task_reads_are_cached_and_invalidated(test_db, async_client):
+    task = Task(title="Cache Test", description="Test", status="pending", priority=1)
+    test_db.add(task)
+    await test_db.commit()
+    await test_db.refresh(task)
+
+    response = await async_client.get(f"/api/v1/tasks/{task.id}")
+    assert response.status_code == 200
+    hits = task_cache.hits
+
+    response = await async_client.get(f"/api/v1/tasks/{task.id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "Cache Test"
+    assert task_cache.hits == hits + 1
+
+    response = await async_client.put(
+        f"/api/v1/tasks/{task.id}", json={"title": "Cache Updated", "status": "done"}
+    )
+    assert response.status_code == 200
+
+    response = await async_client.get(f"/api/v1/tasks/{task.id}")
+    data = response.json()
+    assert data["title"] == "Cache Updated"
+    assert [log["status"] for log in data["logs"]] == ["done"]
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_do_not_fill_the_cache(test_db, async_client):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Lagging"})
+    task_id = response.json()["id"]
+    await async_client.get(f"/api/v1/tasks/{task_id}")
+    await async_client.put(f"/api/v1/tasks/{task_id}", json={"title": "Renamed"})
+    assert await task_cache.get(f"task:{task_id}:logs") is None
+
+    # After the invalidation, a replica may still return the old version
+    replica = AsyncSession(bind=test_db.bind, info={"replica": True})
+    assert (await task_service.get_with_logs(replica, task_id)) is not None
+    assert (await task_service.get(replica, task_id)) is not None
+    assert await task_cache.get(f"task:{task_id}:logs") is None
+    assert await task_cache.get(f"task:{task_id}") is None
+
+    await task_service.get(test_db, task_id)
+    assert (await task_cache.get(f"task:{task_id}"))["title"] == "Renamed"
+    await replica.close()
@@ -0,0 +1,78 @@
+# tests/test_db.py
+
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from app.db.base import Base, READ_YOUR_WRITES_COOKIE, get_read_db, wrote_recently
+from app.db.warmup import _warm_engine
+from app.models.task import Task
+
+
+def _request(cookie=None):
+    headers = []
+    if cookie is not None:
+        headers.append((b"cookie", f"{READ_YOUR_WRITES_COOKIE}={cookie}".encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_wrote_recently():
+    assert not wrote_recently(_request())
+    assert not wrote_recently(_request(time.time() - 1))
+    assert not wrote_recently(_request("garbage"))
+    assert wrote_recently(_request(time.time() + 5))
+
+
+@pytest.mark.asyncio
+async def test_reads_after_writes_use_primary():
+    session = await get_read_db(_request(time.time() + 5)).__anext__()
+    assert session.info.get("read_your_writes")
+
+    session = await get_read_db(_request()).__anext__()
+    assert not session.info.get("read_your_writes")
+
+
+@pytest.mark.asyncio
+async def test_writes_set_read_your_writes_cookie(test_db, async_client):
+    task = Task(title="Cookie Test", description="Test", status="pending", priority=1)
+    test_db.add(task)
+    await test_db.commit()
+    await test_db.refresh(task)
+
+    response = await async_client.put(f"/api/v1/tasks/{task.id}", json={"title": "New"})
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+    assert wrote_recently(_request(response.cookies[READ_YOUR_WRITES_COOKIE]))
+
+    response = await async_client.get(f"/api/v1/tasks/{task.id}")
+    assert READ_YOUR_WRITES_COOKIE not in response.cookies
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_and_primes_connections(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warm.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queries = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: queries.append(id(conn.connection)),
+    )
+    try:
+        assert await _warm_engine(engine, 3) == 3
+        # All three were open at once and each ran the hot queries
+        assert engine.sync_engine.pool.checkedin() == 3
+        assert len(set(queries)) == 3
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_does_not_raise(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/warm.db")
+    try:
+        assert await _warm_engine(engine, 2) == 0
+    finally:
+        await engine.dispose()
@@ -0,0 +1,205 @@
+# tests/test_dependencies.py
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base, enforce_foreign_keys
+from app.models.job import Job
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.task import task_service
+
+
+async def _create(async_client, *titles):
+    ids = []
+    for title in titles:
+        response = await async_client.post("/api/v1/tasks/", json={"title": title})
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def _status(async_client, task_id):
+    response = await async_client.get(f"/api/v1/tasks/{task_id}?fields=status")
+    return response.json()["status"]
+
+
+async def _queued(test_db):
+    result = await test_db.execute(select(Job.task_id).order_by(Job.task_id))
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_dependencies_stay_acyclic(test_db, async_client):
+    a, b, c = await _create(async_client, "A", "B", "C")
+    for task_id, depends_on_id in [(b, a), (c, b), (c, b)]:
+        url = f"/api/v1/tasks/{task_id}/dependencies/{depends_on_id}"
+        response = await async_client.put(url)
+        assert response.status_code == 204
+
+    # Directly, through another task, or on itself
+    for task_id, depends_on_id in [(a, b), (a, c), (a, a)]:
+        url = f"/api/v1/tasks/{task_id}/dependencies/{depends_on_id}"
+        response = await async_client.put(url)
+        assert response.status_code == 409
+
+    response = await async_client.put(f"/api/v1/tasks/{a}/dependencies/999999")
+    assert response.status_code == 404
+    response = await async_client.get(f"/api/v1/tasks/{c}/dependencies")
+    assert [task["id"] for task in response.json()] == [b]
+    response = await async_client.get("/api/v1/tasks/999999/dependencies")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_tasks_start_when_prerequisites_complete(test_db, async_client):
+    # d needs b and c, which both need a; e is unrelated
+    a, b, c, d, e = await _create(async_client, "A", "B", "C", "D", "E")
+    for task_id, depends_on_id in [(b, a), (c, a), (d, b), (d, c)]:
+        await async_client.put(f"/api/v1/tasks/{task_id}/dependencies/{depends_on_id}")
+
+    response = await async_client.post(
+        f"/api/v1/tasks/{d}/process", params={"with_prerequisites": "true"}
+    )
+    assert response.json()["status"] == "waiting"
+    assert [await _status(async_client, id) for id in (a, b, c, e)] == [
+        "in_progress", "waiting", "waiting", "pending"
+    ]
+    assert await _queued(test_db) == [a]
+
+    # The independent branches b and c start together once a is done
+    await async_client.put(f"/api/v1/tasks/{a}", json={"status": "completed"})
+    assert [await _status(async_client, id) for id in (b, c, d)] == [
+        "in_progress", "in_progress", "waiting"
+    ]
+    assert await _queued(test_db) == [a, b, c]
+
+    await async_client.put(f"/api/v1/tasks/{b}", json={"status": "completed"})
+    assert await _status(async_client, d) == "waiting"
+    await async_client.put(f"/api/v1/tasks/{c}", json={"status": "completed"})
+    assert await _status(async_client, d) == "in_progress"
+    assert await _queued(test_db) == [a, b, c, d]
+
+    stats = (await async_client.get("/api/v1/tasks/stats")).json()
+    assert stats["by_status"] == {"completed": 3, "in_progress": 1, "pending": 1}
+
+
+@pytest.mark.asyncio
+async def test_removing_the_last_open_dependency_starts_a_task(test_db, async_client):
+    a, b = await _create(async_client, "A", "B")
+    await async_client.put(f"/api/v1/tasks/{b}/dependencies/{a}")
+    await async_client.post(f"/api/v1/tasks/{b}/process")
+    assert await _status(async_client, b) == "waiting"
+    assert await _queued(test_db) == []
+
+    response = await async_client.delete(f"/api/v1/tasks/{b}/dependencies/{a}")
+    assert response.status_code == 204
+    assert await _status(async_client, b) == "in_progress"
+    assert await _queued(test_db) == [b]
+    response = await async_client.delete(f"/api/v1/tasks/{b}/dependencies/{a}")
+    assert response.status_code == 404
+
+
+async def _waiting_on(async_client, *prerequisites):
+    """A task waiting for prerequisites, as its id"""
+    (task_id,) = await _create(async_client, "Dependent")
+    for depends_on_id in prerequisites:
+        await async_client.put(f"/api/v1/tasks/{task_id}/dependencies/{depends_on_id}")
+    await async_client.post(f"/api/v1/tasks/{task_id}/process")
+    assert await _status(async_client, task_id) == "waiting"
+    return task_id
+
+
+@pytest.mark.asyncio
+async def test_bulk_completion_starts_dependents(test_db, async_client):
+    a, b, c = await _create(async_client, "A", "B", "C")
+    d = await _waiting_on(async_client, a, b)
+    e = await _waiting_on(async_client, c)
+
+    response = await async_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[{"id": a, "status": "completed"}, {"id": c, "status": "failed"}],
+    )
+    assert response.json()["succeeded"] == 2
+    assert await _status(async_client, d) == "waiting"
+    assert await _status(async_client, e) == "waiting"
+
+    await async_client.patch(
+        "/api/v1/tasks/bulk", json=[{"id": b, "status": "completed"}]
+    )
+    assert await _status(async_client, d) == "in_progress"
+    assert await _status(async_client, e) == "waiting"
+    assert await _queued(test_db) == [d]
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_prerequisite_starts_dependents(test_db, async_client):
+    a, b, c = await _create(async_client, "A", "B", "C")
+    d = await _waiting_on(async_client, a)
+    e = await _waiting_on(async_client, b, c)
+
+    assert (await async_client.delete(f"/api/v1/tasks/{a}")).status_code == 204
+    assert await _status(async_client, d) == "in_progress"
+
+    response = await async_client.request(
+        "DELETE", "/api/v1/tasks/bulk", json={"ids": [b]}
+    )
+    assert response.json()["succeeded"] == 1
+    assert await _status(async_client, e) == "waiting"
+    await async_client.request("DELETE", "/api/v1/tasks/bulk", json={"ids": [c]})
+    assert await _status(async_client, e) == "in_progress"
+    assert await _queued(test_db) == [d, e]
+
+
+@pytest.mark.asyncio
+async def test_purging_a_prerequisite_starts_dependents(test_db, async_client):
+    a, b = await _create(async_client, "A", "B")
+    await async_client.put(f"/api/v1/tasks/{a}", json={"status": "failed"})
+    c = await _waiting_on(async_client, a, b)
+    await async_client.put(f"/api/v1/tasks/{b}", json={"status": "completed"})
+    assert await _status(async_client, c) == "waiting"
+
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    purged = await task_service.purge_tasks(test_db, statuses=["failed"], before=future)
+    assert purged == 1
+    assert await _status(async_client, c) == "in_progress"
+    assert await _queued(test_db) == [c]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_completions_release_a_shared_dependent(tmp_path):
+    # Sessions of their own on a file database, so the two completions run
+    # in separate transactions
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/fan_in.db")
+    enforce_foreign_keys(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with session() as db:
+            a, b, c = [
+                (await task_service.create(db, TaskCreate(title=title))).id
+                for title in ("A", "B", "C")
+            ]
+            for depends_on_id in (a, b):
+                await task_service.add_dependency(
+                    db, task_id=c, depends_on_id=depends_on_id
+                )
+            await task_service.start_processing(db, id=c, enqueue=True)
+
+        async def complete(id):
+            async with session() as db:
+                await task_service.update(
+                    db, id=id, obj_in=TaskUpdate(status="completed")
+                )
+
+        await asyncio.gather(complete(a), complete(b))
+
+        async with session() as db:
+            assert await task_service.get_status(db, c) == "in_progress"
+            assert await _queued(db) == [c]
+    finally:
+        await engine.dispose()
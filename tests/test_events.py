@@ -0,0 +1,94 @@
+# tests/test_events.py
+
+import asyncio
+import json
+
+import pytest
+
+from app.api.endpoints.tasks import stream_task_events
+from app.db.base import get_read_db
+from app.main import app
+from app.utils.events import HEARTBEAT, EventBroker, LocalEventBackend
+
+
+@pytest.mark.asyncio
+async def test_broker_routes_events_by_key():
+    broker = EventBroker(LocalEventBackend(), key_field="task_id")
+    async with broker.subscribe(1) as first, broker.subscribe(1, 2) as both:
+        assert broker.subscriber_count == 2
+        await broker.publish({"task_id": 1, "status": "done"})
+        await broker.publish({"task_id": 2, "status": "failed"})
+        await broker.publish({"task_id": 3, "status": "done"})
+
+        assert first.queue.qsize() == 1
+        assert await first.__anext__() == {"task_id": 1, "status": "done"}
+        assert [both.queue.get_nowait() for _ in range(2)] == [
+            {"task_id": 1, "status": "done"},
+            {"task_id": 2, "status": "failed"},
+        ]
+    assert broker.subscriber_count == 0
+    await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_keep_latest_events():
+    broker = EventBroker(LocalEventBackend(), key_field="task_id", queue_size=2)
+    async with broker.subscribe(1) as subscription:
+        for i in range(5):
+            await broker.publish({"task_id": 1, "n": i})
+        assert subscription.dropped == 3
+        assert [subscription.queue.get_nowait()["n"] for _ in range(2)] == [3, 4]
+    await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_idle_subscribers_get_heartbeats():
+    broker = EventBroker(LocalEventBackend(), key_field="task_id", heartbeat=0.01)
+    async with broker.subscribe(1) as subscription:
+        event = await asyncio.wait_for(subscription.__anext__(), 1)
+        assert event is HEARTBEAT
+    await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_task_event_stream(test_db, async_client):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Watched"})
+    task_id = response.json()["id"]
+
+    response = await stream_task_events(task_id, db=test_db)
+    assert response.media_type == "text/event-stream"
+    stream = response.body_iterator
+
+    first = await stream.__anext__()
+    assert first.startswith("event: status\n")
+    assert json.loads(first.split("data: ")[1]) == {
+        "task_id": task_id,
+        "status": "pending",
+    }
+
+    await async_client.post(f"/api/v1/tasks/{task_id}/process")
+    await async_client.put(f"/api/v1/tasks/{task_id}", json={"title": "No change"})
+    await async_client.put(f"/api/v1/tasks/{task_id}", json={"status": "completed"})
+
+    events = [
+        json.loads((await stream.__anext__()).split("data: ")[1]) for _ in range(2)
+    ]
+    assert events == [
+        {"task_id": task_id, "status": "in_progress", "previous_status": "pending"},
+        {"task_id": task_id, "status": "completed", "previous_status": "in_progress"},
+    ]
+    await stream.aclose()
+
+    response = await async_client.get("/api/v1/tasks/999999/events")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_event_stream_reads_the_primary(test_db, async_client):
+    async def lagging_replica():
+        raise AssertionError("the initial status was read from the replica")
+        yield
+
+    app.dependency_overrides[get_read_db] = lagging_replica
+    response = await async_client.get("/api/v1/tasks/999999/events")
+    assert response.status_code == 404
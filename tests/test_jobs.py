@@ -0,0 +1,121 @@
+# tests/test_jobs.py
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.job import Job
+from app.models.task import Task
+from app.services.job import job_service
+from app.tasks.worker import Worker
+
+
+async def _create_task(test_db, title="Job Test"):
+    task = Task(title=title, description="Test", status="pending", priority=1)
+    test_db.add(task)
+    await test_db.commit()
+    await test_db.refresh(task)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_process_enqueues_job(test_db, async_client):
+    task = await _create_task(test_db)
+
+    response = await async_client.post(f"/api/v1/tasks/{task.id}/process")
+    assert response.status_code == 200
+
+    result = await test_db.execute(select(Job).where(Job.task_id == task.id))
+    job = result.scalars().one()
+    assert job.status == "queued"
+    assert job.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_claim_is_exclusive(test_db):
+    task = await _create_task(test_db)
+    await job_service.enqueue(test_db, task.id)
+    await test_db.commit()
+
+    claimed = await job_service.claim(test_db, worker_id="w1", limit=10)
+    assert [job.task_id for job in claimed] == [task.id]
+    assert claimed[0].status == "running"
+    assert claimed[0].attempts == 1
+
+    # Leased to w1, so invisible to other workers until the timeout
+    assert await job_service.claim(test_db, worker_id="w2", limit=10) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_then_failed(test_db):
+    task = await _create_task(test_db)
+    job = await job_service.enqueue(test_db, task.id, max_attempts=2)
+    await test_db.commit()
+
+    job = (await job_service.claim(test_db, worker_id="w1", limit=1))[0]
+    assert await job_service.fail(test_db, job=job, error="boom") is False
+    await test_db.refresh(job)
+    assert job.status == "queued"
+    assert job.last_error == "boom"
+    # Backed off, so not claimable yet
+    assert await job_service.claim(test_db, worker_id="w1", limit=1) == []
+
+    job.attempts = 2
+    job.status = "running"
+    job.locked_by = "w1"
+    await test_db.commit()
+    assert await job_service.fail(test_db, job=job, error="boom") is True
+    await test_db.refresh(job)
+    assert job.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_claim_by_priority(test_db):
+    low = await _create_task(test_db, "Low")
+    high = await _create_task(test_db, "High")
+    await job_service.enqueue(test_db, low.id, priority=1)
+    await job_service.enqueue(test_db, high.id, priority=5)
+    await test_db.commit()
+
+    assert await job_service.queue_depth(test_db) == {1: 1, 5: 1}
+    # Queued later but four levels higher
+    claimed = await job_service.claim(test_db, worker_id="w1", limit=1)
+    assert [job.task_id for job in claimed] == [high.id]
+
+    # A full band is skipped
+    assert await job_service.claim(
+        test_db, worker_id="w1", limit=1, exclude_priorities=[1]
+    ) == []
+    claimed = await job_service.claim(test_db, worker_id="w1", limit=1)
+    assert [job.task_id for job in claimed] == [low.id]
+
+
+@pytest.mark.asyncio
+async def test_expired_last_attempt_fails_job_and_task(test_db):
+    task = await _create_task(test_db)
+    await job_service.enqueue(test_db, task.id, max_attempts=1)
+    await test_db.commit()
+
+    # The worker dies: its lease on the only attempt runs out
+    job = (await job_service.claim(test_db, worker_id="w1", limit=1))[0]
+    job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await test_db.commit()
+
+    # Out of attempts, so not reclaimed
+    assert await job_service.claim(test_db, worker_id="w2", limit=1) == []
+
+    @asynccontextmanager
+    async def session_factory():
+        yield test_db
+
+    worker = Worker(session_factory=session_factory)
+    assert await worker.sweep() == [task.id]
+    await test_db.refresh(job)
+    await test_db.refresh(task)
+    assert job.status == "failed"
+    assert job.locked_by is None
+    assert task.status == "failed"
+    # Swept once
+    assert await job_service.fail_expired(test_db) == []
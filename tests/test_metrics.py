@@ -0,0 +1,98 @@
+# tests/test_metrics.py
+
+import json
+import os
+
+import pytest
+import pytest_asyncio
+
+from app.core import metrics
+from app.models.task import Task
+
+
+@pytest_asyncio.fixture
+async def instrumented_engine(test_engine):
+    if "test" not in metrics._pools:
+        metrics.instrument_engine(test_engine, "test")
+    return test_engine
+
+
+def _sample(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_rendering():
+    histogram = metrics.Histogram("latency", "Latency", ["route"], buckets=(0.1, 1))
+    histogram.observe("/a", value=0.05)
+    histogram.observe("/a", value=0.5)
+    histogram.observe("/a", value=5)
+
+    assert histogram.render().splitlines() == [
+        "# HELP latency Latency",
+        "# TYPE latency histogram",
+        'latency_bucket{route="/a",le="0.1"} 1',
+        'latency_bucket{route="/a",le="1"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 3',
+        'latency_sum{route="/a"} 5.55',
+        'latency_count{route="/a"} 3',
+    ]
+
+
+def test_label_escaping():
+    counter = metrics.Counter("errors_total", "Errors", ["reason"])
+    counter.inc('bad "quote"\n')
+    assert 'errors_total{reason="bad \\"quote\\"\\n"} 1' in counter.render()
+
+
+def test_render_processes(tmp_path):
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter("jobs_total", "Jobs", ["kind"]))
+    gauge = registry.register(metrics.Gauge("busy", "Busy"))
+    counter.inc("email", amount=2)
+    gauge.set(value=1)
+    # What another worker saved
+    other = {"jobs_total": ['jobs_total{kind="email"} 5'], "busy": ["busy 0"]}
+    (tmp_path / "123.json").write_text(json.dumps(other))
+
+    lines = registry.render_processes(str(tmp_path)).splitlines()
+    own = os.getpid()
+    assert lines[:2] == ["# HELP jobs_total Jobs", "# TYPE jobs_total counter"]
+    assert sorted(lines[2:4]) == sorted([
+        f'jobs_total{{worker="{own}",kind="email"}} 2',
+        'jobs_total{worker="123",kind="email"} 5',
+    ])
+    assert lines[4:6] == ["# HELP busy Busy", "# TYPE busy gauge"]
+    assert sorted(lines[6:]) == sorted(
+        [f'busy{{worker="{own}"}} 1', 'busy{worker="123"} 0']
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(test_db, instrumented_engine, async_client):
+    task = Task(title="Metrics Test", description="Test", status="pending", priority=1)
+    test_db.add(task)
+    await test_db.commit()
+    await test_db.refresh(task)
+
+    route = 'route="/api/v1/tasks/{task_id}"'
+    response = await async_client.get("/metrics")
+    before = _sample(response.text, f"http_request_db_queries_count{{{route}}}") or 0
+
+    response = await async_client.get(f"/api/v1/tasks/{task.id}")
+    assert response.status_code == 200
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    # Labelled by route template, not by the requested path
+    assert _sample(
+        text, f'http_requests_total{{method="GET",{route},status="200"}}'
+    ) >= 1
+    assert _sample(text, f"http_request_db_queries_count{{{route}}}") == before + 1
+    assert _sample(text, f"http_request_db_queries_sum{{{route}}}") >= 1
+    assert _sample(text, 'db_queries_total{engine="test"}') >= 1
+    assert "# TYPE task_processing_in_flight gauge" in text
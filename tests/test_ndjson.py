@@ -0,0 +1,38 @@
+# tests/test_ndjson.py
+
+import gzip
+
+import pytest
+
+from app.utils.ndjson import iter_lines
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def _lines(data: bytes, size: int, **kwargs):
+    return [line async for line in iter_lines(_chunks(data, size), **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_lines_split_across_chunks():
+    data = b'{"a": 1}\n{"b": 2}\n\n{"c": 3}'
+    for size in (1, 3, 100):
+        lines = await _lines(data, size, max_line_length=100)
+        assert lines == [b'{"a": 1}', b'{"b": 2}', b"", b'{"c": 3}']
+
+
+@pytest.mark.asyncio
+async def test_long_lines_are_reported_and_skipped():
+    data = b"short\n" + b"x" * 50 + b"\nafter\n"
+    lines = await _lines(data, 7, max_line_length=10)
+    assert lines == [b"short", None, b"after"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_members_are_decompressed():
+    data = gzip.compress(b"one\ntwo\n") + gzip.compress(b"three\n")
+    lines = await _lines(data, 5, gzipped=True, max_line_length=100)
+    assert lines == [b"one", b"two", b"three"]
@@ -0,0 +1,96 @@
+# tests/test_notifications.py
+
+import json
+
+import httpx
+import pytest
+
+from app.utils.notifications import (
+    NotificationDispatcher,
+    NotificationSender,
+    WebhookSender,
+)
+
+
+class RecordingSender(NotificationSender):
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = 0
+        self.batches = []
+
+    async def send(self, messages):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("target unavailable")
+        self.batches.append(messages)
+
+
+@pytest.mark.asyncio
+async def test_batches_and_coalesces_per_destination():
+    a, b = RecordingSender(), RecordingSender()
+    dispatcher = NotificationDispatcher({"a": a, "b": b}, batch_window=0.05)
+    assert dispatcher.notify("one", "a")
+    assert dispatcher.notify("two", "a")
+    assert dispatcher.notify("one", "a")
+    assert dispatcher.notify("three", "b")
+    await dispatcher.drain(timeout=1)
+
+    assert a.batches == [["one", "two"]]
+    assert b.batches == [["three"]]
+    assert not dispatcher.notify("late", "a")
+
+
+@pytest.mark.asyncio
+async def test_batch_size_splits_batches():
+    sender = RecordingSender()
+    dispatcher = NotificationDispatcher(
+        {"default": sender}, batch_size=2, batch_window=0.05
+    )
+    for i in range(5):
+        dispatcher.notify(str(i))
+    await dispatcher.drain(timeout=1)
+    assert sender.batches == [["0", "1"], ["2", "3"], ["4"]]
+
+
+@pytest.mark.asyncio
+async def test_retries_with_backoff_then_gives_up():
+    flaky, broken = RecordingSender(failures=2), RecordingSender(failures=99)
+    dispatcher = NotificationDispatcher(
+        {"flaky": flaky, "broken": broken},
+        batch_window=0,
+        max_attempts=3,
+        backoff=0.001,
+    )
+    dispatcher.notify("hello", "flaky")
+    dispatcher.notify("lost", "broken")
+    await dispatcher.drain(timeout=1)
+
+    assert flaky.attempts == 3 and flaky.batches == [["hello"]]
+    assert broken.attempts == 3 and dispatcher.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_notifications():
+    sender = RecordingSender()
+    dispatcher = NotificationDispatcher({"default": sender}, queue_size=2)
+    # The collector has not run yet, so nothing leaves the queue
+    assert dispatcher.notify("1") and dispatcher.notify("2")
+    assert not dispatcher.notify("3")
+    assert dispatcher.dropped == 1
+    await dispatcher.drain(timeout=1)
+    assert sender.batches == [["1", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_webhook_sender_posts_batches():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    sender = WebhookSender("http://hooks.test/tasks", timeout=1, max_connections=2)
+    sender._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    await sender.send(["a", "b"])
+    await sender.close()
+    assert requests == [{"messages": ["a", "b"]}]
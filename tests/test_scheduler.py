@@ -0,0 +1,67 @@
+# tests/test_scheduler.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.tasks.scheduler import PriorityScheduler, rank
+
+
+def _recorder(started, name, gate):
+    async def work():
+        started.append(name)
+        await gate.wait()
+    return work
+
+
+@pytest.mark.asyncio
+async def test_runs_by_priority_within_band_slots():
+    scheduler = PriorityScheduler(concurrency=2, band_slots={1: 1}, aging=60)
+    gate, started = asyncio.Event(), []
+    for name in ("low-a", "low-b", "low-c"):
+        scheduler.submit(1, _recorder(started, name, gate))
+    await asyncio.sleep(0)
+    # Priority 1 may only hold one of the two slots
+    assert started == ["low-a"]
+    assert scheduler.full_bands() == [1]
+    assert scheduler.capacity() == 1
+
+    scheduler.submit(5, _recorder(started, "high", gate))
+    await asyncio.sleep(0)
+    assert started == ["low-a", "high"]
+    assert scheduler.stats()[1] == {
+        "slots": 1, "running": 1, "waiting": 2,
+        "oldest_wait": pytest.approx(0, abs=1),
+    }
+
+    gate.set()
+    await scheduler.join()
+    assert started == ["low-a", "high", "low-b", "low-c"]
+    assert scheduler.running == scheduler.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_aging_lets_old_work_overtake():
+    scheduler = PriorityScheduler(concurrency=1, band_slots={}, aging=10)
+    gate, started = asyncio.Event(), []
+    scheduler.submit(3, _recorder(started, "blocker", gate))
+    now = time.time()
+    # Waited 50s, so it counts as priority 1 + 5 against a fresh 5
+    scheduler.submit(1, _recorder(started, "old-low", gate), queued_at=now - 50)
+    scheduler.submit(5, _recorder(started, "new-high", gate))
+    scheduler.submit(5, _recorder(started, "newer-high", gate), queued_at=now + 1)
+
+    gate.set()
+    await scheduler.join()
+    assert started == ["blocker", "old-low", "new-high", "newer-high"]
+
+
+def test_rank_orders_like_effective_priority():
+    now = 1_000_000.0
+    ranks = {
+        "old-low": rank(1, now - 50, 10),
+        "new-high": rank(5, now, 10),
+        "new-mid": rank(3, now, 10),
+    }
+    assert sorted(ranks, key=ranks.get) == ["old-low", "new-high", "new-mid"]
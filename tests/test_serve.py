@@ -0,0 +1,110 @@
+# tests/test_serve.py
+
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="workers are forked")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The real app, plus a route slow enough to be in flight when SIGTERM lands
+SERVER = """
+import asyncio
+import sys
+from argparse import Namespace
+
+from app.main import app
+from app.serve import main
+
+
+@app.get("/slow")
+async def slow():
+    await asyncio.sleep(1)
+    return {"slow": True}
+
+
+main(Namespace(
+    host="127.0.0.1", port=int(sys.argv[1]), workers=2, backlog=16,
+    graceful_timeout=5, proxy_headers=False, forwarded_allow_ips="127.0.0.1",
+))
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}",
+        "METRICS_WRITE_INTERVAL": "0.1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER, str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            httpx.get(f"{url}/health")
+            break
+        except httpx.TransportError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.fail("server did not start")
+            time.sleep(0.1)
+    yield process, url
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def test_sigterm_drains_in_flight_requests(server):
+    process, url = server
+    responses = []
+    request = threading.Thread(
+        target=lambda: responses.append(httpx.get(f"{url}/slow", timeout=10))
+    )
+    request.start()
+    time.sleep(0.3)
+
+    process.send_signal(signal.SIGTERM)
+    request.join(timeout=10)
+    assert responses and responses[0].status_code == 200
+    assert responses[0].json() == {"slow": True}
+
+    # Every worker exits and the supervisor with them
+    assert process.wait(timeout=15) == 0
+    with pytest.raises(httpx.ConnectError):
+        httpx.get(f"{url}/health")
+
+
+def test_any_worker_reports_every_workers_metrics(server):
+    process, url = server
+    deadline = time.monotonic() + 10
+    while True:
+        workers = set(re.findall(r'worker="(\d+)"', httpx.get(f"{url}/metrics").text))
+        if len(workers) == 2 or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+    assert len(workers) == 2
+    assert str(process.pid) not in workers
@@ -0,0 +1,99 @@
+# tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from app.services.task import task_service
+from app.utils.singleflight import SingleFlight
+
+
+class Call:
+    """A call that blocks until released, counting how often it ran"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.runs = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.runs += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight():
+    flights, call = SingleFlight(), Call(result=[1, 2])
+    callers = [asyncio.create_task(flights.do("k", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    call.release.set()
+    assert await asyncio.gather(*callers) == [[1, 2]] * 5
+    assert call.runs == 1
+    assert flights.stats() == {"led": 1, "shared": 4, "in_flight": 0}
+
+    # Without a grace period the next call runs again
+    await flights.do("k", call)
+    assert call.runs == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_but_not_kept():
+    flights, call = SingleFlight(grace=60), Call(error=ValueError("boom"))
+    callers = [asyncio.create_task(flights.do("k", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    call.error, call.result = None, "ok"
+    assert await flights.do("k", call) == "ok"
+    assert call.runs == 2
+
+
+@pytest.mark.asyncio
+async def test_cancellation():
+    flights, call = SingleFlight(), Call(result="ok")
+    leader = asyncio.create_task(flights.do("k", call))
+    follower = asyncio.create_task(flights.do("k", call))
+    leaving = asyncio.create_task(flights.do("k", call))
+    await asyncio.sleep(0)
+
+    # A waiter leaving does not disturb the flight
+    leaving.cancel()
+    await asyncio.sleep(0)
+    assert call.runs == 1
+
+    # The leader leaving abandons it, the follower takes over
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    assert call.runs == 2
+    call.release.set()
+    assert await follower == "ok"
+    assert leaving.cancelled() and leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_grace_period_and_forget():
+    flights, call = SingleFlight(grace=60), Call(result="v1")
+    call.release.set()
+    assert await flights.do("k", call) == "v1"
+    call.result = "v2"
+    assert await flights.do("k", call) == "v1"
+    flights.forget("k")
+    assert await flights.do("k", call) == "v2"
+    assert call.runs == 2
+
+
+@pytest.mark.asyncio
+async def test_identical_list_reads_share_a_query(test_db, async_client, assert_queries):
+    await async_client.post("/api/v1/tasks/", json={"title": "Popular"})
+    with assert_queries(1):
+        pages = await asyncio.gather(*(
+            task_service.get_multi(test_db, limit=10, as_rows=True) for _ in range(5)
+        ))
+    assert all(page == pages[0] for page in pages)
+    assert pages[0][0]["title"] == "Popular"
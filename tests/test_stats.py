@@ -0,0 +1,70 @@
+# tests/test_stats.py
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.models.stats import TaskCount
+from app.models.task import Task
+from app.services import stats
+from app.services.stats import stats_service
+
+
+@pytest.mark.asyncio
+async def test_stats_follow_writes(test_db, async_client):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "A", "priority": 2})
+    first = response.json()
+    await async_client.post("/api/v1/tasks/", json={"title": "B", "priority": 3})
+    await async_client.put(f"/api/v1/tasks/{first['id']}", json={"status": "completed"})
+
+    response = await async_client.get("/api/v1/tasks/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert data["by_status"] == {"pending": 1, "completed": 1}
+    assert data["by_priority"] == {"2": 1, "3": 1}
+    events = data["activity"][-1]["events"]
+    assert events == {"created": 2, "completed": 1}
+
+    await async_client.delete(f"/api/v1/tasks/{first['id']}")
+    data = (await async_client.get("/api/v1/tasks/stats")).json()
+    assert data["total"] == 1
+    assert data["by_status"] == {"pending": 1}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_repairs_counters(test_db, async_client):
+    # Inserted behind the service's back, so the counters miss them
+    test_db.add_all([
+        Task(title="X", status="pending", priority=1),
+        Task(title="Y", status="failed", priority=5),
+    ])
+    await test_db.commit()
+    assert (await stats_service.get(test_db))["total"] == 0
+
+    await stats_service.rebuild(test_db)
+    data = (await async_client.get("/api/v1/tasks/stats")).json()
+    assert data["by_status"] == {"pending": 1, "failed": 1}
+    assert data["by_priority"] == {"1": 1, "5": 1}
+    assert data["activity"][-1]["events"] == {"created": 2}
+
+
+@pytest.mark.asyncio
+async def test_counters_are_summed_across_shards(test_db, monkeypatch):
+    shards = iter([0, 3, 3])
+    monkeypatch.setattr(
+        stats, "random", SimpleNamespace(randrange=lambda n: next(shards))
+    )
+    await stats_service.apply(test_db, added=[("pending", 1)], events=["created"])
+    await stats_service.apply(test_db, added=[("pending", 1)], events=["created"])
+    await stats_service.apply(
+        test_db, added=[("completed", 1)], removed=[("pending", 1)], events=["completed"]
+    )
+    await test_db.commit()
+
+    rows = (await test_db.execute(select(TaskCount.shard, TaskCount.count))).all()
+    assert sorted(rows) == [(0, 1), (3, 0), (3, 1)]
+    data = await stats_service.get(test_db)
+    assert data["by_status"] == {"pending": 1, "completed": 1}
+    assert data["activity"][-1]["events"] == {"created": 2, "completed": 1}
@@ -1,8 +1,25 @@
 # tests/test_tasks.py
 
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from fastapi import status
-from app.models.task import Task
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.models.task import Task, TaskLog
+from app.schemas.task import (
+    TASK_LOG_ROW_FIELDS,
+    TASK_ROW_FIELDS,
+    Task as TaskSchema,
+    TaskLogInDB,
+    TaskWithLogs,
+    TaskWithLogsRow,
+)
+from app.services.task import task_cache, task_service
 
 
 @pytest.mark.asyncio
@@ -118,4 +135,505 @@ async def test_process_task(test_db, async_client):
 async def test_task_not_found(async_client):
     response = await async_client.get("/api/v1/tasks/999999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert "not found" in response.json()["detail"].lower()
\ No newline at end of file
+    assert "not found" in response.json()["detail"].lower()
+
+
+@pytest.mark.asyncio
+async def test_list_tasks_keyset_pagination(test_db, async_client):
+    tasks = [
+        Task(title=f"Keyset {i}", description="Test", status="pending", priority=i % 3 + 1)
+        for i in range(5)
+    ]
+    test_db.add_all(tasks)
+    await test_db.commit()
+
+    for order_by in ("created_at", "-priority"):
+        seen = []
+        cursor = None
+        while True:
+            params = {"title": "Keyset", "order_by": order_by, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get("/api/v1/tasks/", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(task["id"] for task in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(task.id for task in tasks)
+        assert len(seen) == len(set(seen))
+
+    response = await async_client.get(
+        "/api/v1/tasks/", params={"order_by": "priority", "cursor": "not-a-cursor"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_update_delete(test_db, async_client):
+    payload = [
+        {"title": "Bulk 1", "priority": 2},
+        {"title": "Bulk 2", "description": "Second"},
+        {"priority": 9},
+    ]
+    response = await async_client.post("/api/v1/tasks/bulk", json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert data["failed"] == 1
+    first, second, invalid = data["items"]
+    assert first["id"] and second["id"] and first["error"] is None
+    assert invalid["index"] == 2 and "title" in invalid["error"]
+
+    response = await async_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[
+            {"id": first["id"], "status": "completed"},
+            {"id": second["id"], "status": "completed"},
+            {"id": 999999, "status": "completed"},
+        ],
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert "not found" in data["items"][2]["error"]
+
+    response = await async_client.get(f"/api/v1/tasks/{first['id']}")
+    task = response.json()
+    assert task["status"] == "completed"
+    assert [log["status"] for log in task["logs"]] == ["completed"]
+
+    response = await async_client.request(
+        "DELETE", "/api/v1/tasks/bulk", json={"ids": [first["id"], 999999]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["succeeded"] == 1
+    assert data["items"][0]["error"] is None
+    assert await test_db.get(Task, first["id"]) is None
+
+
+@pytest.mark.asyncio
+async def test_updates_reject_nulls_for_required_fields(test_db, async_client):
+    ids = []
+    for title in ["Kept", "Changed"]:
+        response = await async_client.post("/api/v1/tasks/", json={"title": title})
+        ids.append(response.json()["id"])
+
+    response = await async_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[
+            {"id": ids[0], "title": None},
+            {"id": ids[1], "status": "completed", "description": None},
+        ],
+    )
+    data = response.json()
+    assert data["succeeded"] == 1
+    assert "title" in data["items"][0]["error"]
+    assert data["items"][1]["error"] is None
+    response = await async_client.get(f"/api/v1/tasks/{ids[1]}")
+    assert response.json()["status"] == "completed"
+
+    for field in ["title", "status", "priority"]:
+        response = await async_client.put(f"/api/v1/tasks/{ids[0]}", json={field: None})
+        assert response.status_code == 422
+    response = await async_client.get(f"/api/v1/tasks/{ids[0]}")
+    assert response.json()["title"] == "Kept"
+
+
+@pytest.mark.asyncio
+async def test_search_tasks(test_db, async_client):
+    tasks = [
+        Task(title="Quarterly report", description="Finance numbers", priority=1),
+        Task(title="Team lunch", description="Discuss the quarterly report", priority=2),
+        Task(title="Unrelated", description="Nothing to see", priority=3),
+    ]
+    test_db.add_all(tasks)
+    await test_db.commit()
+
+    response = await async_client.get("/api/v1/tasks/search", params={"q": "report"})
+    assert response.status_code == status.HTTP_200_OK
+    titles = [task["title"] for task in response.json()]
+    # Title matches rank above description matches
+    assert titles == ["Quarterly report", "Team lunch"]
+
+    response = await async_client.get(
+        "/api/v1/tasks/search", params={"q": "reports", "priority": 2}
+    )
+    assert [task["title"] for task in response.json()] == ["Team lunch"]
+
+    await async_client.put(f"/api/v1/tasks/{tasks[2].id}", json={"title": "Report archive"})
+    response = await async_client.get("/api/v1/tasks/search", params={"q": "archive"})
+    assert [task["title"] for task in response.json()] == ["Report archive"]
+
+
+@pytest.mark.asyncio
+async def test_export_tasks(test_db, async_client):
+    tasks = [
+        Task(title="Export 1", description="Line, with comma", status="pending", priority=1),
+        Task(title="Export 2", description=None, status="completed", priority=2),
+    ]
+    test_db.add_all(tasks)
+    await test_db.commit()
+
+    response = await async_client.get(
+        "/api/v1/tasks/export", params={"title": "Export", "format": "ndjson"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["title"] for line in lines] == ["Export 1", "Export 2"]
+
+    response = await async_client.get(
+        "/api/v1/tasks/export",
+        params={"title": "Export", "status": "pending", "format": "csv"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["description"] == "Line, with comma"
+
+
+@pytest.mark.asyncio
+async def test_import_tasks(test_db, async_client):
+    lines = [
+        json.dumps({"title": "Imported 1", "priority": 2}),
+        "",
+        "not json",
+        json.dumps({"title": "Imported 2", "description": "Second"}),
+        json.dumps({"priority": 3}),
+        json.dumps({"title": "x" * 256}),
+    ]
+    body = gzip.compress("\n".join(lines).encode())
+
+    response = await async_client.post(
+        "/api/v1/tasks/import",
+        content=body,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 3
+    assert [error["line"] for error in data["errors"]] == [3, 5, 6]
+    assert "title" in data["errors"][2]["error"]
+
+    response = await async_client.get("/api/v1/tasks/", params={"title": "Imported"})
+    assert {task["title"] for task in response.json()} == {"Imported 1", "Imported 2"}
+
+
+@pytest.mark.asyncio
+async def test_endpoint_query_counts(test_db, async_client, assert_queries):
+    # INSERT ... RETURNING, then the two stats upserts
+    with assert_queries(3):
+        response = await async_client.post(
+            "/api/v1/tasks/", json={"title": "Counted", "priority": 1}
+        )
+    task_id = response.json()["id"]
+
+    # Task and logs in one joined SELECT
+    with assert_queries(1):
+        response = await async_client.get(f"/api/v1/tasks/{task_id}")
+    assert response.status_code == 200
+
+    # UPDATE ... RETURNING only
+    with assert_queries(1):
+        response = await async_client.put(
+            f"/api/v1/tasks/{task_id}", json={"title": "Renamed"}
+        )
+    assert response.json()["title"] == "Renamed"
+
+    # Previous values (a join of the UPDATE on Postgres), UPDATE ... RETURNING,
+    # status log, the two stats upserts and the UPDATE releasing dependents
+    with assert_queries(6):
+        response = await async_client.put(
+            f"/api/v1/tasks/{task_id}", json={"status": "completed"}
+        )
+    assert response.json()["status"] == "completed"
+
+    with assert_queries(1):
+        response = await async_client.put("/api/v1/tasks/999999", json={"title": "x"})
+    assert response.status_code == 404
+
+    # The dependents lookup, DELETE ... RETURNING, then the stats upsert
+    with assert_queries(3):
+        response = await async_client.delete(f"/api/v1/tasks/{task_id}")
+    assert response.status_code == 204
+
+    with assert_queries(2):
+        response = await async_client.delete(f"/api/v1/tasks/{task_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_fast_serialization_is_byte_identical(
+    test_db, async_client, monkeypatch
+):
+    for title in ["Plain", 'Quoted "title"', "Ünïcode ✓"]:
+        response = await async_client.post(
+            "/api/v1/tasks/", json={"title": title, "priority": 2}
+        )
+    task_id = response.json()["id"]
+    await async_client.put(f"/api/v1/tasks/{task_id}", json={"status": "done"})
+
+    urls = [
+        "/api/v1/tasks/",
+        "/api/v1/tasks/?order_by=-priority&limit=2",
+        f"/api/v1/tasks/{task_id}",
+    ]
+    responses = {}
+    for fast in (False, True):
+        monkeypatch.setattr(settings, "FAST_SERIALIZATION", fast)
+        await task_cache.clear()
+        responses[fast] = [await async_client.get(url) for url in urls]
+
+    for slow, fast in zip(responses[False], responses[True]):
+        assert fast.status_code == slow.status_code == 200
+        assert fast.content == slow.content
+        assert fast.headers["content-type"] == slow.headers["content-type"]
+        assert fast.headers.get("x-next-cursor") == slow.headers.get("x-next-cursor")
+    assert responses[True][1].headers["x-next-cursor"]
+    assert len(responses[True][2].json()["logs"]) == 1
+
+
+def test_row_types_match_schemas():
+    assert TASK_ROW_FIELDS == tuple(TaskSchema.model_fields)
+    assert TASK_LOG_ROW_FIELDS == tuple(TaskLogInDB.model_fields)
+    assert tuple(TaskWithLogsRow.__annotations__) == tuple(TaskWithLogs.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(test_db, async_client, assert_queries):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Cached"})
+    task_id = response.json()["id"]
+    url = f"/api/v1/tasks/{task_id}"
+
+    response = await async_client.get(url)
+    etag = response.headers["etag"]
+
+    # The version comes from the task cache filled by the GET above
+    with assert_queries(0):
+        response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    await task_cache.clear()
+    with assert_queries(1):
+        response = await async_client.get(
+            url, headers={"If-None-Match": f'"other", W/{etag}'}
+        )
+    assert response.status_code == 304
+
+    # A status change adds a log, which changes the ETag
+    await async_client.put(url, json={"status": "in_progress"})
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    response = await async_client.get(
+        "/api/v1/tasks/999999", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_conditional_list(test_db, async_client):
+    await async_client.post("/api/v1/tasks/", json={"title": "Listed"})
+    response = await async_client.get("/api/v1/tasks/")
+    etag = response.headers["etag"]
+
+    response = await async_client.get(
+        "/api/v1/tasks/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    await async_client.post("/api/v1/tasks/", json={"title": "Another"})
+    response = await async_client.get(
+        "/api/v1/tasks/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_update_if_match(test_db, async_client):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Guarded"})
+    task_id = response.json()["id"]
+    url = f"/api/v1/tasks/{task_id}"
+    etag = (await async_client.get(url)).headers["etag"]
+
+    response = await async_client.put(
+        url, json={"status": "in_progress"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+
+    # The first writer changed the task, so the stale ETag no longer matches
+    response = await async_client.put(
+        url, json={"title": "Lost update"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert (await async_client.get(url)).json()["title"] == "Guarded"
+
+    # Weak tags never satisfy If-Match, "*" only requires the task to exist
+    fresh = (await async_client.get(url)).headers["etag"]
+    response = await async_client.put(
+        url, json={"title": "Weak"}, headers={"If-Match": f"W/{fresh}"}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.put(
+        url, json={"title": "Any"}, headers={"If-Match": "*"}
+    )
+    assert response.status_code == 200
+    response = await async_client.put(
+        "/api/v1/tasks/999999", json={"title": "x"}, headers={"If-Match": "*"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_task_logs_history(test_db, async_client, monkeypatch):
+    monkeypatch.setattr(settings, "TASK_INLINE_LOGS", 2)
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Busy"})
+    task_id = response.json()["id"]
+    statuses = ["in_progress", "failed", "pending", "in_progress", "completed"]
+    for task_status in statuses:
+        await async_client.put(f"/api/v1/tasks/{task_id}", json={"status": task_status})
+
+    # Only the most recent logs are inline, oldest first
+    task = (await async_client.get(f"/api/v1/tasks/{task_id}")).json()
+    assert [log["status"] for log in task["logs"]] == ["in_progress", "completed"]
+
+    # The full history pages newest first
+    url = f"/api/v1/tasks/{task_id}/logs"
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await async_client.get(url, params=params)
+        assert response.status_code == 200
+        seen.extend(log["status"] for log in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert seen == statuses[::-1]
+
+    assert (await async_client.get(url, params={"cursor": "bogus"})).status_code == 400
+    assert (await async_client.get("/api/v1/tasks/999999/logs")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_purge_logs(test_db, async_client):
+    response = await async_client.post("/api/v1/tasks/", json={"title": "Old"})
+    task_id = response.json()["id"]
+    for task_status in ["in_progress", "completed", "pending"]:
+        await async_client.put(f"/api/v1/tasks/{task_id}", json={"status": task_status})
+    assert len((await async_client.get(f"/api/v1/tasks/{task_id}")).json()["logs"]) == 3
+
+    # Nothing is old enough yet
+    past = datetime.now(timezone.utc) - timedelta(days=1)
+    assert await task_service.purge_logs(test_db, before=past) == 0
+
+    archived = []
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    purged = await task_service.purge_logs(
+        test_db, before=future, batch_size=2, archive=archived.extend
+    )
+    assert purged == 3
+    assert [row["status"] for row in archived] == ["in_progress", "completed", "pending"]
+    # The cached task with its logs was invalidated
+    assert (await async_client.get(f"/api/v1/tasks/{task_id}")).json()["logs"] == []
+    response = await async_client.get(f"/api/v1/tasks/{task_id}/logs")
+    assert response.status_code == 200 and response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_purge_tasks(test_db, async_client):
+    ids = []
+    for title, task_status in [
+        ("Done", "completed"),
+        ("Open", "pending"),
+        ("Broken", "failed"),
+        ("Done too", "completed"),
+    ]:
+        response = await async_client.post("/api/v1/tasks/", json={"title": title})
+        task_id = response.json()["id"]
+        await async_client.put(f"/api/v1/tasks/{task_id}", json={"status": task_status})
+        ids.append(task_id)
+
+    past = datetime.now(timezone.utc) - timedelta(days=1)
+    purged = await task_service.purge_tasks(test_db, statuses=["completed"], before=past)
+    assert purged == 0
+
+    archived = []
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    purged = await task_service.purge_tasks(
+        test_db,
+        statuses=["completed"],
+        before=future,
+        batch_size=2,
+        archive=archived.extend,
+    )
+    assert purged == 2
+    assert [task["title"] for task in archived] == ["Done", "Done too"]
+    assert [log["status"] for log in archived[0]["logs"]] == ["completed"]
+
+    # The logs went with their tasks through ON DELETE CASCADE
+    count = select(func.count()).select_from(TaskLog)
+    purged_ids = [ids[0], ids[3]]
+    result = await test_db.execute(count.where(TaskLog.task_id.in_(purged_ids)))
+    assert result.scalar() == 0
+    result = await test_db.execute(count.where(TaskLog.task_id == ids[2]))
+    assert result.scalar() == 1
+    assert (await async_client.get(f"/api/v1/tasks/{ids[0]}")).status_code == 404
+    stats = (await async_client.get("/api/v1/tasks/stats")).json()
+    assert stats["by_status"] == {"pending": 1, "failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_sparse_fieldsets(test_db, async_client, assert_queries):
+    for title in ["A", "B", "C"]:
+        await async_client.post(
+            "/api/v1/tasks/", json={"title": title, "description": "long " * 100}
+        )
+
+    with assert_queries(1) as statements:
+        response = await async_client.get("/api/v1/tasks/?fields=status,id,title")
+    assert "description" not in statements[0]
+    assert response.status_code == 200
+    assert response.json()[0].keys() == {"id", "title", "status"}
+    etag = response.headers["ETag"]
+    # Another fieldset of the same page is another representation
+    other = await async_client.get("/api/v1/tasks/?fields=id")
+    assert other.json() == [{"id": task["id"]} for task in response.json()]
+    assert other.headers["ETag"] != etag
+    response = await async_client.get(
+        "/api/v1/tasks/?fields=status,id,title", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    # Keyset pages still get their cursor
+    response = await async_client.get("/api/v1/tasks/?order_by=-priority&limit=2&fields=title")
+    assert response.json() == [{"title": "C"}, {"title": "B"}]
+    response = await async_client.get(
+        f"/api/v1/tasks/?order_by=-priority&limit=2&fields=title&cursor={response.headers['X-Next-Cursor']}"
+    )
+    assert response.json() == [{"title": "A"}]
+
+    task_id = other.json()[0]["id"]
+    with assert_queries(1) as statements:
+        response = await async_client.get(f"/api/v1/tasks/{task_id}?fields=title,status")
+    assert "task_logs" not in statements[0] and "description" not in statements[0]
+    assert response.json() == {"title": "A", "status": "pending"}
+    response = await async_client.get(
+        f"/api/v1/tasks/{task_id}?fields=title,status",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    response = await async_client.get(f"/api/v1/tasks/{task_id}?fields=id,logs")
+    assert response.json() == {"id": task_id, "logs": []}
+
+    response = await async_client.get("/api/v1/tasks/?fields=id,logs")
+    assert response.status_code == 400
+    assert "Unknown fields: logs" in response.json()["detail"]
+    assert (await async_client.get(f"/api/v1/tasks/{task_id}?fields=,")).status_code == 400
+    assert (await async_client.get("/api/v1/tasks/999999?fields=id")).status_code == 404